@@ -18,6 +18,8 @@
 #
 """Artifacts defintions internally used to refer to intermediate results."""
 
+import io
+import os
 from enum import IntFlag, auto
 from pathlib import Path
 
@@ -49,10 +51,17 @@ class ArtifactFormat(IntFlag):
     ARCHIVE = auto()
 
 
+def _flags_match(artifact, flags):
+    # A valid artifact may have more flags than specified
+    return all(flag in artifact.flags for flag in flags)
+
+
 def lookup_artifacts(artifacts, name=None, fmt=None, flags=None, first_only=False):
     """Utility to get a matching artifact for a given set of properties."""
     if isinstance(name, Path):
         name = str(name)
+    if isinstance(artifacts, ArtifactList):
+        return artifacts.lookup(name=name, fmt=fmt, flags=flags, first_only=first_only)
     matches = []
     # Warning: if neither name, fmt nor flags is provided, the first artifact (first_only=True)
     # or all (first_only=False) are returned
@@ -62,9 +71,7 @@ def lookup_artifacts(artifacts, name=None, fmt=None, flags=None, first_only=Fals
             valid = False
         if fmt is not None and artifact.fmt != fmt:
             valid = False
-        if flags is not None and not all(
-            flag in artifact.flags for flag in flags
-        ):  # A valid artifact may have more flags than specified
+        if flags is not None and not _flags_match(artifact, flags):
             valid = False
         if valid:
             matches.append(artifact)
@@ -73,8 +80,123 @@ def lookup_artifacts(artifacts, name=None, fmt=None, flags=None, first_only=Fals
     return matches
 
 
+def _invalidates_index(func):
+    def wrapper(self, *args, **kwargs):
+        self._index = None
+        return func(self, *args, **kwargs)
+
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+class ArtifactList(list):
+    """List of artifacts which maintains an index by name, format and flags for fast lookups.
+
+    Behaves exactly like a regular list. The index is built on the first lookup and invalidated
+    whenever the list is modified. Changing the name, format or flags of an artifact which is already
+    part of the list is not tracked, call invalidate_index() afterwards.
+    """
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._index = None
+
+    def _build_index(self):
+        by_name = {}
+        by_fmt = {}
+        by_flag = {}
+        for i, artifact in enumerate(self):
+            by_name.setdefault(artifact.name, []).append(i)
+            by_fmt.setdefault(artifact.fmt, []).append(i)
+            for flag in artifact.flags:
+                by_flag.setdefault(flag, []).append(i)
+        self._index = (by_name, by_fmt, by_flag)
+
+    def invalidate_index(self):
+        """Drop the index, it will be rebuilt on the next lookup."""
+        self._index = None
+
+    def lookup(self, name=None, fmt=None, flags=None, first_only=False):
+        """Indexed equivalent of lookup_artifacts."""
+        if name is None and fmt is None and flags is None:
+            return list(self[:1]) if first_only else list(self)
+        if self._index is None:
+            self._build_index()
+        by_name, by_fmt, by_flag = self._index
+        candidates = []
+        if name is not None:
+            candidates.append(by_name.get(name, []))
+        if fmt is not None:
+            candidates.append(by_fmt.get(fmt, []))
+        flags = list(flags) if flags is not None else []
+        if len(candidates) == 0 and len(flags) > 0:
+            candidates.append(by_flag.get(flags[0], []))
+        idxs = min(candidates, key=len) if len(candidates) > 0 else range(len(self))
+        matches = []
+        for i in idxs:
+            artifact = self[i]
+            if name is not None and artifact.name != name:
+                continue
+            if fmt is not None and artifact.fmt != fmt:
+                continue
+            if not _flags_match(artifact, flags):
+                continue
+            matches.append(artifact)
+            if first_only:
+                break
+        return matches
+
+    __setitem__ = _invalidates_index(list.__setitem__)
+    __delitem__ = _invalidates_index(list.__delitem__)
+    __iadd__ = _invalidates_index(list.__iadd__)
+    __imul__ = _invalidates_index(list.__imul__)
+    append = _invalidates_index(list.append)
+    extend = _invalidates_index(list.extend)
+    insert = _invalidates_index(list.insert)
+    pop = _invalidates_index(list.pop)
+    remove = _invalidates_index(list.remove)
+    clear = _invalidates_index(list.clear)
+    sort = _invalidates_index(list.sort)
+    reverse = _invalidates_index(list.reverse)
+
+    def __add__(self, other):
+        return ArtifactList(list.__add__(self, other))
+
+    def __radd__(self, other):
+        return ArtifactList(list(other) + list(self))
+
+    def copy(self):
+        return ArtifactList(self)
+
+    def __getitem__(self, key):
+        ret = list.__getitem__(self, key)
+        return ArtifactList(ret) if isinstance(key, slice) else ret
+
+    def __reduce__(self):
+        return (ArtifactList, (list(self),))
+
+
+TEXT_FORMATS = [ArtifactFormat.TEXT, ArtifactFormat.SOURCE]
+BINARY_FORMATS = [
+    ArtifactFormat.RAW,
+    ArtifactFormat.BIN,
+    ArtifactFormat.MLF,
+    ArtifactFormat.SHARED_OBJECT,
+    ArtifactFormat.ARCHIVE,
+]
+
+# Lazy artifacts larger than this (in bytes) are never kept in memory after reading them from disk
+SPILL_THRESHOLD = int(os.environ.get("MLONMCU_ARTIFACT_SPILL_THRESHOLD", 1024 * 1024))
+
+
 class Artifact:
-    """Artifact type."""
+    """Artifact type.
+
+    Text and binary artifacts can either hold their content in memory or be backed by a file on disk
+    (lazy=True). For the latter, the content is only read on first access and large files are not kept
+    in memory at all. Pickling a lazy artifact only transfers the reference to the file.
+    """
 
     def __init__(
         self,
@@ -87,20 +209,110 @@ class Artifact:
         flags=None,
         archive=False,
         optional=False,
+        lazy=False,
     ):
         # TODO: Allow to store filenames as well as raw data
         self.name = name
         # TODO: too many attributes...
-        self.content = content
-        self.path = path
+        self._content = content
+        self.path = Path(path) if isinstance(path, str) else path
         self.data = data
-        self.raw = raw
+        self._raw = raw
         self.fmt = fmt
         self.flags = flags if flags is not None else {}
         self.archive = archive
         self.optional = optional
+        self.lazy = lazy
         self.validate()
 
+    @classmethod
+    def from_path(cls, name, path, fmt=ArtifactFormat.RAW, **kwargs):
+        """Create a lazy artifact backed by an existing file."""
+        return cls(name, path=path, fmt=fmt, lazy=True, **kwargs)
+
+    def _load(self):
+        assert self.path is not None, "Lazy artifact without path"
+        size = self.path.stat().st_size
+        if self.fmt in TEXT_FORMATS:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = handle.read()
+        else:
+            with open(self.path, "rb") as handle:
+                data = handle.read()
+        keep = size <= SPILL_THRESHOLD
+        return data, keep
+
+    @property
+    def content(self):
+        """Text content of the artifact (loaded on first access for lazy artifacts)."""
+        if self._content is None and self.lazy and self.fmt in TEXT_FORMATS:
+            content, keep = self._load()
+            if keep:
+                self._content = content
+            return content
+        return self._content
+
+    @content.setter
+    def content(self, value):
+        self._content = value
+
+    @property
+    def raw(self):
+        """Binary content of the artifact (loaded on first access for lazy artifacts)."""
+        if self._raw is None and self.lazy and self.fmt in BINARY_FORMATS:
+            raw, keep = self._load()
+            if keep:
+                self._raw = raw
+            return raw
+        return self._raw
+
+    @raw.setter
+    def raw(self, value):
+        self._raw = value
+
+    @property
+    def loaded(self):
+        """Returns true if the artifacts content is currently held in memory."""
+        return self._content is not None or self._raw is not None or self.data is not None
+
+    @property
+    def size(self):
+        """Size of the artifact content in bytes (without loading lazy artifacts)."""
+        if self._content is not None:
+            return len(self._content.encode("utf-8"))
+        if self._raw is not None:
+            return len(self._raw)
+        if self.path is not None and self.path.is_file():
+            return self.path.stat().st_size
+        return None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if self.lazy:
+            # Only the reference to the file is pickled
+            state["_content"] = None
+            state["_raw"] = None
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault("lazy", False)
+        if "content" in state:  # Pickled by older versions
+            state["_content"] = state.pop("content")
+        if "raw" in state:
+            state["_raw"] = state.pop("raw")
+        self.__dict__.update(state)
+
+    def open(self):
+        """Open the artifact for reading without loading the whole content of lazy artifacts into memory."""
+        if self._content is None and self._raw is None and self.path is not None and self.path.is_file():
+            if self.fmt in TEXT_FORMATS:
+                return open(self.path, "r", encoding="utf-8")
+            return open(self.path, "rb")
+        if self.fmt in TEXT_FORMATS:
+            return io.StringIO(self.content)
+        assert self.fmt in BINARY_FORMATS, f"Can not open artifact of format {self.fmt.name}"
+        return io.BytesIO(self.raw)
+
     def serialize(self, full: bool = False):
         ret = {
             "name": self.name,
@@ -112,7 +324,7 @@ class Artifact:
             **(
                 {
                     "content": self.content,
-                    "data": self.data,
+                    "data": self.data.to_dict() if hasattr(self.data, "to_dict") else self.data,
                     "raw": self.raw,
                 }
                 if full
@@ -121,7 +333,27 @@ class Artifact:
         }
         return ret
 
-    # TODO: unserialize
+    @classmethod
+    def deserialize(cls, data):
+        """Restore an artifact written to disk from the output of `serialize(full=False)`.
+
+        Returns None if the artifact can not be restored (not exported or missing on disk).
+        """
+        path = data.get("path")
+        if path is None:
+            return None
+        path = Path(path)
+        fmt = ArtifactFormat(data["fmt"])
+        kwargs = {
+            "flags": set(data.get("flags", [])),
+            "archive": data.get("archive", False),
+            "optional": data.get("optional", False),
+        }
+        if fmt in TEXT_FORMATS + BINARY_FORMATS and path.is_file():
+            return cls.from_path(data["name"], path, fmt=fmt, **kwargs)
+        if fmt == ArtifactFormat.PATH and path.exists():
+            return cls(data["name"], path=path, fmt=fmt, **kwargs)
+        return None
 
     def __repr__(self):
         return f"Artifact({self.name}, fmt={self.fmt}, flags={self.flags})"
@@ -133,7 +365,10 @@ class Artifact:
 
     def validate(self):
         """Checker for artifact attributes for the given format."""
-        if self.fmt in [ArtifactFormat.TEXT, ArtifactFormat.SOURCE]:
+        if self.lazy:
+            assert self.fmt in TEXT_FORMATS + BINARY_FORMATS, f"Lazy artifacts not supported for format: {self.fmt}"
+            assert self.path is not None
+        elif self.fmt in [ArtifactFormat.TEXT, ArtifactFormat.SOURCE]:
             assert self.content is not None
         elif self.fmt in [ArtifactFormat.RAW, ArtifactFormat.BIN]:
             assert self.raw is not None
@@ -145,19 +380,48 @@ class Artifact:
             raise NotImplementedError
 
     def cache(self):
-        raise NotImplementedError
+        """Load the content of a lazy artifact into memory (regardless of its size)."""
+        if not self.lazy:
+            return
+        assert self.path is not None and self.path.is_file(), f"Missing file: {self.path}"
+        data, _ = self._load()
+        if self.fmt in TEXT_FORMATS:
+            self._content = data
+        else:
+            self._raw = data
+        self.lazy = False
 
     def uncache(self):
         assert self.path is not None, "Can only uncache artifacts written to disk"
         assert self.path.is_file(), f"Missing file: {self.path}"
-        if self.content:
-            self.content = None
+        if self.fmt in TEXT_FORMATS + BINARY_FORMATS:
+            self.lazy = True
+        if self._content:
+            self._content = None
         if self.data:
             self.data = None
-        if self.raw:
-            self.raw = None
+        if self._raw:
+            self._raw = None
         # TODO: logging msg
 
+    def spill(self, dest, threshold=None):
+        """Write the artifact to disk and drop its in-memory content if it exceeds the given size (in bytes).
+
+        Returns true if the artifact was spilled.
+        """
+        if self.lazy or self.fmt not in TEXT_FORMATS + BINARY_FORMATS:
+            return False
+        threshold = SPILL_THRESHOLD if threshold is None else threshold
+        size = self.size
+        if size is None or size <= threshold:
+            return False
+        dest = Path(dest)
+        filename = dest / self.name if dest.is_dir() else dest
+        self.export(filename)
+        self.path = filename  # export() keeps the previous path of already exported artifacts
+        self.uncache()
+        return True
+
     def export(self, dest, extract=False, skip_exported: bool = True):
         """Export the artifact to a given path (file or directory) and update its path.
 
@@ -181,6 +445,24 @@ class Artifact:
                 if self.path.is_file() or self.path.is_dir():
                     if skip_exported:
                         return
+        if self.lazy and filename != self.path:
+            # Avoid reading the backing file into memory
+            utils.unshare(filename)
+            utils.copy(self.path, filename)
+            if extract:
+                assert self.fmt in [ArtifactFormat.MLF, ArtifactFormat.SHARED_OBJECT, ArtifactFormat.ARCHIVE]
+                utils.extract(filename, dest)
+            # The exported file is owned by the run, which makes it a more reliable backing than the source
+            self.path = filename
+            return
+        if self.lazy and filename == self.path:
+            if extract:
+                assert self.fmt in [ArtifactFormat.MLF, ArtifactFormat.SHARED_OBJECT, ArtifactFormat.ARCHIVE]
+                utils.extract(filename, dest)
+            return
+        if self.fmt != ArtifactFormat.PATH:
+            # Never write through a link into the content store
+            utils.unshare(filename)
         if self.fmt in [ArtifactFormat.TEXT, ArtifactFormat.SOURCE]:
             assert not extract, "extract option is only available for ArtifactFormat.MLF"
             with open(filename, "w", encoding="utf-8") as handle:
@@ -210,9 +492,9 @@ class Artifact:
             print("Content:")
             print(self.content)
         elif self.fmt in [ArtifactFormat.RAW, ArtifactFormat.BIN]:
-            print(f"Data Size: {len(self.raw)}B")
+            print(f"Data Size: {self.size}B")
         elif self.fmt in [ArtifactFormat.MLF, ArtifactFormat.SHARED_OBJECT, ArtifactFormat.ARCHIVE]:
-            print(f"Archive Size: {len(self.raw)}B")
+            print(f"Archive Size: {self.size}B")
         elif self.fmt in [ArtifactFormat.PATH]:
             print(f"File Location: {self.path}")
         else:
@@ -0,0 +1,132 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Caches for the results of expensive parsing and analysis steps (model infos, ELF/DWARF analysis,...).
+
+Results are keyed by the content hash of their inputs. They are kept in memory and, if a cache directory
+was configured (see set_cache_dir), persisted on disk to share them between processes and sessions.
+"""
+import os
+import copy
+import pickle
+import hashlib
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, Union
+
+from mlonmcu.logging import get_logger
+
+logger = get_logger()
+
+_cache_dir = None
+
+
+def set_cache_dir(path: Optional[Union[str, Path]]):
+    """Set the directory used to persist cached results (None: in-memory only)."""
+    global _cache_dir
+    _cache_dir = Path(path) if path is not None else None
+
+
+def get_cache_dir():
+    return _cache_dir
+
+
+def hash_content(data: Union[str, bytes]):
+    """Return the SHA256 hex digest of a str or bytes object."""
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: Union[str, Path], chunk_size: int = 1024 * 1024):
+    """Return the SHA256 hex digest of a file."""
+    sha = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class ResultCache:
+    """Content-addressed cache for the results of a single kind of analysis.
+
+    The version needs to be increased whenever the layout of the cached results changes.
+    The number of results kept in memory can be limited via max_entries (least recently used are dropped).
+    """
+
+    def __init__(self, name: str, version: int = 1, max_entries: Optional[int] = None, copy_results: bool = True):
+        self.name = name
+        self.version = version
+        self.max_entries = max_entries
+        self.copy_results = copy_results
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _file(self, key):
+        if _cache_dir is None:
+            return None
+        return _cache_dir / self.name / f"{key}_v{self.version}.pkl"
+
+    def _load(self, cache_file):
+        if cache_file is None or not cache_file.is_file():
+            return None
+        try:
+            with open(cache_file, "rb") as handle:
+                return pickle.load(handle)
+        except Exception as err:  # Corrupt or incompatible cache file
+            logger.debug("Ignoring cache file %s: %s", cache_file, err)
+            return None
+
+    def _store(self, cache_file, value):
+        if cache_file is None:
+            return
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.parent / f".{cache_file.name}.{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_file, "wb") as handle:
+                pickle.dump(value, handle)
+            os.replace(tmp_file, cache_file)  # Atomic, concurrent writers store the same result
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as err:
+            logger.debug("Failed to write cache file %s: %s", cache_file, err)
+
+    def _result(self, value):
+        return copy.deepcopy(value) if self.copy_results else value
+
+    def clear(self):
+        """Drop all in-memory entries (files on disk are kept)."""
+        with self.lock:
+            self.entries.clear()
+
+    def lookup(self, key: str, func):
+        """Return the cached result for the given key (usually a content hash) or compute it using func."""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self._result(self.entries[key])
+        cache_file = self._file(key)
+        value = self._load(cache_file)
+        if value is None:
+            value = func()
+            self._store(cache_file, value)
+        with self.lock:
+            self.entries[key] = value
+            if self.max_entries is not None:
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return self._result(value)
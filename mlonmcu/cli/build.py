@@ -61,6 +61,10 @@ def get_parser(subparsers, parent=None):
 
 def _handle(args, context, require_target=False):
     handle_load(args, ctx=context)
+    assert len(context.sessions) > 0
+    session = context.sessions[-1]
+    if session.resumed:
+        return  # Restored runs already have their backends, platforms and targets
     backends = extract_backend_names(args, context=context)
     targets = extract_target_names(args, context=context if require_target else None)
     platforms = extract_platform_names(args, context=context)
@@ -69,8 +73,6 @@ def _handle(args, context, require_target=False):
     platform_backends = get_platforms_backends(context, config=new_config)  # This will be slow?
     platform_targets = get_platforms_targets(context, config=new_config)  # This will be slow?
 
-    assert len(context.sessions) > 0
-    session = context.sessions[-1]
     new_runs = []
     for run in session.runs:
         if isinstance(run, RunInitializer) and run.frozen:
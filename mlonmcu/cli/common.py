@@ -23,9 +23,6 @@ import logging
 import argparse
 
 from mlonmcu.config import str2bool
-from mlonmcu.platform import get_platforms
-from mlonmcu.session.postprocess import SUPPORTED_POSTPROCESSES
-from mlonmcu.feature.features import get_available_feature_names
 from mlonmcu.logging import get_logger, set_log_level
 from .helper.parse import extract_config
 
@@ -47,6 +44,11 @@ def handle_logging_flags(args):
 
 
 def add_flow_options(parser):
+    # Imported here to keep `mlonmcu --help` and light subcommands fast
+    from mlonmcu.platform import get_platforms
+    from mlonmcu.session.postprocess import SUPPORTED_POSTPROCESSES
+    from mlonmcu.feature.features import get_available_feature_names
+
     flow_parser = parser.add_argument_group("flow options")
     flow_parser.add_argument(  # TODO: move to compile.py?
         "-t",
@@ -170,8 +172,11 @@ def add_flow_options(parser):
     )
     flow_parser.add_argument(
         "--resume",
-        action="store_true",
-        help="Try to resume the latest session (default: %(default)s)",
+        metavar="SESSION",
+        nargs="?",
+        const="latest",
+        default=None,
+        help="Resume an interrupted session (given by its index, the latest session if omitted)",
     )
     flow_parser.add_argument(  # TODO: move to compile.py?
         "-l",
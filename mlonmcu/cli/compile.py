@@ -44,14 +44,16 @@ def get_parser(subparsers):
 
 def _handle(args, context):
     handle_build(args, ctx=context)
+    assert len(context.sessions) > 0  # TODO: automatically request session if no active one is available
+    session = context.sessions[-1]
+    if session.resumed:
+        return  # Restored runs already have their targets
     targets = extract_target_names(args, context=context)  # This will eventually be ignored below
     platforms = extract_platform_names(args, context=context)
 
     new_config, _, _, _ = extract_config_and_feature_names(args, context=context)
     platform_targets = get_platforms_targets(context, config=new_config)  # This will slow?
 
-    assert len(context.sessions) > 0  # TODO: automatically request session if no active one is available
-    session = context.sessions[-1]
     new_runs = []
     for run in session.runs:
         if isinstance(run, RunInitializer) and run.frozen:
@@ -33,6 +33,9 @@ from mlonmcu.context.context import MlonMcuContext
 from mlonmcu.models import SUPPORTED_FRONTENDS
 from mlonmcu.models.lookup import apply_modelgroups
 from mlonmcu.session.run import RunStage, RunInitializer
+from mlonmcu.logging import get_logger
+
+logger = get_logger()
 
 
 def add_load_options(parser):
@@ -64,6 +67,11 @@ def _handle(args, context):
     config = context.environment.vars
     new_config, features, gen_config, gen_features = extract_config_and_feature_names(args, context=context)
     config.update(new_config)
+    if args.resume:
+        context.get_session(resume=args.resume, config=config)
+        if any(model != "_" for model in args.models) or args.initializer:
+            logger.warning("Resuming session, ignoring additional models and initializers")
+        return
     session = context.get_session(label=args.label, resume=args.resume, config=config)
     initializers = args.initializer
     if initializers is not None:
@@ -20,24 +20,47 @@
 
 import os
 import argparse
+import importlib
 import sys
 import subprocess
 import platform
 
 
 from mlonmcu.logging import get_logger
-import mlonmcu.cli.init as init
-import mlonmcu.cli.setup as setup
-import mlonmcu.cli.flow as flow
-import mlonmcu.cli.cleanup as cleanup
-import mlonmcu.cli.export as export
-import mlonmcu.cli.env as env
-import mlonmcu.cli.models as models
 from .common import handle_logging_flags, add_common_options
 from ..version import __version__
 
 logger = get_logger()
 
+# Subcommands are only imported when selected, as most of them pull in the whole flow (pandas, frontends,...)
+SUBCOMMANDS = {
+    "init": ("mlonmcu.cli.init", "Initialize ML on MCU environment."),
+    "setup": ("mlonmcu.cli.setup", "Setup ML on MCU dependencies."),
+    "flow": ("mlonmcu.cli.flow", "Invoke ML on MCU flow"),
+    "cleanup": ("mlonmcu.cli.cleanup", "Cleanup ML on MCU environment."),
+    "export": ("mlonmcu.cli.export", "Export session/run artifacts to a directory/archive."),
+    "env": ("mlonmcu.cli.env", "List ML on MCU environments."),
+    "models": ("mlonmcu.cli.models", "Manage ML on MCU models."),
+}
+
+
+def find_subcommand(args):
+    """Return the name of the selected subcommand without parsing the remaining arguments."""
+    for arg in args:
+        if arg.startswith("-"):
+            continue  # All toplevel options are flags
+        return arg if arg in SUBCOMMANDS else None
+    return None
+
+
+def add_subcommands(subparsers, selected=None):
+    for name, (module_name, description) in SUBCOMMANDS.items():
+        if name == selected:
+            module = importlib.import_module(module_name)
+            module.get_parser(subparsers)
+        else:
+            subparsers.add_parser(name, description=description)
+
 
 def handle_docker(args):
     if args.docker:
@@ -90,17 +113,10 @@ def main(args=None):
     parser.add_argument("-V", "--version", action="version", version="mlonmcu " + __version__)
     add_common_options(parser)
     subparsers = parser.add_subparsers(dest="subcommand")  # this line changed
-    init.get_parser(subparsers)
-    setup.get_parser(subparsers)
-    flow.get_parser(subparsers)
-    cleanup.get_parser(subparsers)
-    export.get_parser(subparsers)
-    env.get_parser(subparsers)
-    models.get_parser(subparsers)
-    if args:
-        args = parser.parse_args(args)
-    else:
-        args = parser.parse_args()
+    if not args:
+        args = sys.argv[1:]
+    add_subcommands(subparsers, selected=find_subcommand(args))
+    args = parser.parse_args(args)
     handle_logging_flags(args)
     handle_docker(args)
 
@@ -17,7 +17,8 @@
 # limitations under the License.
 #
 """Collection of utilities to manage MLonMCU configs."""
-import distutils.util
+import functools
+from collections.abc import MutableMapping
 from typing import List
 import ast
 
@@ -27,6 +28,65 @@ from mlonmcu.logging import get_logger
 logger = get_logger()
 
 
+class ConfigView(MutableMapping):
+    """Copy-on-write view of a config dict.
+
+    Reads are served from the base config, modifications are only stored in the view. This
+    replaces copying the complete run config for every component which is initialized.
+    """
+
+    _DELETED = object()
+
+    def __init__(self, base):
+        self._base = base
+        self._overlay = {}
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            value = self._overlay[key]
+            if value is self._DELETED:
+                raise KeyError(key)
+            return value
+        return self._base[key]
+
+    def __setitem__(self, key, value):
+        self._overlay[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._overlay[key] = self._DELETED
+
+    def __contains__(self, key):
+        if key in self._overlay:
+            return self._overlay[key] is not self._DELETED
+        return key in self._base
+
+    def __iter__(self):
+        for key in self._base:
+            if key not in self._overlay:
+                yield key
+        for key, value in self._overlay.items():
+            if value is not self._DELETED:
+                yield key
+
+    def __len__(self):
+        if len(self._overlay) == 0:
+            return len(self._base)
+        return sum(1 for _ in self)
+
+    def items(self):
+        if len(self._overlay) == 0:
+            return self._base.items()
+        return super().items()
+
+    def copy(self):
+        return dict(self.items())
+
+    def __repr__(self):
+        return f"ConfigView({self.copy()})"
+
+
 def remove_config_prefix(config, prefix, skip=None):
     """Iterate over keys in dict and remove given prefix.
 
@@ -54,6 +114,30 @@ def remove_config_prefix(config, prefix, skip=None):
     return {helper(key): value for key, value in config.items() if f"{prefix}." in key and key not in skip}
 
 
+# Config keys which refer to files or directories are identified by their name
+PATH_CONFIG_SUFFIXES = ("_dir", "_dirs", "_path", "_paths", "_file", "_exe", "_executable", "_script")
+PATH_CONFIG_NAMES = {"dir", "path", "file", "exe", "executable", "script", "pythonpath", "pk", "workdir", "dest"}
+
+
+@functools.lru_cache(maxsize=None)
+def is_path_config(key):
+    """Returns true if the given config key (with or without prefix) refers to a path."""
+    name = key.rsplit(".", 1)[-1]
+    return name in PATH_CONFIG_NAMES or name.endswith(PATH_CONFIG_SUFFIXES)
+
+
+@functools.lru_cache(maxsize=None)
+def get_path_configs(component_cls):
+    """Determine the path-like config keys of a component class (computed once per class).
+
+    Components may declare additional keys via a PATH_CONFIGS class attribute.
+    """
+    extra = set(getattr(component_cls, "PATH_CONFIGS", set()))
+    keys = set(getattr(component_cls, "REQUIRED", set())) | set(getattr(component_cls, "OPTIONAL", set()))
+    keys |= set(getattr(component_cls, "DEFAULTS", {}).keys())
+    return frozenset(key for key in keys if is_path_config(key)) | frozenset(extra)
+
+
 def filter_config(config, prefix, defaults, optionals, required_keys):
     """Filter the global config for a given component prefix.
 
@@ -117,6 +201,43 @@ def filter_config(config, prefix, defaults, optionals, required_keys):
     return cfg
 
 
+@functools.lru_cache(maxsize=None)
+def _get_sublists(in_list):
+    """Return all contiguous sublists (including the empty one) of the given tuple."""
+    ret = [()]
+    for i in range(len(in_list) + 1):
+        for j in range(i + 1, len(in_list) + 1):
+            ret.append(in_list[i:j])
+    return tuple(ret)
+
+
+# Memoized results of resolve_required_config (values: (cache, result))
+_RESOLVE_MEMO = {}
+_RESOLVE_MEMO_SIZE = 4096
+
+
+def _get_resolve_memo_key(required_keys, optional, config, cache, hints, cache_flags):
+    """Key for the memoization of resolve_required_config or None if the inputs can not be memoized."""
+    version = getattr(cache, "version", None)
+    if version is None:
+        return None  # Only caches which track modifications are supported
+    keys = tuple(sorted(set(required_keys) | set(optional if optional else [])))
+    try:
+        key = (
+            id(cache),
+            version,
+            keys,
+            frozenset(required_keys),
+            tuple(hints) if hints else (),
+            tuple((k, frozenset(cache_flags[k])) for k in keys if k in cache_flags),
+            tuple((k, config[k]) for k in keys if config is not None and k in config),
+        )
+        hash(key)
+    except TypeError:
+        return None  # Unhashable config values
+    return key
+
+
 def resolve_required_config(
     required_keys, optional=None, features=None, config=None, cache=None, hints=None, default_flags=None
 ):  # TODO: add framework, backend, and frontends as well?
@@ -146,15 +267,7 @@ def resolve_required_config(
 
     """
 
-    def get_sublists(in_list):
-        ret = [[]]
-        for i in range(len(in_list) + 1):
-            for j in range(i + 1, len(in_list) + 1):
-                sub = in_list[i:j]
-                ret.append(sub)
-        return ret
-
-    hint_combinations = get_sublists(hints if hints else [])
+    hint_combinations = _get_sublists(tuple(hints) if hints else ())
 
     def get_cache_flags(features, default):
         result = {}
@@ -167,8 +280,14 @@ def resolve_required_config(
                     feature.add_required_cache_flags(result)
         return result
 
-    ret = {}
     cache_flags = get_cache_flags(features, default_flags)
+    memo_key = _get_resolve_memo_key(required_keys, optional, config, cache, hints, cache_flags)
+    if memo_key is not None:
+        memo = _RESOLVE_MEMO.get(memo_key)
+        if memo is not None and memo[0] is cache:
+            return memo[1].copy()
+
+    ret = {}
     for key in required_keys:
         if config is None or key not in config:
             assert cache is not None, "No dependency cache was provided. Either provide a cache or config."
@@ -177,7 +296,7 @@ def resolve_required_config(
             flags = cache_flags.get(key, ())
             value = None
             for hint_combination in hint_combinations:
-                if (key, tuple(list(flags) + hint_combination)) in cache:
+                if (key, tuple(flags) + hint_combination) in cache:
                     value = cache[key, flags]
                     break
             if value is None:
@@ -202,7 +321,7 @@ def resolve_required_config(
                 flags = cache_flags.get(key, ())
                 value = None
                 for hint_combination in hint_combinations:
-                    if (key, tuple(list(flags) + hint_combination)) in cache:
+                    if (key, tuple(flags) + hint_combination) in cache:
                         value = cache[key, flags]
                         break
                 if value is None:
@@ -211,9 +330,27 @@ def resolve_required_config(
             else:
                 ret[key] = config[key]
 
+    if memo_key is not None:
+        if len(_RESOLVE_MEMO) >= _RESOLVE_MEMO_SIZE:
+            _RESOLVE_MEMO.clear()
+        _RESOLVE_MEMO[memo_key] = (cache, ret.copy())
     return ret
 
 
+# Same semantics as distutils.util.strtobool (importing distutils is slow and deprecated)
+_TRUE_VALUES = ("y", "yes", "t", "true", "on", "1")
+_FALSE_VALUES = ("n", "no", "f", "false", "off", "0")
+
+
+def _strtobool(value):
+    value = value.lower()
+    if value in _TRUE_VALUES:
+        return True
+    if value in _FALSE_VALUES:
+        return False
+    raise ValueError(f"invalid truth value {value!r}")
+
+
 def str2bool(value, allow_none=False):
     if value is None:
         assert allow_none, "str2bool received None value while allow_none=False"
@@ -221,7 +358,7 @@ def str2bool(value, allow_none=False):
     if isinstance(value, (int, bool)):
         return bool(value)
     assert isinstance(value, str)
-    return bool(distutils.util.strtobool(value))
+    return _strtobool(value)
 
 
 def str2dict(value, allow_none=False):
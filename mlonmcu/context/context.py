@@ -25,12 +25,14 @@ import tempfile
 from typing import List, Union, Optional, Dict
 from pathlib import Path
 import filelock
+import yaml
 
 from mlonmcu.utils import ask_user
 from mlonmcu.logging import get_logger, set_log_file
-from mlonmcu.session.run import ArchivedRun
+from mlonmcu.session.run import ArchivedRun, RunInitializer
 from mlonmcu.session.session import Session
 from mlonmcu.setup.cache import TaskCache
+from mlonmcu.cache import set_cache_dir
 import mlonmcu.setup.utils as utils
 from mlonmcu.plugins import process_extensions
 from mlonmcu.context.read_write_filelock import ReadFileLock, WriteFileLock, RWLockTimeout
@@ -227,7 +229,7 @@ def load_recent_sessions(env: Environment, count: int = None) -> List[Session]:
             run_directory = runs_directory / str(rid)
             # run_file = run_directory / "run.txt"
             # run = Run.from_file(run_file)  # TODO: actually implement run restore
-            run = ArchivedRun.from_dir(run_directory)
+            run = ArchivedRun.from_dir(run_directory, load=False)  # Restoring the run state is expensive
             # run.archived = True
             # run.dir = run_directory
             runs.append(run)
@@ -295,6 +297,12 @@ def setup_logging(environment):
         set_log_file(path, level=level, rotate=rotate)
 
 
+def setup_result_cache(environment):
+    """Persist cached analysis results in the temp directory of the environment to share them between runs."""
+    temp_path = environment.paths.get("temp") if environment.paths else None
+    set_cache_dir(temp_path.path / "cache" if temp_path is not None else None)
+
+
 class MlonMcuContext:
     """Contextmanager for mlonmcu environments.
 
@@ -351,6 +359,7 @@ class MlonMcuContext:
                 logger.debug(f"Restored {len(self.sessions)} recent sessions")
         self.cache = TaskCache()
         self.export_paths = set()
+        setup_result_cache(self.environment)
 
     def create_session(self, label="", config=None, dest: Optional[Union[str, Path]] = None):
         try:
@@ -367,7 +376,12 @@ class MlonMcuContext:
                 sessions_directory = temp_directory / "sessions"
                 sessions_directory.mkdir(exist_ok=True, parents=True)
                 session_dir = sessions_directory / str(idx)
-                session = Session(idx=idx, label=label, dest=dest if dest is not None else session_dir, config=config)
+                # Session defaults (e.g. resource limits) may be provided via the environment file
+                config_ = {key: value for key, value in self.environment.vars.items() if key.startswith("session.")}
+                config_.update(config if config else {})
+                session = Session(
+                    idx=idx, label=label, dest=dest if dest is not None else session_dir, config=config_
+                )
                 self.sessions.append(session)
                 self.session_idx = idx
                 # TODO: move this to a helper function
@@ -418,6 +432,55 @@ class MlonMcuContext:
                     plugins_dir = self.environment.paths["plugins"].path
                     _load(plugins_dir, hint="Environment")
 
+    def resume_session(self, session_id="latest", config=None) -> Session:
+        """Reopen an existing session. Runs continue after their last completed stage.
+
+        Parameters
+        ----------
+        session_id : int/str
+            The index of the session or "latest".
+
+        Returns
+        -------
+        Session:
+            The resumed session
+        """
+        if session_id in [True, "latest"]:
+            assert len(self.sessions) > 0, "There is no recent session available"
+            session_id = self.sessions[-1].idx
+        idx = int(session_id)
+        session_dir = self.environment.paths["temp"].path / "sessions" / str(idx)
+        assert session_dir.is_dir(), f"Session {idx} does not exist"
+        label_file = session_dir / "label.txt"
+        label = label_file.read_text() if label_file.is_file() else ""
+        session = Session(idx=idx, label=label, dest=session_dir, config=config)
+        session.resumed = True
+        for rid in get_ids(session.runs_dir):
+            run_dir = session.runs_dir / str(rid)
+            state_file = run_dir / "run.yml"
+            initializer_file = run_dir / "initializer.yml"
+            if state_file.is_file():
+                with open(state_file, "r") as f:
+                    initializer = RunInitializer(**yaml.safe_load(f)["initializer"])
+            elif initializer_file.is_file():
+                initializer = RunInitializer.from_file(initializer_file)
+            else:
+                logger.warning("Can not resume run %s of session %s (no run.yml or initializer.yml)", rid, idx)
+                continue
+            initializer.idx = rid
+            initializer.frozen = True  # Components are already set up
+            if session.needs_initializer:
+                session.add_run(initializer, ignore_idx=False)  # Restored by the workers
+            else:
+                run = initializer.realize(context=self)
+                run.init_directory(parent=session.runs_dir)
+                run.restore_state()
+                session.add_run(run, ignore_idx=False)
+        assert len(session.runs) > 0, f"Session {idx} has no runs to resume"
+        logger.info("Resuming session %s with %d runs", idx, len(session.runs))
+        self.sessions = [sess for sess in self.sessions if sess.idx != idx] + [session]
+        return session
+
     def get_session(self, label="", resume=False, config=None, dest=None) -> Session:
         """Get an active session if available, else create a new one.
 
@@ -427,10 +490,7 @@ class MlonMcuContext:
             An active session
         """
         if resume:
-            assert len(self.sessions) > 0, "There is no recent session available"
-            # session = self.sessions[-1]
-            assert False, "The latest session can not be resumed"
-            raise NotImplementedError
+            return self.resume_session(resume, config=config)
 
         if self.session_idx < 0 or not self.sessions[-1].active:
             self.create_session(label=label, config=config, dest=dest)
@@ -666,3 +726,8 @@ class MlonMcuContextMinimal:
     def __init__(self, context: MlonMcuContext):
         self.environment = context.environment
         self.cache = context.cache
+
+    def __setstate__(self, state):
+        # Restore the result cache in worker processes
+        self.__dict__.update(state)
+        setup_result_cache(self.environment)
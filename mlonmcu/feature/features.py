@@ -681,6 +681,39 @@ class GdbServer(TargetFeature):
         )
 
 
+@register_feature("snapshot")
+class Snapshot(TargetFeature):
+    """Checkpoint the simulator state at a marker symbol (after boot) and restore it for subsequent runs."""
+
+    DEFAULTS = {
+        **FeatureBase.DEFAULTS,
+        "marker": None,
+        "dir": None,
+    }
+
+    def __init__(self, features=None, config=None):
+        super().__init__("snapshot", features=features, config=config)
+
+    @property
+    def marker(self):
+        return self.config["marker"]
+
+    @property
+    def dir(self):
+        return self.config["dir"]
+
+    def get_target_config(self, target):
+        # Spike and ETISS do not provide an interface for saving/restoring the simulator state
+        assert target in ["riscv_qemu"], f"Unsupported feature '{self.name}' for target '{target}'"
+        return filter_none(
+            {
+                f"{target}.snapshot_enable": self.enabled,
+                f"{target}.snapshot_marker": self.marker,
+                f"{target}.snapshot_dir": self.dir,
+            }
+        )
+
+
 @register_feature("etissdbg")
 class ETISSDebug(SetupFeature, TargetFeature):
     """Debug ETISS internals."""
@@ -1224,6 +1257,7 @@ class DisableLegalize(BackendFeature, SetupFeature):
     """Enable transformation to reduces sizes of intermediate buffers by skipping legalization passes."""
 
     REQUIRED = {"tvm_extensions.wrapper"}
+    PATH_CONFIGS = {"tvm_extensions.wrapper"}
 
     def __init__(self, features=None, config=None):
         super().__init__("disable_legalize", features=features, config=config)
@@ -2430,6 +2464,10 @@ class GenData(FrontendFeature):  # TODO: use custom stage instead of LOAD
         "file": "auto",  # Only relevant if fill_mode=file
         "number": 10,  # generate up to number samples (may be less if file has less inputs)
         "fmt": "npy",  # Allowed: npy, npz
+        "dataset": None,  # Only relevant if fill_mode=dataset (npy/npz file or directory, default: model inputs)
+        "seed": None,  # Shuffle dataset samples (deterministic)
+        "num_shards": 1,  # Split dataset samples into shards (e.g. one per run)
+        "shard_index": 0,
     }
 
     def __init__(self, features=None, config=None):
@@ -2456,14 +2494,40 @@ class GenData(FrontendFeature):  # TODO: use custom stage instead of LOAD
         assert value in ["npy", "npz"]
         return value
 
+    @property
+    def dataset(self):
+        value = self.config["dataset"]
+        return value
+
+    @property
+    def seed(self):
+        value = self.config["seed"]
+        return int(value) if value is not None else None
+
+    @property
+    def num_shards(self):
+        value = int(self.config["num_shards"])
+        assert value >= 1
+        return value
+
+    @property
+    def shard_index(self):
+        value = int(self.config["shard_index"])
+        assert 0 <= value < self.num_shards
+        return value
+
     def get_frontend_config(self, frontend):
-        assert frontend in ["tflite"]
+        assert frontend in ["tflite", "onnx", "relay"]
         return {
             f"{frontend}.gen_data": self.enabled,
             f"{frontend}.gen_data_fill_mode": self.fill_mode,
             f"{frontend}.gen_data_file": self.file,
             f"{frontend}.gen_data_number": self.number,
             f"{frontend}.gen_data_fmt": self.fmt,
+            f"{frontend}.gen_data_dataset": self.dataset,
+            f"{frontend}.gen_data_seed": self.seed,
+            f"{frontend}.gen_data_num_shards": self.num_shards,
+            f"{frontend}.gen_data_shard_index": self.shard_index,
         }
 
 
@@ -2499,7 +2563,7 @@ class GenRefData(FrontendFeature):  # TODO: use custom stage instead of LOAD
         return value
 
     def get_frontend_config(self, frontend):
-        assert frontend in ["tflite"]
+        assert frontend in ["tflite", "onnx", "relay"]
         return {
             f"{frontend}.gen_ref_data": self.enabled,
             f"{frontend}.gen_ref_data_mode": self.mode,
@@ -2540,7 +2604,7 @@ class GenRefLabels(FrontendFeature):  # TODO: use custom stage instead of LOAD
         return value
 
     def get_frontend_config(self, frontend):
-        assert frontend in ["tflite"]
+        assert frontend in ["tflite", "onnx", "relay"]
         return {
             f"{frontend}.gen_ref_labels": self.enabled,
             f"{frontend}.gen_ref_labels_mode": self.mode,
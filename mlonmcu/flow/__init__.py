@@ -18,28 +18,10 @@
 #
 """Flow module for frameworks and backend."""
 
-from mlonmcu.flow.tflm.framework import TFLMFramework
-from mlonmcu.flow.tvm.framework import TVMFramework
-from mlonmcu.flow.iree.framework import IREEFramework
+from mlonmcu.utils import LazyRegistry, lazy_exports
 
 # from mlonmcu.flow.none.framework import NoneFramework
 
-from mlonmcu.flow.tflm.backend.tflmc import TFLMCBackend
-from mlonmcu.flow.tflm.backend.tflmi import TFLMIBackend
-
-from mlonmcu.flow.tvm.backend.tvmaot import TVMAOTBackend
-from mlonmcu.flow.tvm.backend.tvmaotplus import TVMAOTPlusBackend
-from mlonmcu.flow.tvm.backend.tvmcg import TVMCGBackend
-from mlonmcu.flow.tvm.backend.tvmllvm import TVMLLVMBackend
-from mlonmcu.flow.tvm.backend.tvmrt import TVMRTBackend
-
-from mlonmcu.flow.iree.backend.ireevmvx import IREEVMVXBackend
-from mlonmcu.flow.iree.backend.ireevmvx_inline import IREEVMVXInlineBackend
-from mlonmcu.flow.iree.backend.ireellvm import IREELLVMBackend
-from mlonmcu.flow.iree.backend.ireellvm_inline import IREELLVMInlineBackend
-from mlonmcu.flow.iree.backend.ireellvmc import IREELLVMCBackend
-from mlonmcu.flow.iree.backend.ireellvmc_inline import IREELLVMCInlineBackend
-
 # from mlonmcu.flow.none.backend.none import NoneBackend
 from .framework import Framework
 from .backend import Backend
@@ -87,43 +69,56 @@ class NoneBackend(Backend):
         pass
 
 
-SUPPORTED_FRAMEWORKS = {
-    "tflm": TFLMFramework,
-    "tvm": TVMFramework,
-    "iree": IREEFramework,
+# Frameworks and backends are only imported when used, as most of them pull in TVM/IREE/TFLite helpers
+_FRAMEWORKS = {
+    "tflm": "mlonmcu.flow.tflm.framework:TFLMFramework",
+    "tvm": "mlonmcu.flow.tvm.framework:TVMFramework",
+    "iree": "mlonmcu.flow.iree.framework:IREEFramework",
     "none": NoneFramework,
 }
 
-SUPPORTED_TFLITE_BACKENDS = {
-    "tflmc": TFLMCBackend,
-    "tflmi": TFLMIBackend,
+_TFLITE_BACKENDS = {
+    "tflmc": "mlonmcu.flow.tflm.backend.tflmc:TFLMCBackend",
+    "tflmi": "mlonmcu.flow.tflm.backend.tflmi:TFLMIBackend",
 }
 
-SUPPORTED_TVM_BACKENDS = {
-    "tvmaot": TVMAOTBackend,
-    "tvmaotplus": TVMAOTPlusBackend,
-    "tvmrt": TVMRTBackend,
-    "tvmcg": TVMCGBackend,
-    "tvmllvm": TVMLLVMBackend,
+_TVM_BACKENDS = {
+    "tvmaot": "mlonmcu.flow.tvm.backend.tvmaot:TVMAOTBackend",
+    "tvmaotplus": "mlonmcu.flow.tvm.backend.tvmaotplus:TVMAOTPlusBackend",
+    "tvmrt": "mlonmcu.flow.tvm.backend.tvmrt:TVMRTBackend",
+    "tvmcg": "mlonmcu.flow.tvm.backend.tvmcg:TVMCGBackend",
+    "tvmllvm": "mlonmcu.flow.tvm.backend.tvmllvm:TVMLLVMBackend",
 }
 
-SUPPORTED_IREE_LLVM_BACKENDS = {
-    "ireellvm": IREELLVMBackend,
-    "ireellvm_inline": IREELLVMInlineBackend,
-    "ireellvmc": IREELLVMCBackend,
-    "ireellvmc_inline": IREELLVMCInlineBackend,
+_IREE_LLVM_BACKENDS = {
+    "ireellvm": "mlonmcu.flow.iree.backend.ireellvm:IREELLVMBackend",
+    "ireellvm_inline": "mlonmcu.flow.iree.backend.ireellvm_inline:IREELLVMInlineBackend",
+    "ireellvmc": "mlonmcu.flow.iree.backend.ireellvmc:IREELLVMCBackend",
+    "ireellvmc_inline": "mlonmcu.flow.iree.backend.ireellvmc_inline:IREELLVMCInlineBackend",
 }
 
-SUPPORTED_IREE_BACKENDS = {
-    "ireevmvx": IREEVMVXBackend,
-    "ireevmvx_inline": IREEVMVXInlineBackend,
-    **SUPPORTED_IREE_LLVM_BACKENDS,
+_IREE_BACKENDS = {
+    "ireevmvx": "mlonmcu.flow.iree.backend.ireevmvx:IREEVMVXBackend",
+    "ireevmvx_inline": "mlonmcu.flow.iree.backend.ireevmvx_inline:IREEVMVXInlineBackend",
+    **_IREE_LLVM_BACKENDS,
 }
 
-SUPPORTED_NONE_BACKENDS = {
+_NONE_BACKENDS = {
     "none": NoneBackend,
 }
 
+SUPPORTED_FRAMEWORKS = LazyRegistry(_FRAMEWORKS)
+
+SUPPORTED_TFLITE_BACKENDS = LazyRegistry(_TFLITE_BACKENDS)
+
+SUPPORTED_TVM_BACKENDS = LazyRegistry(_TVM_BACKENDS)
+
+SUPPORTED_IREE_LLVM_BACKENDS = LazyRegistry(_IREE_LLVM_BACKENDS)
+
+SUPPORTED_IREE_BACKENDS = LazyRegistry(_IREE_BACKENDS)
+
+SUPPORTED_NONE_BACKENDS = LazyRegistry(_NONE_BACKENDS)
+
 SUPPORTED_FRAMEWORK_BACKENDS = {
     "tflm": SUPPORTED_TFLITE_BACKENDS,
     "tvm": SUPPORTED_TVM_BACKENDS,
@@ -131,12 +126,24 @@ SUPPORTED_FRAMEWORK_BACKENDS = {
     "none": SUPPORTED_NONE_BACKENDS,
 }
 
-SUPPORTED_BACKENDS = {
-    **SUPPORTED_TFLITE_BACKENDS,
-    **SUPPORTED_TVM_BACKENDS,
-    **SUPPORTED_IREE_BACKENDS,
-    **SUPPORTED_NONE_BACKENDS,
-}
+SUPPORTED_BACKENDS = LazyRegistry(
+    {
+        **_TFLITE_BACKENDS,
+        **_TVM_BACKENDS,
+        **_IREE_BACKENDS,
+        **_NONE_BACKENDS,
+    }
+)
+
+# Keep the component classes accessible as attributes of this module
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        value.rsplit(":", 1)[1]: value
+        for value in {**_FRAMEWORKS, **_TFLITE_BACKENDS, **_TVM_BACKENDS, **_IREE_BACKENDS}.values()
+        if isinstance(value, str)
+    },
+)
 
 
 def get_available_backend_names():
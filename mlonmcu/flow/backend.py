@@ -92,8 +92,7 @@ class Backend(ABC):
         for name, metrics_ in metrics.items():
             if name == "default":
                 metrics_.add("Build Stage Time [s]", diff, True)
-            content = metrics_.to_csv(include_optional=True)  # TODO: store df instead?
-            artifact = Artifact("build_metrics.csv", content=content, fmt=ArtifactFormat.TEXT, flags=["metrics"])
+            artifact = metrics_.to_artifact("build_metrics.csv")
             if name not in artifacts:
                 artifacts[name] = []
             artifacts[name].append(artifact)
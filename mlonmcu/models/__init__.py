@@ -16,60 +16,41 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+from mlonmcu.utils import LazyRegistry, lazy_exports
 from mlonmcu.models.lookup import print_summary
-from .frontend import (
-    PBFrontend,
-    TfLiteFrontend,
-    PackedFrontend,
-    ONNXFrontend,
-    MLIRFrontend,
-    RelayFrontend,
-    PaddleFrontend,
-    ExampleFrontend,
-    EmbenchFrontend,  # 1.0
-    EmbenchIoTFrontend,  # 2.0
-    EmbenchDSPFrontend,
-    TaclebenchFrontend,
-    PolybenchFrontend,
-    CoremarkFrontend,
-    DhrystoneFrontend,
-    MathisFrontend,
-    MibenchFrontend,
-    LayerGenFrontend,
-    OpenASIPFrontend,
-    RVVBenchFrontend,
-    ISSBenchFrontend,
-    CryptoBenchFrontend,
-    CmsisDSPFrontend,
-    CmsisNNFrontend,
-)
 
-SUPPORTED_FRONTENDS = {
-    "tflite": TfLiteFrontend,
-    "relay": RelayFrontend,
-    "packed": PackedFrontend,
-    "onnx": ONNXFrontend,
-    "mlir": MLIRFrontend,
-    "pb": PBFrontend,
-    "paddle": PaddleFrontend,
-    "example": ExampleFrontend,
-    "embench": EmbenchFrontend,
-    "embench_iot": EmbenchIoTFrontend,
-    "embench_dsp": EmbenchDSPFrontend,
-    "taclebench": TaclebenchFrontend,
-    "coremark": CoremarkFrontend,
-    "dhrystone": DhrystoneFrontend,
-    "polybench": PolybenchFrontend,
-    "mathis": MathisFrontend,
-    "mibench": MibenchFrontend,
-    "layergen": LayerGenFrontend,
-    "openasip": OpenASIPFrontend,
-    "rvv_bench": RVVBenchFrontend,
-    "iss_bench": ISSBenchFrontend,
-    "crypto_bench": CryptoBenchFrontend,
-    "cmsis_dsp": CmsisDSPFrontend,
-    "cmsis_nn": CmsisNNFrontend,
-}  # TODO: use registry instead
+# The frontends are only imported when used (numpy, model parsers,...)
+_FRONTENDS = {
+    "tflite": "mlonmcu.models.frontend:TfLiteFrontend",
+    "relay": "mlonmcu.models.frontend:RelayFrontend",
+    "packed": "mlonmcu.models.frontend:PackedFrontend",
+    "onnx": "mlonmcu.models.frontend:ONNXFrontend",
+    "mlir": "mlonmcu.models.frontend:MLIRFrontend",
+    "pb": "mlonmcu.models.frontend:PBFrontend",
+    "paddle": "mlonmcu.models.frontend:PaddleFrontend",
+    "example": "mlonmcu.models.frontend:ExampleFrontend",
+    "embench": "mlonmcu.models.frontend:EmbenchFrontend",
+    "embench_iot": "mlonmcu.models.frontend:EmbenchIoTFrontend",
+    "embench_dsp": "mlonmcu.models.frontend:EmbenchDSPFrontend",
+    "taclebench": "mlonmcu.models.frontend:TaclebenchFrontend",
+    "coremark": "mlonmcu.models.frontend:CoremarkFrontend",
+    "dhrystone": "mlonmcu.models.frontend:DhrystoneFrontend",
+    "polybench": "mlonmcu.models.frontend:PolybenchFrontend",
+    "mathis": "mlonmcu.models.frontend:MathisFrontend",
+    "mibench": "mlonmcu.models.frontend:MibenchFrontend",
+    "layergen": "mlonmcu.models.frontend:LayerGenFrontend",
+    "openasip": "mlonmcu.models.frontend:OpenASIPFrontend",
+    "rvv_bench": "mlonmcu.models.frontend:RVVBenchFrontend",
+    "iss_bench": "mlonmcu.models.frontend:ISSBenchFrontend",
+    "crypto_bench": "mlonmcu.models.frontend:CryptoBenchFrontend",
+    "cmsis_dsp": "mlonmcu.models.frontend:CmsisDSPFrontend",
+    "cmsis_nn": "mlonmcu.models.frontend:CmsisNNFrontend",
+}
+
+SUPPORTED_FRONTENDS = LazyRegistry(_FRONTENDS)
+
+# Keep the frontend classes accessible as attributes of this module
+__getattr__ = lazy_exports(__name__, {value.split(":")[1]: value for value in _FRONTENDS.values()})
 
 __all__ = [
     "print_summary",
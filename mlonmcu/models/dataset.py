@@ -0,0 +1,243 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Loading of local datasets for the gen_data feature (fill_mode=dataset).
+
+Supported layouts:
+- a single .npy file (first axis: samples), memory-mapped
+- a single .npz file with one array per input (by name or in input order, first axis: samples)
+- a directory of per-sample .npy or image files, named <i>.<ext> or <i>_<input_idx>.<ext>
+  (other names are enumerated in sorted order)
+"""
+import re
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+
+from mlonmcu.cache import ResultCache, hash_content, hash_file
+from mlonmcu.logging import get_logger
+
+logger = get_logger()
+
+IMAGE_EXTS = [".png", ".jpg", ".jpeg", ".bmp", ".pgm", ".ppm"]
+SAMPLE_EXTS = [".npy", *IMAGE_EXTS]
+
+# Preprocessed (resized/quantized) samples keyed by the content hash of the sample and the input spec
+DATASET_CACHE = ResultCache("dataset_inputs", max_entries=1024)
+
+
+def select_indices(num_total: int, number: Optional[int] = None, seed=None, num_shards: int = 1, shard_index: int = 0):
+    """Deterministically pick the sample indices used by a run.
+
+    The samples are shuffled if a seed is given and split into num_shards interleaved shards,
+    allowing to spread a large dataset over several runs without overlap.
+    """
+    assert num_shards >= 1
+    assert 0 <= shard_index < num_shards, f"Invalid shard index: {shard_index} (num_shards={num_shards})"
+    if seed is None:
+        indices = np.arange(num_total)
+    else:
+        indices = np.random.default_rng(int(seed)).permutation(num_total)
+    indices = indices[shard_index::num_shards]
+    if number is not None:
+        indices = indices[:number]
+    return indices.tolist()
+
+
+def _parse_sample_name(stem):
+    match = re.match(r"^(\d+)(?:_(\d+))?$", stem)
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2) or 0)
+
+
+class Dataset:
+    """Lazy view on a local dataset. Samples are only loaded on access."""
+
+    def __init__(self, path: Union[str, Path], input_names):
+        self.path = Path(path)
+        self.input_names = list(input_names)
+        self.arrays = None  # input_idx -> array with first axis: sample
+        self.files = None  # sample_idx -> {input_idx: file}
+        if self.path.is_dir():
+            self._scan_dir()
+        elif self.path.suffix == ".npy":
+            arr = np.load(self.path, mmap_mode="r", allow_pickle=False)
+            self.arrays = {0: arr}
+        elif self.path.suffix == ".npz":
+            npz = np.load(self.path, allow_pickle=False)  # members are only read on access
+            arrays = {}
+            for ii, input_name in enumerate(self.input_names):
+                if input_name in npz.files:
+                    arrays[ii] = npz[input_name]
+                elif ii < len(npz.files):  # fallback for index-based keys
+                    arrays[ii] = npz[npz.files[ii]]
+            self.arrays = arrays
+        else:
+            raise RuntimeError(f"Unsupported dataset: {self.path}")
+        if self.arrays is not None:
+            lengths = set(len(arr) for arr in self.arrays.values())
+            assert len(lengths) == 1, "Number of samples differs between inputs"
+
+    def _scan_dir(self):
+        files = sorted(file for file in self.path.iterdir() if file.is_file() and file.suffix.lower() in SAMPLE_EXTS)
+        assert len(files) > 0, f"No samples found in dataset directory: {self.path}"
+        parsed = [_parse_sample_name(file.stem) for file in files]
+        temp = {}
+        if all(p is not None for p in parsed):
+            for file, (i, ii) in zip(files, parsed):
+                temp.setdefault(i, {})[ii] = file
+        else:
+            temp = {i: {0: file} for i, file in enumerate(files)}
+        # sample indices do not need to be contiguous
+        self.files = [temp[i] for i in sorted(temp)]
+
+    def __len__(self):
+        if self.arrays is not None:
+            return len(next(iter(self.arrays.values())))
+        return len(self.files)
+
+    def sample_key(self, idx: int, ii: int):
+        """Content hash of a single input of a sample."""
+        if self.arrays is not None:
+            arr = np.ascontiguousarray(self.arrays[ii][idx])
+            return hash_content(f"{arr.dtype.str}{arr.shape}".encode() + arr.tobytes())
+        return hash_file(self.files[idx][ii])
+
+    def load(self, idx: int, ii: int):
+        """Return the raw data for a single input of a sample."""
+        if self.arrays is not None:
+            assert ii in self.arrays, f"Missing input in dataset: {self.input_names[ii]}"
+            return np.asarray(self.arrays[ii][idx])
+        assert ii in self.files[idx], f"Missing input {ii} for sample {idx} in dataset"
+        file = self.files[idx][ii]
+        if file.suffix == ".npy":
+            return np.load(file, mmap_mode="r", allow_pickle=False)
+        return load_image(file)
+
+
+def load_image(file):
+    """Load an image file as (H, W, C) uint8 array."""
+    try:
+        from PIL import Image
+    except ImportError as err:
+        raise RuntimeError("Loading image datasets requires the pillow package") from err
+    with Image.open(file) as img:
+        arr = np.array(img)
+    if arr.ndim == 2:
+        arr = arr[..., np.newaxis]
+    return arr
+
+
+def _resize_image(arr, shape):
+    # Find the layout of the image input (NHWC or NCHW)
+    if len(shape) >= 3 and shape[-1] in [1, 3, 4]:
+        height, width, channels, channels_first = shape[-3], shape[-2], shape[-1], False
+    elif len(shape) >= 3 and shape[-3] in [1, 3, 4]:
+        channels, height, width, channels_first = shape[-3], shape[-2], shape[-1], True
+    else:
+        raise RuntimeError(f"Unsupported shape for image inputs: {shape}")
+    from PIL import Image
+
+    mode = {1: "L", 3: "RGB", 4: "RGBA"}[channels]
+    img = Image.fromarray(arr[..., 0] if arr.shape[-1] == 1 else arr).convert(mode)
+    if img.size != (width, height):
+        img = img.resize((width, height), Image.BILINEAR)
+    ret = np.array(img)
+    if ret.ndim == 2:
+        ret = ret[..., np.newaxis]
+    if channels_first:
+        ret = np.transpose(ret, (2, 0, 1))
+    return ret
+
+
+def prepare_input(arr, dtype: str, shape, quant=None, rng=None, image: bool = False):
+    """Convert a raw dataset sample to the model input (resize, scale, clip, quantize)."""
+    gen_dtype = dtype
+    qrng = None
+    if quant and not quant[0]:
+        quant = None  # Not quantized (e.g. [0.0, 0, "float32"] extracted from tflite models)
+    if quant:
+        scale, shift, gen_dtype = quant[:3]
+        qrng = quant[3] if len(quant) > 3 else None  # The range is optional
+    if image:
+        arr = _resize_image(arr, shape)
+        lower_upper = qrng if quant else rng
+        if "float" in gen_dtype and lower_upper:
+            # map pixel values [0, 255] to the expected input range
+            lower, upper = lower_upper
+            arr = arr.astype("float32") / 255.0 * (upper - lower) + lower
+    arr = np.reshape(np.asarray(arr), shape).astype(gen_dtype)
+    if quant:
+        if qrng is not None:
+            assert len(qrng) == 2, "Range should be a tuple (lower, upper)"
+            arr = np.clip(arr, *qrng)
+        arr = np.around((arr / scale) + shift)
+        if "int" in dtype:
+            info = np.iinfo(dtype)
+            arr = np.clip(arr, info.min, info.max)
+        arr = arr.astype(dtype)
+    if rng is not None:
+        assert len(rng) == 2, "Range should be a tuple (lower, upper)"
+        lower, upper = rng
+        assert lower <= upper
+        arr = np.clip(arr, lower, upper)
+    return arr
+
+
+def load_dataset_inputs(
+    path,
+    input_names,
+    input_types,
+    input_shapes,
+    input_ranges,
+    input_quant_details,
+    number: Optional[int] = None,
+    seed=None,
+    num_shards: int = 1,
+    shard_index: int = 0,
+    use_cache: bool = True,
+):
+    """Return the (preprocessed) input samples of a dataset as list of dicts (input name -> array)."""
+    dataset = Dataset(path, input_names)
+    indices = select_indices(len(dataset), number=number, seed=seed, num_shards=num_shards, shard_index=shard_index)
+    logger.debug("Using %d samples of dataset %s", len(indices), path)
+    inputs_data = []
+    for idx in indices:
+        data = {}
+        for ii, input_name in enumerate(input_names):
+            assert input_name in input_types, f"Unknown dtype for input: {input_name}"
+            assert input_name in input_shapes, f"Unknown shape for input: {input_name}"
+            dtype = input_types[input_name]
+            shape = input_shapes[input_name]
+            quant = input_quant_details.get(input_name, None)
+            rng = input_ranges.get(input_name, None)
+            image = dataset.files is not None and dataset.files[idx].get(ii, Path()).suffix.lower() in IMAGE_EXTS
+
+            def _helper():
+                return prepare_input(dataset.load(idx, ii), dtype, shape, quant=quant, rng=rng, image=image)
+
+            if use_cache:
+                key = hash_content(f"{dataset.sample_key(idx, ii)};{dtype};{shape};{quant};{rng};{image}")
+                arr = DATASET_CACHE.lookup(key, _helper)
+            else:
+                arr = _helper()
+            data[input_name] = arr
+        inputs_data.append(data)
+    return inputs_data
@@ -18,6 +18,7 @@
 #
 import re
 import time
+import hashlib
 import tempfile
 import multiprocessing
 from pathlib import Path
@@ -49,9 +50,12 @@ from mlonmcu.models.model import (
     CmsisNNProgram,
 )
 from mlonmcu.models.lookup import lookup_models
+from mlonmcu.models.model_info import get_tflite_model_details, get_relay_model_info, get_onnx_model_info
+from mlonmcu.models.dataset import load_dataset_inputs
 from mlonmcu.feature.type import FeatureType
 from mlonmcu.config import filter_config, str2bool
 from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.cache import ResultCache, hash_content, hash_file
 from mlonmcu.setup import utils
 from mlonmcu.target.metrics import Metrics
 
@@ -60,6 +64,50 @@ from mlonmcu.logging import get_logger
 
 logger = get_logger()
 
+# Reference outputs by (frontend, model hash, inputs hash)
+REF_OUTPUTS_CACHE = ResultCache("ref_outputs")
+
+
+def hash_inputs(inputs_data):
+    """Content hash of a list of input samples (dicts of input name -> array)."""
+    sha = hashlib.sha256()
+    for input_data in inputs_data:
+        for name, arr in input_data.items():
+            arr = np.ascontiguousarray(arr)
+            sha.update(f"{name};{arr.dtype.str};{arr.shape};".encode())
+            sha.update(arr.tobytes())
+    return sha.hexdigest()
+
+
+def dequantize_outputs(outputs_data, output_quant_details):
+    """Dequantize (integer) outputs for which quantization details are known."""
+    if not output_quant_details:
+        return outputs_data
+    ret = []
+    for output_data in outputs_data:
+        output_data = dict(output_data)
+        for name, arr in output_data.items():
+            quant = output_quant_details.get(name, None)
+            if not quant or quant[2] is None or arr.dtype.name == quant[2] or "int" not in arr.dtype.name:
+                continue
+            scale, zero_point = quant[:2]
+            if not scale:  # Not quantized (e.g. [0.0, 0, "float32"] extracted from tflite models)
+                continue
+            output_data[name] = ((arr.astype("float32") - zero_point) * scale).astype(quant[2])
+        ret.append(output_data)
+    return ret
+
+
+def get_model_info_details(model_info):
+    """Convert a ModelInfo into the tuple returned by Frontend.extract_model_info (no quantization details)."""
+    ret = []
+    for tensors in [model_info.in_tensors, model_info.out_tensors]:
+        names = [t.name for t in tensors]
+        shapes = {t.name: list(t.shape) for t in tensors}
+        types = {t.name: t.dtype for t in tensors}
+        ret.extend([names, shapes, types, {}])
+    return tuple(ret)
+
 
 def check_integrity(algorithm: str, value: str, file_path: Union[str, Path], check: bool = True):
     import hashlib
@@ -88,6 +136,10 @@ class Frontend(ABC):
         "gen_data_file": None,
         "gen_data_number": None,
         "gen_data_fmt": None,
+        "gen_data_dataset": None,
+        "gen_data_seed": None,
+        "gen_data_num_shards": 1,
+        "gen_data_shard_index": 0,
         # the following should be configured using gen_ref_data feature
         "gen_ref_data": False,
         "gen_ref_data_mode": None,
@@ -150,6 +202,23 @@ class Frontend(ABC):
         assert value in ["npy", "npz"]
         return value
 
+    @property
+    def gen_data_dataset(self):
+        return self.config["gen_data_dataset"]
+
+    @property
+    def gen_data_seed(self):
+        value = self.config["gen_data_seed"]
+        return int(value) if value is not None else None
+
+    @property
+    def gen_data_num_shards(self):
+        return int(self.config["gen_data_num_shards"])
+
+    @property
+    def gen_data_shard_index(self):
+        return int(self.config["gen_data_shard_index"])
+
     @property
     def gen_ref_data(self):
         value = self.config["gen_ref_data"]
@@ -192,9 +261,30 @@ class Frontend(ABC):
         assert value in ["npy", "npz", "txt", "csv"]
         return value
 
-    def inference(self, model: Model, input_data: Dict[str, np.array]):
+    def inference(self, model: Model, input_data: Dict[str, np.array], quant=False, dequant=False):
+        return self.inference_batch(model, [input_data], quant=quant, dequant=dequant)[0]
+
+    def inference_batch(self, model: Model, inputs_data: List[Dict[str, np.array]], quant=False, dequant=False):
+        """Run the reference inference for all samples, reusing the same interpreter/session."""
         raise NotImplementedError
 
+    def get_ref_outputs(self, model: Model, inputs_data: List[Dict[str, np.array]], output_quant_details=None):
+        """Return the (dequantized) reference outputs for all samples.
+
+        Results are cached by the model and input data hashes, hence labels and reference outputs
+        only require a single inference pass and repeated runs skip it entirely.
+        """
+        model_hashes = [hash_file(path) for path in model.paths]
+        digest = hash_content(
+            ";".join([self.name, *model_hashes, hash_inputs(inputs_data), str(output_quant_details)])
+        )
+
+        def _helper():
+            outputs_data = self.inference_batch(model, inputs_data, quant=False, dequant=True)
+            return dequantize_outputs(outputs_data, output_quant_details)
+
+        return REF_OUTPUTS_CACHE.lookup(digest, _helper)
+
     def extract_model_info(self, model: Model):
         raise NotImplementedError
 
@@ -419,7 +509,24 @@ class Frontend(ABC):
             # for i, input_name in enumerate(input_names):
 
         elif self.gen_data_fill_mode == "dataset":
-            raise NotImplementedError
+            if self.gen_data_dataset is not None:
+                dataset = Path(self.gen_data_dataset)
+            else:
+                assert len(in_paths) == 1, "Please provide the gen_data.dataset path"
+                dataset = Path(in_paths[0])
+            assert dataset.exists(), f"Dataset not found: {dataset}"
+            inputs_data = load_dataset_inputs(
+                dataset,
+                input_names,
+                input_types,
+                input_shapes,
+                input_ranges,
+                input_quant_details,
+                number=self.gen_data_number,
+                seed=self.gen_data_seed,
+                num_shards=self.gen_data_num_shards,
+                shard_index=self.gen_data_shard_index,
+            )
         else:
             raise RuntimeError(f"unsupported fill_mode: {self.gen_data_fill_mode}")
         return inputs_data
@@ -431,11 +538,7 @@ class Frontend(ABC):
         outputs_data = []
         if self.gen_ref_data_mode == "model":
             assert len(inputs_data) > 0
-            for i, input_data in enumerate(inputs_data):
-                # input("321?")
-                output_data = self.inference(model, input_data, quant=False, dequant=True)
-                outputs_data.append(output_data)
-                # input("321!")
+            outputs_data = self.get_ref_outputs(model, inputs_data, output_quant_details)
 
         elif self.gen_ref_data_mode == "file":
             if self.gen_ref_data_file == "auto":
@@ -505,8 +608,7 @@ class Frontend(ABC):
         labels = []
         if self.gen_ref_labels_mode == "model":
             assert len(inputs_data) > 0
-            for i, input_data in enumerate(inputs_data):
-                output_data = self.inference(model, input_data, quant=False, dequant=True)
+            for output_data in self.get_ref_outputs(model, inputs_data, output_quant_details):
                 assert len(output_data) == 1, "Does not support multi-output classification"
                 output_data = output_data[list(output_data)[0]]
                 top_label = np.argmax(output_data)
@@ -623,7 +725,11 @@ class Frontend(ABC):
                     quant_details = [quant_scale, quant_zero_shift, quant_dtype, quant_range]
                     input_quant_details[name] = quant_details
                 if self.use_inout_data or (
-                    self.gen_data and self.gen_data_fill_mode == "file" and self.gen_data_file == "auto"
+                    self.gen_data
+                    and (
+                        (self.gen_data_fill_mode == "file" and self.gen_data_file == "auto")
+                        or (self.gen_data_fill_mode == "dataset" and self.gen_data_dataset is None)
+                    )
                 ):
                     if "example_input" in inp and "path" in inp["example_input"]:
                         in_data_dir = Path(inp["example_input"]["path"])
@@ -882,8 +988,7 @@ class Frontend(ABC):
         for name, metrics_ in metrics.items():
             if name == "default":
                 metrics_.add("Load Stage Time [s]", diff, True)
-            content = metrics_.to_csv(include_optional=True)
-            artifact = Artifact("load_metrics.csv", content=content, fmt=ArtifactFormat.TEXT, flags=["metrics"])
+            artifact = metrics_.to_artifact("load_metrics.csv")
             if name not in artifacts:
                 artifacts[name] = []
             artifacts[name].append(artifact)
@@ -1032,50 +1137,17 @@ class TfLiteFrontend(SimpleFrontend):
         return self.config["analyze_script"]
 
     def extract_model_info(self, model: Model):
-        import tensorflow as tf
-
         model_path = str(model.paths[0])
-        interpreter = tf.lite.Interpreter(model_path=model_path)
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
-        input_names = []
-        input_shapes = {}
-        input_types = {}
-        input_quant_details = {}
-        output_names = []
-        output_shapes = {}
-        output_types = {}
-        output_quant_details = {}
-        for inp in input_details:
-            name = str(inp["name"])
-            input_names.append(name)
-            input_shapes[name] = inp["shape"].tolist()
-            input_types[name] = np.dtype(inp["dtype"]).name
-            if "quantization" in inp:
-                scale, zero_point = inp["quantization"]
-                quant = [scale, zero_point, "float32"]
-                input_quant_details[name] = quant
-        for outp in output_details:
-            name = str(outp["name"])
-            output_names.append(name)
-            output_shapes[name] = outp["shape"].tolist()
-            output_types[name] = np.dtype(outp["dtype"]).name
-            if "quantization" in outp:
-                scale, zero_point = outp["quantization"]
-                quant = [scale, zero_point, "float32"]
-                output_quant_details[name] = quant
-        return (
-            input_names,
-            input_shapes,
-            input_types,
-            input_quant_details,
-            output_names,
-            output_shapes,
-            output_types,
-            output_quant_details,
-        )
+        with open(model_path, "rb") as handle:
+            model_buf = handle.read()
+        return get_tflite_model_details(model_buf)
 
     def inference(self, model: Model, input_data: Dict[str, np.array], quant=False, dequant=False, verbose=False):
+        return self.inference_batch(model, [input_data], quant=quant, dequant=dequant, verbose=verbose)[0]
+
+    def inference_batch(
+        self, model: Model, inputs_data: List[Dict[str, np.array]], quant=False, dequant=False, verbose=False
+    ):
         import tensorflow as tf
 
         model_path = str(model.paths[0])
@@ -1095,39 +1167,43 @@ class TfLiteFrontend(SimpleFrontend):
         input_type = input_details[0]["dtype"]
         input_name = input_details[0]["name"]
         input_shape = input_details[0]["shape"]
-        assert input_name in input_data, f"Input {input_name} fot found in data"
-        np_features = input_data[input_name]
-        if quant and input_type == np.int8:
-            input_scale, input_zero_point = input_details[0]["quantization"]
-            if verbose:
-                print("Input scale:", input_scale)
-                print("Input zero point:", input_zero_point)
-                print()
-            np_features = (np_features / input_scale) + input_zero_point
-            np_features = np.around(np_features)
-        np_features = np_features.astype(input_type)
-        np_features = np_features.reshape(input_shape)
-        interpreter.set_tensor(input_details[0]["index"], np_features)
-        interpreter.invoke()
-        output = interpreter.get_tensor(output_details[0]["index"])
-
         # If the output type is int8 (quantized model), rescale data
         assert len(output_details) == 1, "Multi-outputs not yet supported"
         output_type = output_details[0]["dtype"]
         output_name = output_details[0]["name"]
-        if dequant and output_type == np.int8:
-            output_scale, output_zero_point = output_details[0]["quantization"]
-            if verbose:
-                print("Raw output scores:", output)
-                print("Output scale:", output_scale)
-                print("Output zero point:", output_zero_point)
-                print()
-            output = output_scale * (output.astype(np.float32) - output_zero_point)
+        outputs_data = []
+        # The interpreter is only allocated once for all samples
+        for input_data in inputs_data:
+            assert input_name in input_data, f"Input {input_name} fot found in data"
+            np_features = input_data[input_name]
+            if quant and input_type == np.int8:
+                input_scale, input_zero_point = input_details[0]["quantization"]
+                if verbose:
+                    print("Input scale:", input_scale)
+                    print("Input zero point:", input_zero_point)
+                    print()
+                np_features = (np_features / input_scale) + input_zero_point
+                np_features = np.around(np_features)
+            np_features = np_features.astype(input_type)
+            np_features = np_features.reshape(input_shape)
+            interpreter.set_tensor(input_details[0]["index"], np_features)
+            interpreter.invoke()
+            output = interpreter.get_tensor(output_details[0]["index"])
+
+            if dequant and output_type == np.int8:
+                output_scale, output_zero_point = output_details[0]["quantization"]
+                if verbose:
+                    print("Raw output scores:", output)
+                    print("Output scale:", output_scale)
+                    print("Output zero point:", output_zero_point)
+                    print()
+                output = output_scale * (output.astype(np.float32) - output_zero_point)
 
-        if verbose:
-            # Print the results of inference
-            print("Inference output:", output, type(output))
-        return {output_name: output}
+            if verbose:
+                # Print the results of inference
+                print("Inference output:", output, type(output))
+            outputs_data.append({output_name: output})
+        return outputs_data
 
     def produce_artifacts(self, model):
         assert len(self.input_formats) == len(model.paths) == 1
@@ -1272,7 +1348,7 @@ class TfLiteFrontend(SimpleFrontend):
 
 
 class RelayFrontend(SimpleFrontend):
-    FEATURES = Frontend.FEATURES | {"relayviz"}
+    FEATURES = Frontend.FEATURES | {"relayviz", "gen_data", "gen_ref_data", "gen_ref_labels"}
 
     DEFAULTS = {**Frontend.DEFAULTS, "visualize_graph": False, "relayviz_plotter": "term"}
 
@@ -1303,6 +1379,38 @@ class RelayFrontend(SimpleFrontend):
     def tvm_pythonpath(self):
         return self.config["tvm.pythonpath"]
 
+    def extract_model_info(self, model: Model):
+        with open(model.paths[0], "r", encoding="utf-8") as handle:
+            mod_text = handle.read()
+        return get_model_info_details(get_relay_model_info(mod_text))
+
+    def inference_batch(self, model: Model, inputs_data: List[Dict[str, np.array]], quant=False, dequant=False):
+        import sys
+        import os
+
+        if str(self.tvm_pythonpath) not in sys.path:
+            sys.path.append(str(self.tvm_pythonpath))
+        os.environ.setdefault("TVM_LIBRARY_PATH", str(self.tvm_build_dir))
+        import tvm
+        from tvm import relay, parser
+        from tvm.contrib import graph_executor
+
+        with open(model.paths[0], "r", encoding="utf-8") as handle:
+            mod_text = handle.read()
+        output_names = [t.name for t in get_relay_model_info(mod_text).out_tensors]
+        mod = parser.fromtext(mod_text)
+        # The graph is only compiled once for all samples
+        with tvm.transform.PassContext(opt_level=3):
+            lib = relay.build(mod, target="llvm")
+        executor = graph_executor.GraphModule(lib["default"](tvm.cpu()))
+        outputs_data = []
+        for input_data in inputs_data:
+            for name, arr in input_data.items():
+                executor.set_input(name, arr)
+            executor.run()
+            outputs_data.append({name: executor.get_output(i).numpy() for i, name in enumerate(output_names)})
+        return outputs_data
+
     def produce_artifacts(self, model):
         assert len(self.input_formats) == len(model.paths) == 1
         artifacts = []
@@ -1497,6 +1605,8 @@ class PackedFrontend(Frontend):  # Inherit from TFLiteFrontend? -> how to do con
 
 
 class ONNXFrontend(SimpleFrontend):
+    FEATURES = Frontend.FEATURES | {"gen_data", "gen_ref_data", "gen_ref_labels"}
+
     def __init__(self, features=None, config=None):
         super().__init__(
             "onnx",
@@ -1505,6 +1615,40 @@ class ONNXFrontend(SimpleFrontend):
             config=config,
         )
 
+    def extract_model_info(self, model: Model):
+        return get_model_info_details(get_onnx_model_info(model.paths[0]))
+
+    def inference_batch(self, model: Model, inputs_data: List[Dict[str, np.array]], quant=False, dequant=False):
+        import onnxruntime as ort
+
+        type_lookup = {
+            "tensor(float)": "float32",
+            "tensor(uint8)": "uint8",
+            "tensor(int8)": "int8",
+            "tensor(int32)": "int32",
+            "tensor(int64)": "int64",
+        }
+        # A single session is used for all samples
+        session = ort.InferenceSession(str(model.paths[0]), providers=["CPUExecutionProvider"])
+        inputs = session.get_inputs()
+        # Output names as used by ONNXModelInfo
+        num_outputs = len(session.get_outputs())
+        output_names = ["output"] if num_outputs == 1 else [f"output{i}" for i in range(num_outputs)]
+        outputs_data = []
+        for input_data in inputs_data:
+            feed = {}
+            for i, inp in enumerate(inputs):
+                if inp.name in input_data:
+                    arr = input_data[inp.name]
+                else:  # fallback for index-based lookup
+                    assert i < len(input_data), f"Input {inp.name} not found in data"
+                    arr = list(input_data.values())[i]
+                dtype = type_lookup.get(inp.type, None)
+                feed[inp.name] = np.asarray(arr).astype(dtype) if dtype else arr
+            results = session.run(None, feed)
+            outputs_data.append(dict(zip(output_names, results)))
+        return outputs_data
+
 
 class MLIRFrontend(SimpleFrontend):
     def __init__(self, features=None, config=None):
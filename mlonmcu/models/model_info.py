@@ -19,8 +19,20 @@
 import re
 import os
 
+from mlonmcu.cache import ResultCache, hash_content, hash_file
 from mlonmcu.models.model import ModelFormats
 
+# Parsed model infos by model content hash
+MODEL_INFO_CACHE = ResultCache("model_info", version=1)
+
+
+def cached_model_info(kind, digest, func):
+    """Lookup the result of func in the model info cache by the models content hash.
+
+    The parsing is only performed once for every model, regardless of the number of runs using it.
+    """
+    return MODEL_INFO_CACHE.lookup(f"{kind}_{digest}", func)
+
 
 def parse_mlir_signature(mlir_text):
 
@@ -423,37 +435,73 @@ class MLIRModelInfo(ModelInfo):
 
 
 def get_tflite_model_info(model_buf):
-    # Local imports to get rid of tflite dependency for non-tflite models
-    import tflite
+    def _helper():
+        # Local imports to get rid of tflite dependency for non-tflite models
+        import tflite
+
+        # The flatbuffer is accessed lazily, only the graph inputs and outputs are touched
+        tflite_model = tflite.Model.GetRootAsModel(model_buf, 0)
+        return TfLiteModelInfo(tflite_model)
+
+    return cached_model_info("tflite", hash_content(model_buf), _helper)
+
+
+def get_tflite_model_details(model_buf):
+    """Extract names, shapes, types and quantization details of the graph inputs and outputs of a TFLite model.
+
+    In contrast to instantiating a TFLite interpreter, this only parses the required fields of the flatbuffer.
+    """
+
+    def _helper():
+        # Local imports to get rid of tflite dependency for non-tflite models
+        import tflite
+        from tflite.TensorType import TensorType as TType
+
+        type_lookup = {value: key.lower() for key, value in vars(TType).items() if not key.startswith("_")}
+        tflite_model = tflite.Model.GetRootAsModel(model_buf, 0)
+        assert tflite_model.SubgraphsLength() >= 1
+        g = tflite_model.Subgraphs(0)
+
+        def _process(indices):
+            names, shapes, types, quant_details = [], {}, {}, {}
+            for idx in indices:
+                t = g.Tensors(idx)
+                name = t.Name().decode()
+                names.append(name)
+                shapes[name] = [int(t.Shape(i)) for i in range(t.ShapeLength())]
+                types[name] = type_lookup[t.Type()]
+                q = t.Quantization()
+                if q is not None and q.ScaleLength() > 0 and q.ZeroPointLength() > 0:
+                    quant_details[name] = [float(q.Scale(0)), int(q.ZeroPoint(0)), "float32"]
+                else:
+                    quant_details[name] = [0.0, 0, "float32"]
+            return names, shapes, types, quant_details
+
+        ins = _process([g.Inputs(i) for i in range(g.InputsLength())])
+        outs = _process([g.Outputs(i) for i in range(g.OutputsLength())])
+        return (*ins, *outs)
 
-    tflite_model = tflite.Model.GetRootAsModel(model_buf, 0)
-    model_info = TfLiteModelInfo(tflite_model)
-    return model_info
+    return cached_model_info("tflite_details", hash_content(model_buf), _helper)
 
 
 def get_relay_model_info(mod_text):
-    model_info = RelayModelInfo(mod_text)
-    return model_info
+    return cached_model_info("relay", hash_content(mod_text), lambda: RelayModelInfo(mod_text))
 
 
 def get_mlir_model_info(mod_text):
-    model_info = MLIRModelInfo(mod_text)
-    return model_info
+    return cached_model_info("mlir", hash_content(mod_text), lambda: MLIRModelInfo(mod_text))
 
 
 def get_pb_model_info(model_file):
-    model_info = PBModelInfo(model_file)
-    return model_info
+    return cached_model_info("pb", hash_file(model_file), lambda: PBModelInfo(model_file))
 
 
 def get_paddle_model_info(model_file):
-    model_info = PaddleModelInfo(model_file)
-    return model_info
+    return cached_model_info("paddle", hash_file(model_file), lambda: PaddleModelInfo(model_file))
 
 
 def get_onnx_model_info(model_file):
-    model_info = ONNXModelInfo(model_file)
-    return model_info
+    return cached_model_info("onnx", hash_file(model_file), lambda: ONNXModelInfo(model_file))
 
 
 def get_model_info(model, backend_name="unknown"):
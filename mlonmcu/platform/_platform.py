@@ -16,16 +16,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from .mlif import MlifPlatform
-from .espidf import EspIdfPlatform
-from .zephyr import ZephyrPlatform
-from .tvm import TvmPlatform
-from .microtvm import MicroTvmPlatform
+from mlonmcu.utils import LazyRegistry
 
 # from .arduino import ArduinoPlatform
 
-
-PLATFORM_REGISTRY = {}
+# Platforms are only imported when used
+PLATFORM_REGISTRY = LazyRegistry(
+    {
+        "mlif": "mlonmcu.platform.mlif.mlif:MlifPlatform",
+        "espidf": "mlonmcu.platform.espidf.espidf:EspIdfPlatform",
+        "zephyr": "mlonmcu.platform.zephyr.zephyr:ZephyrPlatform",
+        "tvm": "mlonmcu.platform.tvm.tvm:TvmPlatform",
+        "microtvm": "mlonmcu.platform.microtvm.microtvm:MicroTvmPlatform",
+    }
+)
 
 
 def register_platform(platform_name, p, override=False):
@@ -38,10 +42,3 @@ def register_platform(platform_name, p, override=False):
 
 def get_platforms():
     return PLATFORM_REGISTRY
-
-
-register_platform("mlif", MlifPlatform)
-register_platform("espidf", EspIdfPlatform)
-register_platform("zephyr", ZephyrPlatform)
-register_platform("tvm", TvmPlatform)
-register_platform("microtvm", MicroTvmPlatform)
@@ -37,6 +37,7 @@ class EspidfMicroTvmPlatformTarget(TemplateMicroTvmPlatformTarget):
         "baud": None,
     }
     REQUIRED = Target.REQUIRED | {"microtvm_espidf.template", "espidf.src_dir", "espidf.install_dir"}
+    PATH_CONFIGS = {"microtvm_espidf.template"}
 
     def __init__(self, name=None, features=None, config=None):
         super().__init__(name=name, features=features, config=config)
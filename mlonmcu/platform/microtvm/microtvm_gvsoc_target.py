@@ -47,6 +47,7 @@ class GVSocMicroTvmPlatformTarget(TemplateMicroTvmPlatformTarget):
         "microtvm_gvsoc.template",
         "hannah_tvm.src_dir",
     }
+    PATH_CONFIGS = {"microtvm_gvsoc.template"}
 
     def __init__(self, name=None, features=None, config=None):
         super().__init__(name=name, features=features, config=config)
@@ -109,6 +109,7 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
         "extend_attrs": False,
         "ccache": False,
         "custom_entry": None,
+        "lazy_artifacts": True,
     }
 
     REQUIRED = {"mlif.src_dir"}
@@ -123,6 +124,11 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
         self.tempdir = None
         self.build_dir = None
 
+    @property
+    def lazy_artifacts(self):
+        value = self.config["lazy_artifacts"]
+        return str2bool(value)
+
     @property
     def goal(self):
         return self.config["goal"]
@@ -617,51 +623,44 @@ class MlifPlatform(CompilePlatform, TargetPlatform):
         srcdump_file = self.build_dir / "dumps" / "generic_mlonmcu.srcdump"  # TODO: optional
         compile_commands_file = self.build_dir / "compile_commands.json"  # TODO: optional
 
-        # TODO: just use path instead of raw data?
-        with open(elf_file, "rb") as handle:
-            data = handle.read()
-            artifact = Artifact("generic_mlonmcu", raw=data, fmt=ArtifactFormat.RAW)
-            artifacts.insert(0, artifact)  # First artifact should be the ELF
+        # Artifacts are backed by the files in the build directory and only read on demand
+        lazy = self.lazy_artifacts
+
+        def _helper(name, path, fmt, flags=None):
+            if lazy:
+                return Artifact.from_path(name, path, fmt=fmt, flags=flags)
+            if fmt == ArtifactFormat.RAW:
+                with open(path, "rb") as handle:
+                    return Artifact(name, raw=handle.read(), fmt=fmt, flags=flags)
+            with open(path, "r") as handle:
+                return Artifact(name, content=handle.read(), fmt=fmt, flags=flags)
+
+        artifact = _helper("generic_mlonmcu", elf_file, ArtifactFormat.RAW)
+        artifacts.insert(0, artifact)  # First artifact should be the ELF
         # for cv32e40p
         if hex_file.is_file():
-            with open(hex_file, "rb") as handle:
-                data = handle.read()
-                artifact = Artifact("generic_mlonmcu.hex", raw=data, fmt=ArtifactFormat.RAW)
-                artifacts.insert(1, artifact)
+            artifact = _helper("generic_mlonmcu.hex", hex_file, ArtifactFormat.RAW)
+            artifacts.insert(1, artifact)
         # only for vicuna
         if path_file.is_file():
-            with open(path_file, "r") as handle:
-                data = handle.read()
-                artifact = Artifact("generic_mlonmcu.path", content=data, fmt=ArtifactFormat.TEXT)
-                artifacts.insert(1, artifact)
+            artifact = _helper("generic_mlonmcu.path", path_file, ArtifactFormat.TEXT)
+            artifacts.insert(1, artifact)
         if map_file.is_file():
-            with open(map_file, "r") as handle:
-                data = handle.read()
-                is_llvm_map = self.toolchain == "llvm" and self.fuse_ld != "ld"
-                map_type = "lld" if is_llvm_map else "ld"
-                artifact = Artifact("generic_mlonmcu.map", content=data, fmt=ArtifactFormat.TEXT, flags=(map_type,))
-                artifacts.append(artifact)
+            is_llvm_map = self.toolchain == "llvm" and self.fuse_ld != "ld"
+            map_type = "lld" if is_llvm_map else "ld"
+            artifact = _helper("generic_mlonmcu.map", map_file, ArtifactFormat.TEXT, flags=(map_type,))
+            artifacts.append(artifact)
         if asmdump_file.is_file():
-            with open(asmdump_file, "r") as handle:
-                data = handle.read()
-                artifact = Artifact(
-                    "generic_mlonmcu.dump", content=data, fmt=ArtifactFormat.TEXT, flags=(self.toolchain,)
-                )
-                artifacts.append(artifact)
+            artifact = _helper("generic_mlonmcu.dump", asmdump_file, ArtifactFormat.TEXT, flags=(self.toolchain,))
+            artifacts.append(artifact)
         if srcdump_file.is_file():
-            with open(srcdump_file, "r") as handle:
-                data = handle.read()
-                artifact = Artifact(
-                    "generic_mlonmcu.srcdump", content=data, fmt=ArtifactFormat.TEXT, flags=(self.toolchain,)
-                )
-                artifacts.append(artifact)
+            artifact = _helper("generic_mlonmcu.srcdump", srcdump_file, ArtifactFormat.TEXT, flags=(self.toolchain,))
+            artifacts.append(artifact)
         if compile_commands_file.is_file():
-            with open(compile_commands_file, "r") as handle:
-                data = handle.read()
-                artifact = Artifact(
-                    "compile_commands.json", content=data, fmt=ArtifactFormat.TEXT, flags=(self.toolchain,)
-                )
-                artifacts.append(artifact)
+            artifact = _helper(
+                "compile_commands.json", compile_commands_file, ArtifactFormat.TEXT, flags=(self.toolchain,)
+            )
+            artifacts.append(artifact)
         metrics = self.get_metrics(elf_file)
         stdout_artifact = Artifact(
             "mlif_out.log", content=out, fmt=ArtifactFormat.TEXT
@@ -33,7 +33,7 @@ from mlonmcu.target.metrics import Metrics
 from mlonmcu.target.elf import get_results as get_static_mem_usage
 from mlonmcu.logging import get_logger
 from mlonmcu.config import str2bool
-from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.artifact import Artifact
 
 logger = get_logger()
 
@@ -173,8 +173,7 @@ class TunePlatform(Platform):
         for name, metrics_ in metrics.items():
             if name == "default":
                 metrics_.add("Tune Stage Time [s]", diff, True)
-            content = metrics_.to_csv(include_optional=True)  # TODO: store df instead?
-            artifact = Artifact("tune_metrics.csv", content=content, fmt=ArtifactFormat.TEXT, flags=["metrics"])
+            artifact = metrics_.to_artifact("tune_metrics.csv")
             if name not in artifacts:
                 artifacts[name] = []
             artifacts[name].append(artifact)
@@ -242,8 +241,7 @@ class CompilePlatform(Platform):
         for name, metrics_ in metrics.items():
             if name == "default":
                 metrics_.add("Compile Stage Time [s]", diff, True)
-            content = metrics_.to_csv(include_optional=True)
-            artifact = Artifact("compile_metrics.csv", content=content, fmt=ArtifactFormat.TEXT, flags=["metrics"])
+            artifact = metrics_.to_artifact("compile_metrics.csv")
             if name not in artifacts:
                 artifacts[name] = []
             artifacts[name].append(artifact)
@@ -89,6 +89,21 @@ class Report:
             self.set_main(main if main is not None else {})
         self.set_post(post if post is not None else {})
 
+    def to_dict(self):
+        """Return the three parts of the report as lists of records."""
+        return {
+            "pre": self.pre_df.to_dict(orient="records"),
+            "main": self.main_df.to_dict(orient="records"),
+            "post": self.post_df.to_dict(orient="records"),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """Create a report from the output of `Report.to_dict`."""
+        ret = Report()
+        ret.set(pre=data["pre"], main=data["main"], post=data["post"])
+        return ret
+
     def add(self, reports):
         """Helper function to append a line to an existing report."""
         if not isinstance(reports, list):
@@ -1,11 +1,13 @@
 import sys
 import shutil
 from pathlib import Path
+from functools import lru_cache
 from typing import Optional
 
 import pandas as pd
 
 import mlonmcu.setup.utils as utils
+from mlonmcu.cache import ResultCache, hash_file
 
 pd.set_option("display.max_rows", None)
 
@@ -18,6 +20,7 @@ def demangle_fallback(func_name: str):
     return output
 
 
+@lru_cache(maxsize=2**16)
 def unmangle_helper(func_name: Optional[str]):
     from cpp_demangle import demangle
 
@@ -33,79 +36,113 @@ def unmangle_helper(func_name: Optional[str]):
 
 
 def parse_elf(elf_path):
-    from elftools.elf.elffile import ELFFile
-    from elftools.elf.sections import SymbolTableSection
-
-    with open(elf_path, "rb") as f:
-        elffile = ELFFile(f)
-
-        section = elffile.get_section_by_name(".symtab")
-
-        assert section, "Symbol Table not found!"
-        if isinstance(section, SymbolTableSection):
-            total_footprint = 0
-            func_footprint = {}
-            for i, sym in enumerate(section.iter_symbols()):
-                ty = sym.entry["st_info"]["type"]
-                if ty != "STT_FUNC":
-                    continue
-                func = sym.name
-                sz = sym.entry["st_size"]
-                func_footprint[func] = sz
-                total_footprint += sz
-            footprint_df = pd.DataFrame(func_footprint.items(), columns=["func", "bytes"])
-            footprint_df.sort_values("bytes", inplace=True, ascending=False)
-            footprint_df["rel_bytes"] = footprint_df["bytes"] / total_footprint
-        return footprint_df
+    from mlonmcu.target.elf import get_symbol_sizes
+
+    func_footprint = {sym["symbol"]: sym["bytes"] for sym in get_symbol_sizes(elf_path, types=("STT_FUNC",))}
+    total_footprint = sum(func_footprint.values())
+    footprint_df = pd.DataFrame(func_footprint.items(), columns=["func", "bytes"])
+    footprint_df.sort_values("bytes", inplace=True, ascending=False)
+    footprint_df["rel_bytes"] = footprint_df["bytes"] / total_footprint
+    return footprint_df
+
+
+SYMBOL_MAP_COLUMNS = ["segment", "section", "symbol", "object", "object_full", "library", "library_full"]
+SECTION_MAP_COLUMNS = ["segment", "section", "object", "object_full", "library", "library_full", "bytes"]
+
+# Parsed linker maps by map content hash
+LINKER_MAP_CACHE = ResultCache("linker_map", version=1, max_entries=16)
+
+
+def _split_filepath(filepath):
+    if "(" in filepath:  # TODO: use regex instead
+        library, obj = filepath[:-1].split("(", 1)
+    else:
+        library = None
+        obj = filepath
+    obj_short = Path(obj).name
+    library_short = Path(library).name if library is not None else library
+    return obj_short, obj, library_short, library
+
+
+@lru_cache(maxsize=2**14)
+def _analyze_linker_map_entry(segment_name, filepath, section_type, symbol_names):
+    # Cached per input section, as the objects of runtime libraries are the same in most runs
+    ret = []
+    obj_short, obj, library_short, library = _split_filepath(filepath)
+    if section_type.startswith(".text."):
+        symbol_name = unmangle_helper(section_type.split(".", 2)[-1])
+        ret.append((segment_name, section_type, symbol_name, obj_short, obj, library_short, library))
+    if ".text" not in section_type:
+        return tuple(ret)
+    for symbol_name in symbol_names:
+        ret.append((segment_name, section_type, symbol_name, obj_short, obj, library_short, library))
+    return tuple(ret)
 
 
 def analyze_linker_map_helper(mapFile):
     ret = []
-    data = mapFile.toJson(humanReadable=False)
+    data = mapFile.toJson(humanReadable=False) if not isinstance(mapFile, dict) else mapFile
     segments = data["segments"]
     for segment in segments:
         segment_name = segment["name"]
         files = segment["files"]
         for file in files:
-            filepath = file["filepath"]
-            if "(" in filepath:  # TODO: use regex instead
-                library, obj = filepath[:-1].split("(", 1)
-            else:
-                library = None
-                obj = filepath
-            obj_short = Path(obj).name
-            library_short = Path(library).name if library is not None else library
-            section_type = file["sectionType"]
-            symbols = file["symbols"]
-            if section_type.startswith(".text."):
-                symbol_name = unmangle_helper(section_type.split(".", 2)[-1])
-                new = {
-                    "segment": segment_name,
-                    "section": section_type,
-                    "symbol": symbol_name,
-                    "library": library_short,
-                    "library_full": library,
-                    "object": obj_short,
-                    "object_full": obj,
-                }
-                ret.append(new)
-            if ".text" not in section_type:
-                continue
-            for symbol in symbols:
-                symbol_name = symbol["name"]
-                new = {
-                    "segment": segment_name,
-                    "section": section_type,
-                    "symbol": symbol_name,
-                    "library": library_short,
-                    "library_full": library,
-                    "object": obj_short,
-                    "object_full": obj,
-                }
-                ret.append(new)
+            symbol_names = tuple(symbol["name"] for symbol in file["symbols"])
+            rows = _analyze_linker_map_entry(segment_name, file["filepath"], file["sectionType"], symbol_names)
+            ret.extend(dict(zip(SYMBOL_MAP_COLUMNS, row)) for row in rows)
+    return ret
+
+
+def analyze_linker_map_sections(mapFile):
+    """Size of every input section in the linker map."""
+    ret = []
+    data = mapFile.toJson(humanReadable=False) if not isinstance(mapFile, dict) else mapFile
+    for segment in data["segments"]:
+        for file in segment["files"]:
+            obj_short, obj, library_short, library = _split_filepath(file["filepath"])
+            row = (segment["name"], file["sectionType"], obj_short, obj, library_short, library, file["size"])
+            ret.append(dict(zip(SECTION_MAP_COLUMNS, row)))
     return ret
 
 
+def parse_linker_map(map_path):
+    """Parse a linker map into its symbol map and section sizes (cached by the content hash of the map)."""
+
+    def _helper():
+        from mapfile_parser import mapfile
+
+        mapFile = mapfile.MapFile()
+        mapFile.readMapFile(Path(map_path))
+        data = mapFile.toJson(humanReadable=False)
+        return {"symbols": analyze_linker_map_helper(data), "sections": analyze_linker_map_sections(data)}
+
+    return LINKER_MAP_CACHE.lookup(hash_file(map_path), _helper)
+
+
+def diff_linker_map_sections(sections, baseline_sections):
+    """Compare the section sizes of two linker maps. Only added, removed or resized sections are returned."""
+    keys = ["segment", "section", "object_full", "library_full"]
+
+    def _helper(data):
+        df = pd.DataFrame(data, columns=SECTION_MAP_COLUMNS)
+        return df.groupby(keys, dropna=False, as_index=False).agg(
+            {"object": "first", "library": "first", "bytes": "sum"}
+        )
+
+    df = _helper(sections)
+    baseline_df = _helper(baseline_sections)
+    merged = df.merge(baseline_df, on=keys, how="outer", suffixes=("", "_baseline"))
+    merged["object"] = merged["object"].fillna(merged["object_baseline"])
+    merged["library"] = merged["library"].fillna(merged["library_baseline"])
+    merged["bytes"] = merged["bytes"].fillna(0).astype(int)
+    merged["bytes_baseline"] = merged["bytes_baseline"].fillna(0).astype(int)
+    merged["delta"] = merged["bytes"] - merged["bytes_baseline"]
+    merged = merged[merged["delta"] != 0]
+    merged = merged.reindex(merged["delta"].abs().sort_values(ascending=False).index)
+    columns = ["segment", "section", "object", "library", "bytes_baseline", "bytes", "delta"]
+    return merged[columns].reset_index(drop=True)
+
+
 def generate_pie_data(df, x: str, y: str, topk: Optional[int] = None):
     ret = df.copy()
     ret.set_index(x, inplace=True)
@@ -140,24 +177,8 @@ def main():
 
     mem_footprint_df = parse_elf(elf_file)
 
-    from mapfile_parser import mapfile
-
-    mapFile = mapfile.MapFile()
-    mapFile.readMapFile(linker_map_file)
-
-    symbol_map = analyze_linker_map_helper(mapFile)
-    symbol_map_df = pd.DataFrame(
-        symbol_map,
-        columns=[
-            "segment",
-            "section",
-            "symbol",
-            "object",
-            "object_full",
-            "library",
-            "library_full",
-        ],
-    )
+    symbol_map = parse_linker_map(linker_map_file)["symbols"]
+    symbol_map_df = pd.DataFrame(symbol_map, columns=SYMBOL_MAP_COLUMNS)
 
     topk = None
     mem_footprint_per_func_data = generate_pie_data(mem_footprint_df, x="func", y="bytes", topk=topk)
@@ -0,0 +1,104 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Static instruction counts of (LLVM) objdump outputs."""
+
+import re
+from typing import Optional
+
+import pandas as pd
+
+# Matches labels of functions, e.g. `00000000 <main>:`
+FUNC_LABEL_PATTERN = r"^[0-9a-fA-F]+ <(.+)>:$"
+CV_MEM_PATTERN = re.compile(r"(.*)\((.*)\)")
+CV_MEM_INC_PATTERN = re.compile(r"(.*)\((.*)\),\s*(.*)")
+
+DEFAULT_CHUNK_SIZE = 2**16  # lines
+
+
+def _is_int(value):
+    try:
+        int(value)
+    except ValueError:
+        return False
+    return True
+
+
+def normalize_corev_insn(insn, args):
+    """Distinguish the addressing modes of CORE-V memory instructions (e.g. `cv.lh_ri_inc`)."""
+    if "(" not in args or ")" not in args:
+        return insn
+    m2 = CV_MEM_INC_PATTERN.match(args)
+    if m2:
+        _, _, offset = m2.groups()
+        fmt = "ri" if _is_int(offset) else "rr"
+        return f"{insn}_{fmt}_inc"
+    m = CV_MEM_PATTERN.match(args)
+    if m:
+        offset, base = m.groups()
+        fmt = "ri" if _is_int(offset) else "rr"
+        insn += f"_{fmt}"
+        if "!" in base or ")," in base:
+            insn += "_inc"
+    return insn
+
+
+def _iter_chunks(handle, chunk_size):
+    while True:
+        lines = [line for _, line in zip(range(chunk_size), handle)]
+        if len(lines) == 0:
+            break
+        yield pd.Series(lines, dtype=object).str.rstrip("\n")
+
+
+def count_dump_instructions(handle, per_func: bool = False, chunk_size: Optional[int] = None):
+    """Count the instructions in an objdump output read from the given file handle.
+
+    The dump is processed in chunks of lines using vectorized string operations, hence only a single chunk
+    is held in memory at a time. Returns the counts per instruction (in order of first occurence) and
+    optionally the counts per function and instruction.
+    """
+    chunk_size = chunk_size if chunk_size is not None else DEFAULT_CHUNK_SIZE
+    counts = {}
+    func_counts = {} if per_func else None
+    current_func = None
+    for lines in _iter_chunks(handle, chunk_size):
+        if per_func:
+            funcs = lines.str.extract(FUNC_LABEL_PATTERN, expand=False)
+            if current_func is not None and pd.isna(funcs.iloc[0]):
+                funcs.iloc[0] = current_func
+            funcs = funcs.ffill()
+            current_func = funcs.iloc[-1]
+        mask = lines.str.count("\t") == 2
+        if not mask.any():
+            continue
+        parts = lines[mask].str.split("\t", n=2, expand=True)
+        insns = parts[1].str.replace("seal5.", "", regex=False)
+        cv_mask = insns.str.contains("cv.", regex=False)
+        if cv_mask.any():
+            insns[cv_mask] = [
+                normalize_corev_insn(insn, args) for insn, args in zip(insns[cv_mask], parts[2][cv_mask])
+            ]
+        for insn, count in insns.value_counts(sort=False).items():
+            counts[insn] = counts.get(insn, 0) + int(count)
+        if per_func:
+            df = pd.DataFrame({"func": funcs[mask].fillna("???"), "insn": insns})
+            for (func, insn), count in df.groupby(["func", "insn"], sort=False).size().items():
+                func_counts.setdefault(func, {})
+                func_counts[func][insn] = func_counts[func].get(insn, 0) + int(count)
+    return counts, func_counts
@@ -17,15 +17,56 @@
 # limitations under the License.
 #
 import posixpath
+from functools import lru_cache
 from collections import defaultdict
 
 import pandas as pd
 from elftools.elf.elffile import ELFFile
 
+from mlonmcu.cache import ResultCache, hash_file
 from mlonmcu.logging import get_logger
 
 logger = get_logger()
 
+# Analysis results by ELF content hash
+DWARF_CACHE = ResultCache("dwarf", version=1, max_entries=8)
+
+
+@lru_cache(maxsize=None)
+def demangle(linkage_name):
+    """Demangle a C++ symbol name (cached as the same names occur in many compilation units)."""
+    from cpp_demangle import demangle as demangle_
+
+    try:
+        return demangle_(linkage_name)
+    except ValueError:  # Not a mangled name
+        return linkage_name
+
+
+def lpe_filename(line_program, file_index):
+    # Retrieving the filename associated with a line program entry
+    # involves two levels of indirection: we take the file index from
+    # the LPE to grab the file_entry from the line program header,
+    # then take the directory index from the file_entry to grab the
+    # directory name from the line program header. Finally, we
+    # join the (base) filename from the file_entry to the directory
+    # name to get the absolute filename.
+    lp_header = line_program.header
+    file_entries = lp_header["file_entry"]
+
+    # File and directory indices are 1-indexed.
+    file_entry = file_entries[file_index] if line_program.header.version >= 5 else file_entries[file_index - 1]
+    dir_index = file_entry["dir_index"] if line_program.header.version >= 5 else file_entry["dir_index"] - 1
+    assert dir_index >= 0
+
+    # A dir_index of 0 indicates that no absolute directory was recorded during
+    # compilation; return just the basename.
+    if dir_index == 0:
+        return file_entry.name.decode()
+
+    directory = lp_header["include_directory"][dir_index]
+    return posixpath.join(directory, file_entry.name).decode()
+
 
 def parse_dwarf(elf_path):
     func2pcs_data = []
@@ -37,18 +78,14 @@ def parse_dwarf(elf_path):
         elffile = ELFFile(f)
 
         # mapping function symbol to pc range
-        for section in elffile.iter_sections():
-            if section.name == ".symtab":
-                symbol_table = section
-                break
+        symbol_table = elffile.get_section_by_name(".symtab")
+        assert symbol_table is not None, "ELF file has no symbol table!"
 
         for symbol in symbol_table.iter_symbols():
             symbol_type = symbol["st_info"]["type"]
             if symbol_type == "STT_FUNC":
                 start_pc = symbol["st_value"]
                 end_pc = start_pc + symbol["st_size"] - 1
-                # range = (start_pc, end_pc)
-                # mapping[symbol.name] = range
                 new = (symbol.name, (start_pc, end_pc))
                 func2pcs_data.append(new)
             # Warning: this mapping uses mangled func names
@@ -60,90 +97,60 @@ def parse_dwarf(elf_path):
 
         dwarfinfo = elffile.get_dwarf_info()
 
-        def lpe_filename(line_program, file_index):
-            # Retrieving the filename associated with a line program entry
-            # involves two levels of indirection: we take the file index from
-            # the LPE to grab the file_entry from the line program header,
-            # then take the directory index from the file_entry to grab the
-            # directory name from the line program header. Finally, we
-            # join the (base) filename from the file_entry to the directory
-            # name to get the absolute filename.
-            lp_header = line_program.header
-            file_entries = lp_header["file_entry"]
-
-            # File and directory indices are 1-indexed.
-            file_entry = file_entries[file_index] if line_program.header.version >= 5 else file_entries[file_index - 1]
-            dir_index = file_entry["dir_index"] if line_program.header.version >= 5 else file_entry["dir_index"] - 1
-            assert dir_index >= 0
-
-            # A dir_index of 0 indicates that no absolute directory was recorded during
-            # compilation; return just the basename.
-            if dir_index == 0:
-                return file_entry.name.decode()
-
-            directory = lp_header["include_directory"][dir_index]
-            return posixpath.join(directory, file_entry.name).decode()
-
+        # Single pass over all compilation units (functions and line programs)
         for CU in dwarfinfo.iter_CUs():
             line_program = dwarfinfo.line_program_for_CU(CU)
             if line_program is None:
                 logger.warning("DWARF info is missing a line program for this CU")
                 continue
 
+            filenames = {}  # file_index -> filename
             for DIE in CU.iter_DIEs():
+                if DIE.tag != "DW_TAG_subprogram":
+                    continue
+                attributes = DIE.attributes
                 if (
-                    DIE.tag == "DW_TAG_subprogram"
-                    and "DW_AT_decl_file" in DIE.attributes
-                    and "DW_AT_low_pc" in DIE.attributes
-                    and "DW_AT_high_pc" in DIE.attributes
+                    "DW_AT_decl_file" not in attributes
+                    or "DW_AT_low_pc" not in attributes
+                    or "DW_AT_high_pc" not in attributes
                 ):
-                    if "DW_AT_name" in DIE.attributes:
-                        func_name = DIE.attributes["DW_AT_name"].value.decode()
-                    else:
-                        func_name = "???"
-                    if "DW_AT_linkage_name" in DIE.attributes:
-                        linkage_name = DIE.attributes["DW_AT_linkage_name"].value.decode()
-                        from cpp_demangle import demangle
-
-                        unmangled_linkage_name = demangle(linkage_name)
-                    else:
-                        linkage_name = "???"
-                        unmangled_linkage_name = "???"
-                    if "DW_AT_decl_file" in DIE.attributes:
-                        file_index = DIE.attributes["DW_AT_decl_file"].value
-                        filename = lpe_filename(line_program, file_index)
-                    else:
-                        filename = "???"
-
-                    srcFile_func_dict[filename][0].add(func_name)
-                    srcFile_func_dict[filename][1].add(linkage_name)
-                    srcFile_func_dict[filename][2].add(unmangled_linkage_name)
-
-        for CU in dwarfinfo.iter_CUs():
-            line_program = dwarfinfo.line_program_for_CU(CU)
-            if line_program is None:
-                logger.warning("  DWARF info is missing a line program for this CU")
-                continue
+                    continue
+                if "DW_AT_name" in attributes:
+                    func_name = attributes["DW_AT_name"].value.decode()
+                else:
+                    func_name = "???"
+                if "DW_AT_linkage_name" in attributes:
+                    linkage_name = attributes["DW_AT_linkage_name"].value.decode()
+                    unmangled_linkage_name = demangle(linkage_name)
+                else:
+                    linkage_name = "???"
+                    unmangled_linkage_name = "???"
+                file_index = attributes["DW_AT_decl_file"].value
+                filename = filenames.get(file_index)
+                if filename is None:
+                    filename = lpe_filename(line_program, file_index)
+                    filenames[file_index] = filename
+
+                srcFile_func_dict[filename][0].add(func_name)
+                srcFile_func_dict[filename][1].add(linkage_name)
+                srcFile_func_dict[filename][2].add(unmangled_linkage_name)
 
             CU_name = CU.get_top_DIE().attributes["DW_AT_name"].value.decode("utf-8")
 
+            pc_lines = pc_to_source_line_mapping[CU_name]
             for entry in line_program.get_entries():
                 if entry.state:
-                    pc = entry.state.address
-                    line = entry.state.line
-                    pc_to_source_line_mapping[CU_name].append((pc, line))
-
-            if CU_name in pc_to_source_line_mapping:
-                pc_to_source_line_mapping[CU_name].sort(key=lambda x: x[0])
+                    pc_lines.append((entry.state.address, entry.state.line))
+            pc_lines.sort(key=lambda x: x[0])
     return func2pcs_data, srcFile_func_dict, pc_to_source_line_mapping
 
 
-def analyze_dwarf(elf_path):
+def _analyze_dwarf(elf_path):
     func2pc, file2funcs, file_pc2line = parse_dwarf(elf_path)
-    file2funcs_data = [(file_name, vals[0], vals[1], vals[2]) for file_name, vals in file2funcs.items()]
+    file2funcs_data = [(file_name, vals[0], vals[1], vals[2]) for file_name, vals in (file2funcs or {}).items()]
     pc2locs = defaultdict(set)
-    for file, pc_lines in file_pc2line.items():
-        for pc_line in list(set(pc_lines)):
+    for file, pc_lines in (file_pc2line or {}).items():
+        for pc_line in set(pc_lines):
             assert len(pc_line) == 2
             pc, line = pc_line
             loc = f"{file}:{line}"
@@ -155,3 +162,13 @@ def analyze_dwarf(elf_path):
     )
     pc2locs_df = pd.DataFrame(pc2locs.items(), columns=["pc", "locs"])
     return func2pc_df, file2funcs_df, pc2locs_df
+
+
+def analyze_dwarf(elf_path, use_cache=True):
+    """Map functions to PC ranges and source files and PCs to source locations.
+
+    The results are cached by the content hash of the ELF file.
+    """
+    if not use_cache:
+        return _analyze_dwarf(elf_path)
+    return DWARF_CACHE.lookup(hash_file(elf_path), lambda: _analyze_dwarf(elf_path))
@@ -33,15 +33,25 @@ from mlonmcu.config import str2dict, str2bool, str2list
 from mlonmcu.logging import get_logger
 
 from .postprocess import SessionPostprocess, RunPostprocess
-from .validate_metrics import parse_validate_metrics, parse_classify_metrics
+from .validate_metrics import (
+    parse_validate_metrics,
+    parse_classify_metrics,
+    lookup_output,
+    check_range,
+    quantize_ref,
+    dequantize,
+)
 from .calc_lib_mem_footprints import (
+    SYMBOL_MAP_COLUMNS,
     parse_elf,
-    analyze_linker_map_helper,
+    parse_linker_map,
+    diff_linker_map_sections,
     generate_pie_data,
     agg_library_footprint,
     unmangle_helper,
 )
 from .dwarf import analyze_dwarf
+from .dump import count_dump_instructions
 
 
 logger = get_logger()
@@ -1109,7 +1119,7 @@ class CompareRowsPostprocess(SessionPostprocess):
             col in main_df.columns for col in to_compare
         ), f"Missing cols? ({to_compare} vs {list(main_df.columns)})"
         full_df = pd.concat([pre_df, main_df, post_df], axis=1)
-        grouped = full_df.groupby(group_by, axis=0, group_keys=False, dropna=False)
+        grouped = full_df.groupby(group_by, group_keys=False, dropna=False)
         new_df = pd.DataFrame()
         for col in to_compare:
 
@@ -1141,6 +1151,7 @@ class AnalyseDumpPostprocess(RunPostprocess):
         **RunPostprocess.DEFAULTS,
         "to_df": False,
         "to_file": True,
+        "per_func": False,
     }
 
     def __init__(self, features=None, config=None):
@@ -1158,6 +1169,12 @@ class AnalyseDumpPostprocess(RunPostprocess):
         value = self.config["to_file"]
         return str2bool(value)
 
+    @property
+    def per_func(self):
+        """Get per_func property."""
+        value = self.config["per_func"]
+        return str2bool(value)
+
     def post_run(self, report, artifacts):
         """Called at the end of a run."""
         platform = report.pre_df["Platform"]
@@ -1171,57 +1188,28 @@ class AnalyseDumpPostprocess(RunPostprocess):
         dump_artifact = dump_artifact[0]
         is_llvm = "llvm" in dump_artifact.flags
         assert is_llvm, "Non-llvm objdump currently unsupported"
-        content = dump_artifact.content
-        lines = content.split("\n")
-        counts = {}
-        total = 0
-        for line in lines:
-            splitted = line.split("\t")
-            if len(splitted) != 3:
-                continue
-            insn = splitted[1]
-            args = splitted[2]
-            # stop = insn == "cv.lh" and args == "t2, (a0), 0x2"
-            if "seal5." in insn:
-                insn = insn.replace("seal5.", "")
-            if "cv." in insn:
-                if "(" in args and ")" in args:
-                    m = re.compile(r"(.*)\((.*)\)").match(args)
-                    m2 = re.compile(r"(.*)\((.*)\),\s*(.*)").match(args)
-                    if m2:
-                        g = m2.groups()
-                        assert len(g) == 3
-                        _, base, offset = g
-                        fmt = "ri"
-                        try:
-                            offset = int(offset)
-                        except ValueError:
-                            fmt = "rr"
-                        insn += f"_{fmt}"
-                        insn += "_inc"
-                    elif m:
-                        g = m.groups()
-                        assert len(g) == 2
-                        offset, base = g
-                        fmt = "ri"
-                        try:
-                            offset = int(offset)
-                        except ValueError:
-                            fmt = "rr"
-                        insn += f"_{fmt}"
-                        if "!" in base or ")," in base:
-                            insn += "_inc"
-            if insn in counts:
-                counts[insn] += 1
-            else:
-                counts[insn] = 1
-            total += 1
+        with dump_artifact.open() as handle:
+            counts, func_counts = count_dump_instructions(handle, per_func=self.per_func)
+        total = sum(counts.values())
         counts_csv = "Instruction,Count,Probability\n"
         for insn, count in sorted(counts.items(), key=lambda item: item[1]):
             counts_csv += f"{insn},{count},{count/total:.4f}\n"
         artifact = Artifact("dump_counts.csv", content=counts_csv, fmt=ArtifactFormat.TEXT)
         if self.to_file:
             ret_artifacts.append(artifact)
+            if self.per_func:
+                func_counts_df = pd.DataFrame(
+                    [
+                        (func, insn, count)
+                        for func, insn_counts in func_counts.items()
+                        for insn, count in sorted(insn_counts.items(), key=lambda item: item[1], reverse=True)
+                    ],
+                    columns=["Function", "Instruction", "Count"],
+                )
+                func_artifact = Artifact(
+                    "dump_counts_per_func.csv", content=func_counts_df.to_csv(index=False), fmt=ArtifactFormat.TEXT
+                )
+                ret_artifacts.append(func_artifact)
         if self.to_df:
             post_df = report.post_df.copy()
             post_df["DumpCounts"] = str(counts)
@@ -1584,8 +1572,6 @@ class ValidateOutputsPostprocess(RunPostprocess):
         import yaml
 
         model_info_data = yaml.safe_load(model_info_artifact.content)
-        if len(model_info_data["output_names"]) > 1:
-            raise NotImplementedError("Multi-outputs not yet supported.")
         outputs_ref_artifact = lookup_artifacts(artifacts, name="outputs_ref.npy", first_only=True)
         assert len(outputs_ref_artifact) == 1, "Could not find artifact: outputs_ref.npy"
         outputs_ref_artifact = outputs_ref_artifact[0]
@@ -1616,101 +1602,35 @@ class ValidateOutputsPostprocess(RunPostprocess):
         #     "mse(thr=0.01)": None,
         #     "+-1": None,
         # }
-        validate_metrics_str = self.validate_metrics
-        validate_metrics = parse_validate_metrics(validate_metrics_str)
-        for i, output_ref in enumerate(outputs_ref):
-            if i >= len(outputs):
-                logger.warning("Missing output sample")
-                # missing += 1
-                break
-            output = outputs[i]
-            ii = 0
-            for out_name, out_ref_data in output_ref.items():
-                if out_name in output:
-                    out_data = output[out_name]
-                elif ii < len(output):
-                    if isinstance(output, dict):
-                        # fallback for custom name-based npy dict
-                        out_data = list(output.values())[ii]
-                    else:  # fallback for index-based npy array
-                        assert isinstance(output, (list, np.array)), "expected dict, list or np.array type"
-                        out_data = output[ii]
-                else:
-                    RuntimeError(f"Output not found: {out_name}")
-                # optional dequantize
-                # print("out_data_before_quant", out_data)
-                # print("sum(out_data_before_quant", np.sum(out_data))
-
-                quant = model_info_data.get("output_quant_details", None)
-                rng = model_info_data.get("output_ranges", None)
-                if quant:
-
-                    def ref_quant_helper(quant, data):  # TODO: move somewhere else
-                        if quant is None:
-                            return data
-                        quant_scale, quant_zero_point, quant_dtype, quant_range = quant
-                        if quant_dtype is None or data.dtype.name == quant_dtype:
-                            return data
-                        assert data.dtype.name in ["float32"], "Quantization only supported for float32 input"
-                        assert quant_dtype in ["int8"], "Quantization only supported for int8 output"
-                        if quant_range and self.validate_range:
-                            assert len(quant_range) == 2, "Range should be a tuple (lower, upper)"
-                            lower, upper = quant_range
-                            # print("quant_range", quant_range)
-                            # print("np.min(data)", np.min(data))
-                            # print("np.max(data)", np.max(data))
-                            assert lower <= upper
-                            assert np.min(data) >= lower and np.max(data) <= upper, "Range missmatch"
-
-                        return np.around((data / quant_scale) + quant_zero_point).astype("int8")
-
-                    def dequant_helper(quant, data):  # TODO: move somewhere else
-                        if quant is None:
-                            return data
-                        quant_scale, quant_zero_point, quant_dtype, quant_range = quant
-                        if quant_dtype is None or data.dtype.name == quant_dtype:
-                            return data
-                        assert data.dtype.name in ["int8"], "Dequantization only supported for int8 input"
-                        assert quant_dtype in ["float32"], "Dequantization only supported for float32 output"
-                        ret = (data.astype("float32") - quant_zero_point) * quant_scale
-                        if quant_range and self.validate_range:
-                            assert len(quant_range) == 2, "Range should be a tuple (lower, upper)"
-                            # print("quant_range", quant_range)
-                            # print("np.min(ret)", np.min(ret))
-                            # print("np.max(ret)", np.max(ret))
-                            lower, upper = quant_range
-                            assert lower <= upper
-                            assert np.min(ret) >= lower and np.max(ret) <= upper, "Range missmatch"
-                        return ret
-
-                    assert ii < len(rng)
-                    rng_ = rng[ii]
-                    if rng_ and self.validate_range:
-                        assert len(rng_) == 2, "Range should be a tuple (lower, upper)"
-                        lower, upper = rng_
-                        assert lower <= upper
-                        # print("rng_", rng_)
-                        # print("np.min(out_data)", np.min(out_data))
-                        # print("np.max(out_data)", np.max(out_data))
-                        assert np.min(out_data) >= lower and np.max(out_data) <= upper, "Range missmatch"
-                    assert ii < len(quant)
-                    quant_ = quant[ii]
-                    if quant_ is not None:
-                        out_ref_data_quant = ref_quant_helper(quant_, out_ref_data)
-                        for vm in validate_metrics:
-                            vm.process(out_data, out_ref_data_quant, in_data=in_data, quant=True)
-                        out_data = dequant_helper(quant_, out_data)
-                # print("out_data", out_data)
-                # print("sum(out_data)", np.sum(out_data))
-                # print("out_ref_data", out_ref_data)
-                # print("sum(out_ref_data)", np.sum(out_ref_data))
-                # input("TIAW")
-                assert out_data.dtype == out_ref_data.dtype, "dtype missmatch"
-                assert out_data.shape == out_ref_data.shape, "shape missmatch"
-
-                for vm in validate_metrics:
-                    vm.process(out_data, out_ref_data, in_data=in_data, quant=False)
-                ii += 1
+        validate_metrics = parse_validate_metrics(self.validate_metrics)
+        num_samples = len(outputs_ref)
+        if len(outputs) < num_samples:
+            logger.warning("Missing output samples (%d/%d)", len(outputs), num_samples)
+            num_samples = len(outputs)
+        out_names = list(outputs_ref[0].keys()) if num_samples > 0 else []
+        quant = model_info_data.get("output_quant_details", None)
+        rng = model_info_data.get("output_ranges", None)
+        # All samples of one output are stacked and processed at once (first axis: sample)
+        for ii, out_name in enumerate(out_names):
+            out_ref_data = np.stack([outputs_ref[i][out_name] for i in range(num_samples)])
+            out_data = np.stack([lookup_output(outputs[i], out_name, ii) for i in range(num_samples)])
+            if quant:
+                assert ii < len(rng)
+                rng_ = rng[ii]
+                if rng_ and self.validate_range:
+                    check_range(out_data, rng_)
+                assert ii < len(quant)
+                quant_ = quant[ii]
+                if quant_ is not None:
+                    out_ref_data_quant = quantize_ref(quant_, out_ref_data, validate_range=self.validate_range)
+                    for vm in validate_metrics:
+                        vm.process_batch(out_data, out_ref_data_quant, in_data=in_data, quant=True)
+                    out_data = dequantize(quant_, out_data, validate_range=self.validate_range)
+            assert out_data.dtype == out_ref_data.dtype, "dtype missmatch"
+            assert out_data.shape == out_ref_data.shape, "shape missmatch"
+
+            for vm in validate_metrics:
+                vm.process_batch(out_data, out_ref_data, in_data=in_data, quant=False)
         if self.report:
             raise NotImplementedError
         for vm in validate_metrics:
@@ -1768,22 +1688,11 @@ class ValidateLabelsPostprocess(RunPostprocess):
         # missing = 0
         classify_metrics_str = self.classify_metrics
         classify_metrics = parse_classify_metrics(classify_metrics_str)
-        for i, output in enumerate(outputs):
-            if isinstance(output, dict):  # name based lookup
-                pass
-            else:  # index based lookup
-                assert isinstance(output, (list, np.array)), "expected dict, list or np.array"
-                output_names = model_info_data["output_names"]
-                assert len(output) == len(output_names)
-                output = {output_names[idx]: out for idx, out in enumerate(output)}
-            assert len(output) == 1, "Only supporting single-output models"
-            out_data = output[list(output.keys())[0]]
-            # print("out_data", out_data)
-            assert i < len(labels_ref), "Missing reference labels"
-            label_ref = labels_ref[i]
-            # print("label_ref", label_ref)
-            for cm in classify_metrics:
-                cm.process(out_data, label_ref, quant=False)
+        assert len(outputs) <= len(labels_ref), "Missing reference labels"
+        out_name = model_info_data["output_names"][0]
+        out_data = np.stack([lookup_output(output, out_name, 0) for output in outputs]) if len(outputs) > 0 else []
+        for cm in classify_metrics:
+            cm.process_batch(out_data, labels_ref[: len(outputs)], quant=False)
         if self.report:
             raise NotImplementedError
         for cm in classify_metrics:
@@ -1947,11 +1856,26 @@ class AnalyseLinkerMapPostprocess(RunPostprocess):
         "per_library": True,
         "ignore": [],
         "sum": False,
+        "baseline": None,  # Linker map (or directory containing generic_mlonmcu.map) to compare against
     }
 
     def __init__(self, features=None, config=None):
         super().__init__("analyse_linker_map", features=features, config=config)
 
+    @property
+    def baseline(self):
+        """Get baseline property."""
+        value = self.config["baseline"]
+        if value is None:
+            return None
+        path = Path(value)
+        if path.is_dir():
+            matches = sorted(path.rglob("generic_mlonmcu.map"))
+            assert len(matches) > 0, f"Linker map not found in: {path}"
+            path = matches[0]
+        assert path.is_file(), f"Baseline linker map not found: {path}"
+        return path
+
     @property
     def to_df(self):
         """Get to_df property."""
@@ -2014,27 +1938,28 @@ class AnalyseLinkerMapPostprocess(RunPostprocess):
 
         mem_footprint_df = parse_elf(elf_artifact.path)
 
-        from mapfile_parser import mapfile
-
-        mapFile = mapfile.MapFile()
-        mapFile.readMapFile(map_artifact.path)
-
-        symbol_map = analyze_linker_map_helper(mapFile)
-        symbol_map_df = pd.DataFrame(
-            symbol_map,
-            columns=[
-                "segment",
-                "section",
-                "symbol",
-                "object",
-                "object_full",
-                "library",
-                "library_full",
-            ],
-        )
+        linker_map = parse_linker_map(map_artifact.path)
+        symbol_map_df = pd.DataFrame(linker_map["symbols"], columns=SYMBOL_MAP_COLUMNS)
 
         topk = None
 
+        if self.baseline:
+            baseline_map = parse_linker_map(self.baseline)
+            diff_df = diff_linker_map_sections(linker_map["sections"], baseline_map["sections"])
+            if self.to_file:
+                mem_footprint_diff_artifact = Artifact(
+                    "mem_footprint_diff.csv",
+                    content=diff_df.to_csv(index=False),
+                    fmt=ArtifactFormat.TEXT,
+                )
+                ret_artifacts.append(mem_footprint_diff_artifact)
+            if self.to_df:
+                post_df = report.post_df.copy()
+                post_df["Linker Map Diff"] = str(
+                    {f"{row.segment}:{row.section}:{row.object}": row.delta for row in diff_df.itertuples()}
+                )
+                report.post_df = post_df
+
         if self.per_func:
             if self.to_df and self.sum:
                 post_df = report.post_df.copy()
@@ -2300,24 +2225,8 @@ class ProfileFunctionsPostprocess(RunPostprocess):
             )
             assert len(map_artifact) == 1, "Linker map artifact not found!"
             map_artifact = map_artifact[0]
-            from mapfile_parser import mapfile
-
-            mapFile = mapfile.MapFile()
-            mapFile.readMapFile(map_artifact.path)
-
-            symbol_map = analyze_linker_map_helper(mapFile)
-            symbol_map_df = pd.DataFrame(
-                symbol_map,
-                columns=[
-                    "segment",
-                    "section",
-                    "symbol",
-                    "object",
-                    "object_full",
-                    "library",
-                    "library_full",
-                ],
-            )
+            symbol_map = parse_linker_map(map_artifact.path)["symbols"]
+            symbol_map_df = pd.DataFrame(symbol_map, columns=SYMBOL_MAP_COLUMNS)
 
         def agg_runtime(runtime_df, symbol_map_df, by: str = "library", col: str = "count"):
             runtime_df["func_unmangled"] = runtime_df["func_name"].apply(unmangle_helper)
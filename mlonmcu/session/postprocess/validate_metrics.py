@@ -46,12 +46,33 @@ class ValidationMetric:
         if self.process_(out_data, out_data_ref):
             self.num_correct += 1
 
+    def process_batch_(self, out_data, out_data_ref, in_data: Optional[np.array] = None, quant: bool = False):
+        """Vectorized version of process_ (the first axis holds the samples). Returns a boolean per sample."""
+        return np.array([self.process_(out, out_ref) for out, out_ref in zip(out_data, out_data_ref)], dtype=bool)
+
+    def process_batch(self, out_data, out_data_ref, in_data: Optional[np.array] = None, quant: bool = False):
+        """Process all samples of an output at once."""
+        if len(out_data) == 0 or not self.check(out_data[0], out_data_ref[0], quant=quant):
+            return
+        res = self.process_batch_(out_data, out_data_ref, in_data=in_data, quant=quant)
+        self.num_total += len(res)
+        self.num_correct += int(np.count_nonzero(res))
+
     def get_summary(self):
         if self.num_total == 0:
             return "N/A"
         return f"{self.num_correct}/{self.num_total} ({int(self.num_correct/self.num_total*100)}%)"
 
 
+def _flatten_samples(data):
+    return data.reshape(len(data), -1)
+
+
+def _first_rows(data):
+    # Classification metrics only look at the first row of every sample
+    return data.reshape(len(data), -1, data.shape[-1])[:, 0, :]
+
+
 class ClassifyMetric:
     def __init__(self, name, **cfg):
         self.name = name
@@ -71,6 +92,18 @@ class ClassifyMetric:
         if self.process_(out_data, label_ref):
             self.num_correct += 1
 
+    def process_batch_(self, out_data, labels_ref, quant: bool = False):
+        """Vectorized version of process_ (the first axis holds the samples). Returns a boolean per sample."""
+        return np.array([self.process_(out, label_ref) for out, label_ref in zip(out_data, labels_ref)], dtype=bool)
+
+    def process_batch(self, out_data, labels_ref, quant: bool = False):
+        """Process all samples at once."""
+        if len(out_data) == 0 or not self.check(out_data[0], labels_ref[0], quant=quant):
+            return
+        res = self.process_batch_(out_data, labels_ref, quant=quant)
+        self.num_total += len(res)
+        self.num_correct += int(np.count_nonzero(res))
+
     def get_summary(self):
         if self.num_total == 0:
             return "N/A"
@@ -91,6 +124,10 @@ class AllCloseMetric(ValidationMetric):
     def process_(self, out_data, out_data_ref, in_data: Optional[np.array] = None, quant: bool = False):
         return np.allclose(out_data, out_data_ref, rtol=self.rtol, atol=self.atol)
 
+    def process_batch_(self, out_data, out_data_ref, in_data: Optional[np.array] = None, quant: bool = False):
+        close = np.isclose(out_data, out_data_ref, rtol=self.rtol, atol=self.atol)
+        return _flatten_samples(close).all(axis=1)
+
 
 class TopKMetric(ValidationMetric):
     def __init__(self, name: str, n: int = 2):
@@ -128,6 +165,18 @@ class TopKMetric(ValidationMetric):
         else:
             assert False
 
+    def process_batch_(self, out_data, out_data_ref, in_data: Optional[np.array] = None, quant: bool = False):
+        data = _first_rows(out_data)
+        ref_data = _first_rows(out_data_ref)
+        num_checks = min(self.n, data.shape[-1])
+        data_sorted_idx = np.argsort(data, axis=-1)[:, ::-1][:, :num_checks]
+        ref_data_sorted_idx = np.argsort(ref_data, axis=-1)[:, ::-1][:, :num_checks]
+        # Different indices are fine for equal values
+        same_values = np.take_along_axis(data, data_sorted_idx, axis=1) == np.take_along_axis(
+            ref_data, ref_data_sorted_idx, axis=1
+        )
+        return ((data_sorted_idx == ref_data_sorted_idx) | same_values).all(axis=1)
+
 
 class TopKLabelsMetric(ClassifyMetric):
     def __init__(self, name: str, n: int = 2):
@@ -154,6 +203,11 @@ class TopKLabelsMetric(ClassifyMetric):
         # input("111")
         return res
 
+    def process_batch_(self, out_data, labels_ref, quant: bool = False):
+        data = _first_rows(out_data)
+        data_sorted_idx = np.argsort(data, axis=-1)[:, ::-1][:, : self.n]
+        return (data_sorted_idx == np.asarray(labels_ref).reshape(-1, 1)).any(axis=1)
+
 
 class ConfusionMatrixMetric(ValidationMetric):
     def __init__(self, name: str):
@@ -190,6 +244,18 @@ class ConfusionMatrixMetric(ValidationMetric):
         temp_[label] += 1
         self.temp[label_ref] = temp_
 
+    def process_batch(self, out_data, labels_ref, quant: bool = False):
+        if len(out_data) == 0 or not self.check(out_data[0], labels_ref[0], quant=quant):
+            return
+        labels = np.argsort(_first_rows(out_data), axis=-1)[:, -1].tolist()
+        for label_ref, label in zip(np.asarray(labels_ref).tolist(), labels):
+            self.num_total += 1
+            if label_ref == label:
+                self.num_correct += 1
+                self.num_correct_per_class[label_ref] = self.num_correct_per_class.get(label_ref, 0) + 1
+            temp_ = self.temp.setdefault(label_ref, {})
+            temp_[label] = temp_.get(label, 0) + 1
+
     def get_summary(self):
         if self.num_total == 0:
             return "N/A"
@@ -216,6 +282,10 @@ class MSEMetric(ValidationMetric):
         mse = ((out_data - out_data_ref) ** 2).mean()
         return mse < self.thr
 
+    def process_batch_(self, out_data, out_data_ref, in_data: Optional[np.array] = None, quant: bool = False):
+        mse = _flatten_samples((out_data - out_data_ref) ** 2).mean(axis=1)
+        return mse < self.thr
+
 
 class ToyScoreMetric(ValidationMetric):
     def __init__(self, name: str, atol: float = 0.1, rtol: float = 0.1):
@@ -269,6 +339,61 @@ class PlusMinusOneMetric(ValidationMetric):
                 return False
         return True
 
+    def process_batch_(self, out_data, out_data_ref, in_data: Optional[np.array] = None, quant: bool = False):
+        diff = np.abs(out_data.astype("int64") - out_data_ref.astype("int64"))
+        return (_flatten_samples(diff) <= 1).all(axis=1)
+
+
+def check_range(data, rng):
+    """Check that all values are inside the given (lower, upper) range."""
+    assert len(rng) == 2, "Range should be a tuple (lower, upper)"
+    lower, upper = rng
+    assert lower <= upper
+    assert np.min(data) >= lower and np.max(data) <= upper, "Range missmatch"
+
+
+def quantize_ref(quant, data, validate_range: bool = True):
+    """Quantize (float32) reference data to the (int8) output type of the model."""
+    if quant is None:
+        return data
+    quant_scale, quant_zero_point, quant_dtype, quant_range = quant
+    if quant_dtype is None or data.dtype.name == quant_dtype:
+        return data
+    assert data.dtype.name in ["float32"], "Quantization only supported for float32 input"
+    assert quant_dtype in ["int8"], "Quantization only supported for int8 output"
+    if quant_range and validate_range:
+        check_range(data, quant_range)
+    return np.around((data / quant_scale) + quant_zero_point).astype("int8")
+
+
+def dequantize(quant, data, validate_range: bool = True):
+    """Dequantize (int8) outputs of the model to float32."""
+    if quant is None:
+        return data
+    quant_scale, quant_zero_point, quant_dtype, quant_range = quant
+    if quant_dtype is None or data.dtype.name == quant_dtype:
+        return data
+    assert data.dtype.name in ["int8"], "Dequantization only supported for int8 input"
+    assert quant_dtype in ["float32"], "Dequantization only supported for float32 output"
+    ret = (data.astype("float32") - quant_zero_point) * quant_scale
+    if quant_range and validate_range:
+        check_range(ret, quant_range)
+    return ret
+
+
+def lookup_output(output, name: str, index: int):
+    """Lookup a single output of a sample by its name (with fallback to the output index)."""
+    if isinstance(output, dict):
+        if name in output:
+            return output[name]
+        # fallback for custom name-based npy dict
+        output = list(output.values())
+    else:  # fallback for index-based npy array
+        assert isinstance(output, (list, np.ndarray)), "expected dict, list or np.array type"
+    if index >= len(output):
+        raise RuntimeError(f"Output not found: {name}")
+    return output[index]
+
 
 LOOKUP = {
     "allclose": AllCloseMetric,
@@ -17,7 +17,11 @@
 # limitations under the License.
 #
 """Definition of a MLonMCU Run which represents a single benchmark instance for a given set of options."""
+import io
+import os
+import json
 import itertools
+import tarfile
 import time
 import copy
 import shutil
@@ -30,11 +34,12 @@ from collections import defaultdict
 import yaml
 
 from mlonmcu.logging import get_logger
-from mlonmcu.artifact import ArtifactFormat, lookup_artifacts
+from mlonmcu.setup import utils
+from mlonmcu.artifact import Artifact, ArtifactFormat, ArtifactList, lookup_artifacts
 from mlonmcu.config import str2bool
 from mlonmcu.platform.platform import CompilePlatform, TargetPlatform, BuildPlatform, TunePlatform
 from mlonmcu.report import Report  # TODO: move to mlonmcu.session.report
-from mlonmcu.config import resolve_required_config, filter_config
+from mlonmcu.config import ConfigView, resolve_required_config, filter_config, get_path_configs, is_path_config
 from mlonmcu.feature.type import FeatureType
 from mlonmcu.feature.features import get_matching_features, get_available_features
 from mlonmcu.target.metrics import Metrics
@@ -45,9 +50,13 @@ from mlonmcu.flow import SUPPORTED_FRAMEWORKS, SUPPORTED_BACKENDS
 
 from .postprocess import SUPPORTED_POSTPROCESSES
 from .postprocess.postprocess import RunPostprocess
+from .store import ContentStore
 
 logger = get_logger()
 
+# Subs and metrics before the first stage (shared, so that cached results of later stages stay valid)
+_NO_COMBINED_METRICS = ((), {})
+
 
 class RunStage(IntEnum):
     """Type describing the stages a run can have."""
@@ -75,6 +84,14 @@ def add_any(new, base=None, append=True):
     return ret
 
 
+def index_artifacts(artifacts_per_sub):
+    """Convert the artifact lists of every sub to indexed lists."""
+    return {
+        key: value if isinstance(value, ArtifactList) else ArtifactList(value)
+        for key, value in artifacts_per_sub.items()
+    }
+
+
 class RunInitializer:
 
     @staticmethod
@@ -249,7 +266,34 @@ class RunInitializer:
         return new
 
 
+def _json_default(obj):
+    if hasattr(obj, "item"):  # numpy scalars
+        return obj.item()
+    return str(obj)
+
+
+def _to_plain(value):
+    """Convert a (config) value to plain types which can be written with yaml.safe_dump."""
+    if value is None or type(value) in [bool, int, float, str]:
+        return value
+    if isinstance(value, dict):
+        return {_to_plain(key): _to_plain(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_to_plain(val) for val in value]
+    if isinstance(value, bool):
+        return bool(value)
+    if isinstance(value, int):  # e.g. enums
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    return str(value)
+
+
 class RunResult:
+    """Compact summary of a processed run which can be passed between processes."""
+
     # def __init__(self, run: "Run", session: "Session"):
     def __init__(self, run: "Run"):
         self.idx = run.idx
@@ -259,11 +303,52 @@ class RunResult:
         self.reason = run.reason
         # self.report = run.get_report(session=session)
         self.report = run.get_report()
+        self.metrics = run.get_all_metrics()
+        self.artifacts = run.get_artifact_manifest()
         # self.artifacts_per_stage = {}
         # self.stage = RunStage.NOP  # max executed stage
         # self.completed = {stage: stage == RunStage.NOP for stage in RunStage}
         # self.directories = {}
 
+    def to_dict(self):
+        return {
+            "idx": self.idx,
+            "dir": str(self.dir) if self.dir is not None else None,
+            "failing": self.failing,
+            "failed_stage": self.failed_stage,
+            "reason": str(self.reason) if self.reason is not None else None,
+            "report": self.report.to_dict(),
+            "metrics": self.metrics,
+            "artifacts": self.artifacts,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        ret = cls.__new__(cls)
+        ret.idx = data["idx"]
+        ret.dir = Path(data["dir"]) if data["dir"] is not None else None
+        ret.failing = data["failing"]
+        ret.failed_stage = data["failed_stage"]
+        ret.reason = data["reason"]
+        ret.report = Report.from_dict(data["report"])
+        ret.metrics = data.get("metrics", {})
+        ret.artifacts = data.get("artifacts", [])
+        return ret
+
+    def save(self, dest: Union[str, Path]):
+        """Write the result to a JSON file (written atomically to support concurrent readers)."""
+        dest = Path(dest)
+        tmp = dest.parent / f".{dest.name}.tmp"
+        with open(tmp, "w") as handle:
+            json.dump(self.to_dict(), handle, default=_json_default)
+        os.replace(tmp, dest)
+
+    @classmethod
+    def from_file(cls, src: Union[str, Path]):
+        with open(src, "r") as handle:
+            data = json.load(handle)
+        return cls.from_dict(data)
+
     def get_report(self, session=None):
         # TODO: read only?!
         # if session is not None:
@@ -286,15 +371,27 @@ class Run:
         "target_optimized_schedules": False,
         "stage_subdirs": False,
         "profile_stages": False,
+        "export_archives": "both",  # Allowed: none, tar, extracted, both
+        "dedup_exports": False,
+        "export_store_dir": None,  # Default: <session_dir>/store (runs of a session) or <run_dir>/.store
+        "export_link_mode": "hardlink",  # Allowed: hardlink, reflink, symlink, copy
+        "save_state": True,  # Write run.yml after every stage (required for resuming sessions)
+        "spill_artifacts": True,  # Drop large exported artifacts from memory (see MLONMCU_ARTIFACT_SPILL_THRESHOLD)
     }
 
     REQUIRED = set()
     OPTIONAL = set()
 
     @classmethod
-    def from_file(cls, path):
-        """Restore a run object which was written to the disk."""
-        raise NotImplementedError
+    def from_file(cls, path, context=None):
+        """Restore a run object which was written to the disk (see Run.save)."""
+        path = Path(path)
+        with open(path, "r") as f:
+            state = yaml.safe_load(f)
+        run = RunInitializer(**state["initializer"]).realize(context=context)
+        run.init_directory(parent=path.parent.parent)
+        run.load_state(state)
+        return run
 
     def __init__(
         self,
@@ -342,6 +439,10 @@ class Run:
         self.locked = False
         self.report = None
         self.dir = None
+        self.exported_archives = set()
+        self.exported_stages = set()
+        self.metrics_cache = {}
+        self.combined_metrics_cache = {}
 
     def process_features(self, features):
         """Utility which handles postprocess_features."""
@@ -389,6 +490,11 @@ class Run:
         value = self.run_config["export_optional"]
         return str2bool(value)
 
+    @property
+    def save_state(self):
+        value = self.run_config["save_state"]
+        return str2bool(value)
+
     @property
     def stage_subdirs(self):
         value = self.run_config["stage_subdirs"]
@@ -399,6 +505,37 @@ class Run:
         value = self.run_config["profile_stages"]
         return str2bool(value)
 
+    @property
+    def export_archives(self):
+        value = self.run_config["export_archives"]
+        assert value in ["none", "tar", "extracted", "both"], f"Invalid value for run.export_archives: {value}"
+        return value
+
+    @property
+    def spill_artifacts(self):
+        value = self.run_config["spill_artifacts"]
+        return str2bool(value)
+
+    @property
+    def dedup_exports(self):
+        value = self.run_config["dedup_exports"]
+        return str2bool(value)
+
+    @property
+    def export_store_dir(self):
+        value = self.run_config["export_store_dir"]
+        if value is not None:
+            return Path(value)
+        if getattr(self, "tempdir", None) is None and self.dir.parent.name == "runs":
+            # Share the store between all runs of a session (<session_dir>/runs/<idx>)
+            return self.dir.parent.parent / "store"
+        return self.dir / ".store"
+
+    @property
+    def export_link_mode(self):
+        value = self.run_config["export_link_mode"]
+        return value
+
     @property
     def build_platform(self):
         """Get platform for build stage."""
@@ -569,7 +706,8 @@ class Run:
                 hints=self.cache_hints,
             )
         )
-        component_config = self.config.copy()  # TODOL get rid of this
+        # Components may modify the passed config (i.e. via features), which must not affect the run config
+        component_config = ConfigView(self.config)
         return component_cls(features=self.features, config=component_config)
 
     def add_model(self, model):
@@ -865,13 +1003,14 @@ class Run:
     def artifacts(self):
         sub = "default"
         ret = sum(
-            list(itertools.chain([subs[sub] for stage, subs in self.artifacts_per_stage.items() if sub in subs])), []
+            list(itertools.chain([subs[sub] for stage, subs in self.artifacts_per_stage.items() if sub in subs])),
+            ArtifactList(),
         )
         return ret
 
     def get_all_sub_artifacts(self, sub, stage=None):
         if sub is None:
-            return []
+            return ArtifactList()
         assert sub in self.sub_names
         if stage is None:
             stage = self.last_stage
@@ -884,30 +1023,111 @@ class Run:
         """Utility not implemented yet. (TODO: remove?)"""
         raise NotImplementedError
 
-    def export_stage(self, stage, optional=False):
-        """Export stage artifacts of this run to its directory."""
-        # TODO: per stage subdirs?
-        subdir = self.stage_subdirs
+    def export_stage(self, stage, optional=False, skip_exported=False):
+        """Export stage artifacts of this run to its directory.
+
+        With skip_exported, stages which were already exported since they have been processed are skipped.
+        """
+        key = (int(stage), optional)
+        if skip_exported and key in self.exported_stages:
+            return
         if stage in self.artifacts_per_stage:
             for name in self.artifacts_per_stage[stage]:
-                artifacts = self.artifacts_per_stage[stage][name]
-                for artifact in artifacts:
-                    if not artifact.optional or optional:
-                        dest = self.dir
-                        if subdir:
-                            stage_idx = int(stage)
-                            dest = dest / "stages" / str(stage_idx)
-                            # TODO: stages.txt for mapping between stage idx and name
-                        if name not in ["", "default"]:
-                            dest = dest / "sub" / name
-                        dest.mkdir(parents=True, exist_ok=True)
-                        extract = artifact.fmt in [ArtifactFormat.MLF, ArtifactFormat.ARCHIVE]
-                        # extract = artifact.fmt == ArtifactFormat.MLF
-                        # and not isinstance(self.platform, MicroTvmPlatform)
-                        artifact.export(dest)
-                        # Keep the tar as well as the extracted files
-                        if extract:
-                            artifact.export(dest, extract=True)
+                self.export_sub(stage, name, self.artifacts_per_stage[stage][name], optional=optional)
+            self.exported_stages.add(key)
+
+    def export_sub(self, stage, name, artifacts, optional=False):
+        """Export the artifacts of a single sub of the given stage to its directory."""
+        # TODO: per stage subdirs?
+        subdir = self.stage_subdirs
+        store = ContentStore(self.export_store_dir, mode=self.export_link_mode) if self.dedup_exports else None
+        for artifact in artifacts:
+            if not artifact.optional or optional:
+                dest = self.dir
+                if subdir:
+                    stage_idx = int(stage)
+                    dest = dest / "stages" / str(stage_idx)
+                    # TODO: stages.txt for mapping between stage idx and name
+                if name not in ["", "default"]:
+                    dest = dest / "sub" / name
+                dest.mkdir(parents=True, exist_ok=True)
+                extract = artifact.fmt in [ArtifactFormat.MLF, ArtifactFormat.ARCHIVE]
+                # extract = artifact.fmt == ArtifactFormat.MLF
+                # and not isinstance(self.platform, MicroTvmPlatform)
+                if extract:
+                    self._export_archive(stage, artifact, dest, store=store)
+                    if self.spill_artifacts and artifact.path == dest / artifact.name and artifact.path.is_file():
+                        artifact.spill(dest)
+                    continue
+                if self.spill_artifacts:
+                    # Large artifacts are written once and only referenced afterwards (also when pickled)
+                    artifact.spill(dest)
+                artifact.export(dest)
+                if store is not None and artifact.path is not None and artifact.path.parent == dest:
+                    store.add(artifact.path)
+
+    def _export_archive(self, stage, artifact, dest, store=None):
+        """Export a MLF/ARCHIVE artifact according to the run.export_archives policy."""
+        key = (int(stage), str(dest), artifact.name)
+        if key in self.exported_archives:
+            return  # Do not extract the same archive again
+        policy = self.export_archives
+        if (
+            policy in ["none", "tar"]
+            and artifact.fmt == ArtifactFormat.MLF
+            and stage == RunStage.BUILD
+            and self.has_stage(RunStage.COMPILE)
+        ):
+            # The compile stage works on the extracted codegen results
+            policy = "both" if policy == "tar" else "extracted"
+        if policy == "none":
+            return
+        members = self._get_archive_members(artifact) if store is not None else []
+        if policy in ["extracted", "both"]:
+            for member in members:
+                utils.unshare(dest / member)
+            artifact.export(dest, extract=True)  # Writes the tar as well
+            if policy == "extracted" and not artifact.lazy and artifact.path == dest / artifact.name:
+                artifact.path.unlink()
+                artifact.path = None
+        else:
+            artifact.export(dest)
+        if store is not None:
+            if artifact.path is not None and artifact.path.parent == dest:
+                store.add(artifact.path)
+            for member in members:
+                member_file = dest / member
+                if member_file.is_file():
+                    store.add(member_file)
+        self.exported_archives.add(key)
+
+    @staticmethod
+    def _get_archive_members(artifact):
+        """Return the files contained in a tar archive artifact."""
+        try:
+            if artifact.lazy:
+                handle = tarfile.open(artifact.path)
+            else:
+                handle = tarfile.open(fileobj=io.BytesIO(artifact.raw))
+        except tarfile.TarError:
+            return []
+        with handle:
+            return [member.name for member in handle.getmembers() if member.isfile()]
+
+    def detach_lazy_artifacts(self, stage, new, optional=False):
+        """Make sure that lazy artifacts do not refer to files in shared build directories anymore.
+
+        Platforms reuse their build directory for every sub, hence files backing lazy artifacts
+        would be overwritten before the stage gets exported.
+        """
+        for name, artifacts in new.items():
+            lazy_artifacts = [artifact for artifact in artifacts if artifact.lazy]
+            if len(lazy_artifacts) == 0:
+                continue
+            self.export_sub(stage, name, lazy_artifacts, optional=optional)
+            for artifact in lazy_artifacts:
+                if artifact.optional and not optional:
+                    artifact.cache()
 
     def postprocess(self):
         """Postprocess the 'run'."""
@@ -928,7 +1148,7 @@ class Run:
                     de[i].extend(j)
             return dict(de)
 
-        self.artifacts_per_stage[RunStage.POSTPROCESS] = {"default": []}
+        self.artifacts_per_stage[RunStage.POSTPROCESS] = {"default": ArtifactList()}
         temp_report = self.get_report()
         last_stage = self.last_stage
         assert last_stage is not None
@@ -957,7 +1177,7 @@ class Run:
                     else:
                         new.update({name if name in ["", "default"] else f"{name}": artifacts})
                     merged = _merge_dicts_of_lists(merged, new)
-            self.artifacts_per_stage[RunStage.POSTPROCESS].update(merged)
+            self.artifacts_per_stage[RunStage.POSTPROCESS].update(index_artifacts(merged))
             self.sub_parents.update({(RunStage.POSTPROCESS, key): (self.last_stage, name) for key in merged.keys()})
         self.sub_names.extend(self.artifacts_per_stage[RunStage.POSTPROCESS])
         self.sub_names = list(set(self.sub_names))
@@ -991,7 +1211,7 @@ class Run:
                     }
                 else:
                     new = {name if name in ["", "default"] else f"{name}": artifacts}
-                self.artifacts_per_stage[RunStage.RUN].update(new)
+                self.artifacts_per_stage[RunStage.RUN].update(index_artifacts(new))
                 self.sub_parents.update({(RunStage.RUN, key): (self.last_stage, name) for key in new.keys()})
         else:
             assert self.completed[RunStage.BUILD]  # Used for tvm platform
@@ -1010,7 +1230,7 @@ class Run:
                     }
                 else:
                     new = {name if name in ["", "default"] else f"{name}": artifacts}
-                self.artifacts_per_stage[RunStage.RUN].update(new)
+                self.artifacts_per_stage[RunStage.RUN].update(index_artifacts(new))
                 self.sub_parents.update({(RunStage.RUN, key): (self.last_stage, name) for key in new.keys()})
         self.sub_names.extend(self.artifacts_per_stage[RunStage.RUN])
         self.sub_names = list(set(self.sub_names))
@@ -1047,7 +1267,8 @@ class Run:
                     }
                 else:
                     new = {name if name in ["", "default"] else f"{name}": artifacts}
-                self.artifacts_per_stage[RunStage.COMPILE].update(new)
+                self.detach_lazy_artifacts(RunStage.COMPILE, new, optional=self.export_optional)
+                self.artifacts_per_stage[RunStage.COMPILE].update(index_artifacts(new))
                 self.sub_parents.update({(RunStage.COMPILE, key): (self.last_stage, name) for key in new.keys()})
         else:
             assert self.completed[RunStage.LOAD]
@@ -1062,7 +1283,8 @@ class Run:
                 }
             else:
                 new = {name if name in ["", "default"] else f"{name}": artifacts}
-            self.artifacts_per_stage[RunStage.COMPILE].update(new)
+            self.detach_lazy_artifacts(RunStage.COMPILE, new, optional=self.export_optional)
+            self.artifacts_per_stage[RunStage.COMPILE].update(index_artifacts(new))
             self.sub_parents.update({(RunStage.COMPILE, key): (self.last_stage, name) for key in new.keys()})
         self.sub_names.extend(self.artifacts_per_stage[RunStage.COMPILE])
         self.sub_names = list(set(self.sub_names))
@@ -1099,7 +1321,7 @@ class Run:
                 }
             else:
                 new = {name if name in ["", "default"] else f"{name}": artifacts}
-            self.artifacts_per_stage[RunStage.BUILD].update(new)
+            self.artifacts_per_stage[RunStage.BUILD].update(index_artifacts(new))
             self.sub_parents.update({(RunStage.BUILD, key): (self.last_stage, name) for key in new.keys()})
 
         self.artifacts_per_stage[RunStage.BUILD] = {}
@@ -1229,7 +1451,7 @@ class Run:
                     new = {key if name in ["", "default"] else f"{name}_{key}": value for key, value in res.items()}
                 else:
                     new = {name if name in ["", "default"] else f"{name}": res}
-            self.artifacts_per_stage[RunStage.TUNE].update(new)
+            self.artifacts_per_stage[RunStage.TUNE].update(index_artifacts(new))
             self.sub_parents.update({(RunStage.TUNE, key): (RunStage.LOAD, name) for key in new.keys()})
         self.sub_names.extend(self.artifacts_per_stage[RunStage.TUNE])
         self.sub_names = list(set(self.sub_names))
@@ -1274,9 +1496,9 @@ class Run:
                                 platform.config[name] = value
                     self.config[key] = value
         if isinstance(artifacts, dict):
-            self.artifacts_per_stage[RunStage.LOAD] = artifacts
+            self.artifacts_per_stage[RunStage.LOAD] = index_artifacts(artifacts)
         else:
-            self.artifacts_per_stage[RunStage.LOAD] = {"default": artifacts}
+            self.artifacts_per_stage[RunStage.LOAD] = {"default": ArtifactList(artifacts)}
         self.sub_names.extend(self.artifacts_per_stage[RunStage.LOAD])
         self.sub_names = list(set(self.sub_names))
         self.sub_parents.update(
@@ -1321,6 +1543,9 @@ class Run:
                 continue
             if stage < RunStage.POSTPROCESS:
                 self.report = None  # Regenerate report if earlier stages are executed
+            # Archives of this stage will be regenerated
+            self.exported_archives = {key for key in self.exported_archives if key[0] != stage}
+            self.exported_stages = {key for key in self.exported_stages if key[0] != stage}
             stage_funcs = {
                 RunStage.NOP: lambda *args, **kwargs: None,  # stage already done
                 RunStage.LOAD: self.load,
@@ -1340,6 +1565,10 @@ class Run:
                     if self.profile_stages:
                         end = time.time()
                         self.times[stage] = (start, end)
+                    if RunStage.LOAD <= stage < RunStage.POSTPROCESS:
+                        self.get_combined_metrics(RunStage(stage))  # Report rows are built as stages finish
+                    if export and self.save_state:
+                        self.persist_state(stage)
                 except Exception as e:
                     self.failing = True
                     self.reason = e
@@ -1349,6 +1578,12 @@ class Run:
                     run_stage = RunStage(stage).name
                     self.failed_stage = run_stage
                     logger.error("%s Run failed at stage '%s', aborting...", self.prefix, run_stage)
+                    if export and self.save_state:
+                        try:
+                            self.persist_state(stage)  # Record the failure as well
+                        except Exception as err:
+                            logger.warning("%s Failed to save run state: %s", self.prefix, err)
+                if self.failing:
                     break
             # self.stage = stage  # FIXME: The stage_func should update the stage intead?
         report = self.get_report()
@@ -1426,14 +1661,17 @@ class Run:
                 if key not in omit_list
             }
             if omit_paths:
-                ret = {
-                    key: value
-                    for key, value in ret.items()
-                    if not (
-                        isinstance(value, Path)
-                        or (isinstance(value, str) and len(str(value)) < 200 and Path(value).exists())
-                    )
-                }
+                # Path-like keys are classified by their definition instead of probing the filesystem
+                path_keys = get_path_configs(type(obj))
+
+                def is_path(key, value):
+                    if isinstance(value, Path):
+                        return True
+                    if not isinstance(value, str):
+                        return False
+                    return key in path_keys or key[len(name) + 1 :] in path_keys or is_path_config(key)
+
+                ret = {key: value for key, value in ret.items() if not is_path(key, value)}
             return ret
 
         ret = {}
@@ -1459,6 +1697,99 @@ class Run:
             ret.update(config_helper(postprocess))
         return ret
 
+    def get_stage_metrics(self, stage, name, metrics_artifact):
+        """Return a copy of the parsed metrics artifact of a stage/sub (only parsed once per artifact)."""
+        key = (stage, name)
+        cached = self.metrics_cache.get(key)
+        if cached is None or cached[0] is not metrics_artifact:
+            if isinstance(metrics_artifact.data, Metrics):
+                metrics = metrics_artifact.data  # Typed metrics, CSV is only used for exporting
+            else:
+                metrics = Metrics.from_csv(metrics_artifact.content)
+            cached = (metrics_artifact, metrics)
+            self.metrics_cache[key] = cached
+        return cached[1].copy()
+
+    def get_combined_metrics(self, stage):
+        """Returns the subs and their metrics combined with the ones of their parents up to the given stage.
+
+        The result is cached per stage and only recomputed if the metrics of this or an earlier stage changed,
+        which allows building the report rows incrementally as stages finish.
+        """
+        if stage > RunStage.LOAD:
+            prev = self.get_combined_metrics(RunStage(stage - 1))
+        else:
+            prev = _NO_COMBINED_METRICS
+        metrics_artifacts = {}
+        if stage in self.artifacts_per_stage:
+            filename = f"{stage.name.lower()}_metrics.csv"
+            for name, artifacts in self.artifacts_per_stage[stage].items():
+                metrics_artifact = lookup_artifacts(artifacts, name=filename)
+                assert len(metrics_artifact) <= 1
+                metrics_artifacts[name] = metrics_artifact[0] if len(metrics_artifact) > 0 else None
+        cached = self.combined_metrics_cache.get(stage)
+        if (
+            cached is not None
+            and cached[0] is prev
+            and cached[1].keys() == metrics_artifacts.keys()
+            and all(cached[1][name] is artifact for name, artifact in metrics_artifacts.items())
+        ):
+            return cached[2]
+        subs, prev_metrics_by_sub = prev
+        metrics_by_sub = dict(prev_metrics_by_sub)
+        if stage in self.artifacts_per_stage:
+            names = list(self.artifacts_per_stage[stage].keys())
+            for name, metrics_artifact in metrics_artifacts.items():
+                if metrics_artifact is None:
+                    continue
+                metrics = self.get_stage_metrics(stage, name, metrics_artifact)
+                metrics_data = metrics.get_data(include_optional=self.export_optional)
+                # Combine with existing metrics
+                _, parent_name = self.sub_parents[(stage, name)]
+                if parent_name in prev_metrics_by_sub:
+                    parent_metrics_data = prev_metrics_by_sub[parent_name].get_data(
+                        include_optional=self.export_optional
+                    )
+                else:
+                    parent_metrics_data = {}
+                for key, value in parent_metrics_data.items():
+                    if key not in metrics_data:
+                        metrics.add(key, value)
+                metrics_by_sub[name] = metrics
+            if len(names) >= len(subs):  # Fewer subs if the run failed
+                subs = names
+        ret = (subs, metrics_by_sub)
+        self.combined_metrics_cache[stage] = (prev, metrics_artifacts, ret)
+        return ret
+
+    def get_all_metrics(self):
+        """Returns the metrics of all stages/subs as serializable dicts (`stage -> sub -> metrics`)."""
+        ret = {}
+        for stage, artifacts_per_sub in self.artifacts_per_stage.items():
+            filename = f"{RunStage(stage).name.lower()}_metrics.csv"
+            for name, artifacts in artifacts_per_sub.items():
+                metrics_artifact = lookup_artifacts(artifacts, name=filename, first_only=True)
+                if len(metrics_artifact) == 0:
+                    continue
+                metrics = self.get_stage_metrics(stage, name, metrics_artifact[0])
+                ret.setdefault(RunStage(stage).name, {})[name] = metrics.to_dict()
+        return ret
+
+    def get_artifact_manifest(self):
+        """Returns a list describing all artifacts of this run without their contents."""
+        ret = []
+        for stage, artifacts_per_sub in self.artifacts_per_stage.items():
+            for name, artifacts in artifacts_per_sub.items():
+                for artifact in artifacts:
+                    ret.append(
+                        {
+                            "stage": RunStage(stage).name,
+                            "sub": name,
+                            **artifact.serialize(full=False),
+                        }
+                    )
+        return ret
+
     def get_report(self, session=None):
         """Returns teh complete report of this run."""
         if self.completed[RunStage.POSTPROCESS]:
@@ -1497,52 +1828,9 @@ class Run:
             if reason_text:
                 post["Reason"] = reason_text
 
-        self.export_stage(RunStage.RUN, optional=self.export_optional)
+        self.export_stage(RunStage.RUN, optional=self.export_optional, skip_exported=True)
 
-        subs = []
-        # metrics = Metrics()
-        metrics_by_sub = {}
-
-        def metrics_helper(stage, subs):
-            # if self.failing:
-            #     return subs
-            if stage in self.artifacts_per_stage:
-                prev_metrics_by_sub = metrics_by_sub.copy()
-                names = self.artifacts_per_stage[stage].keys()
-                subs = names
-                for name in self.artifacts_per_stage[stage]:
-                    # metrics_by_sub[name] = Metrics()
-                    if len(self.artifacts_per_stage[stage][name]) > 0:
-                        filename = f"{stage.name.lower()}_metrics.csv"
-                        metrics_artifact = lookup_artifacts(self.artifacts_per_stage[stage][name], name=filename)
-                        if len(metrics_artifact) == 0:
-                            continue
-                        assert len(metrics_artifact) == 1
-                        metrics_artifact = metrics_artifact[0]
-                        metrics = Metrics.from_csv(metrics_artifact.content)
-                        metrics_data = metrics.get_data(include_optional=self.export_optional)
-                        # Combine with existing metrics
-                        parents = self.sub_parents[(stage, name)]
-                        parent_stage, parent_name = parents
-                        if parent_name in prev_metrics_by_sub:
-                            parent_metrics_data = prev_metrics_by_sub[parent_name].get_data(
-                                include_optional=self.export_optional
-                            )
-                        else:
-                            parent_metrics_data = {}
-                        for key, value in parent_metrics_data.items():
-                            if key not in metrics_data:
-                                metrics.add(key, value)
-                        metrics_by_sub[name] = metrics
-            return subs
-
-        for stage in range(RunStage.LOAD, RunStage.POSTPROCESS):
-            subs_ = metrics_helper(RunStage(stage), subs)
-            if len(subs_) < len(subs):
-                # assert self.failing
-                pass
-            else:
-                subs = subs_
+        subs, metrics_by_sub = self.get_combined_metrics(RunStage(RunStage.POSTPROCESS - 1))
 
         pres = []
         mains = []
@@ -1598,23 +1886,93 @@ class Run:
     #     # Add baz back since it doesn't exist in the pickle
     #     # self.baz = 0
 
+    def get_state(self):
+        """Return everything required to continue processing this run later as a serializable dict."""
+        initializer = self.initializer()._serialize()["runs"][0]
+        initializer = _to_plain(initializer)  # run.yml is read with yaml.safe_load
+        return {
+            "initializer": initializer,
+            "completed": [RunStage(stage).name for stage, done in self.completed.items() if done],
+            "failing": self.failing,
+            "failed_stage": self.failed_stage,
+            "sub_parents": [
+                [
+                    RunStage(stage).name,
+                    name,
+                    RunStage(parent_stage).name if parent_stage is not None else None,
+                    parent_name,
+                ]
+                for (stage, name), (parent_stage, parent_name) in self.sub_parents.items()
+            ],
+            "artifacts": self.get_artifact_manifest(),
+        }
+
+    def load_state(self, state):
+        """Restore the completed stages and their artifacts from the output of Run.get_state.
+
+        Stages with artifacts which are not available on disk anymore are processed again.
+        """
+        artifacts_per_stage = {}
+        missing = set()
+        for data in state.get("artifacts", []):
+            stage = RunStage[data["stage"]]
+            artifact = Artifact.deserialize(data)
+            if artifact is None:
+                if not data.get("optional", False):
+                    missing.add(stage)
+                continue
+            artifacts_per_stage.setdefault(stage, {}).setdefault(data["sub"], ArtifactList()).append(artifact)
+        completed = [RunStage[name] for name in state.get("completed", [])]
+        first_missing = min(missing) if len(missing) > 0 else RunStage.DONE
+        for stage in completed:
+            if stage >= first_missing:
+                logger.warning("%s Artifacts of stage %s are missing, processing again", self.prefix, stage.name)
+                continue
+            self.completed[stage] = True
+            self.artifacts_per_stage[stage] = artifacts_per_stage.get(stage, {"default": ArtifactList()})
+        for stage, name, parent_stage, parent_name in state.get("sub_parents", []):
+            stage = RunStage[stage]
+            if self.completed[stage]:
+                parent_stage = RunStage[parent_stage] if parent_stage is not None else None
+                self.sub_parents[(stage, name)] = (parent_stage, parent_name)
+        for subs in self.artifacts_per_stage.values():
+            self.sub_names.extend(subs)
+        self.sub_names = list(set(self.sub_names))
+
+    def persist_state(self, stage):
+        """Export the artifacts of a completed stage and write run.yml to allow resuming interrupted sessions."""
+        if self.completed[stage]:
+            self.export_stage(stage, optional=self.export_optional)
+        self.save(self.dir / "run.yml")
+
+    def restore_state(self):
+        """Continue from the state file (run.yml) in the run directory if available."""
+        state_file = self.dir / "run.yml"
+        if not state_file.is_file():
+            return False
+        with open(state_file, "r") as f:
+            state = yaml.safe_load(f)
+        self.load_state(state)
+        logger.debug("%s Restored run state (next stage: %s)", self.prefix, RunStage(self.next_stage).name)
+        return True
+
     def save(self, dest: Union[str, Path], fmt: Optional[str] = None):
-        raise NotImplementedError
-        # if not isinstance(dest, Path):
-        #     assert isinstance(dest, str)
-        #     dest = Path(dest)
-        # # data = self._serialize()
-        # if fmt is None:
-        #     fmt = dest.suffix
-        #     assert fmt
-        #     if fmt[0] == ".":
-        #         fmt = fmt[1:]
-        # if fmt.lower() in ["pkl", "pickle"]:
-        #     import pickle
-        #     with open(dest, "wb") as f:
-        #         pickle.dump(self, f)
-        # else:
-        #     raise ValueError(f"Unsupported format: {fmt}")
+        """Write the state of the run to disk (see Run.from_file)."""
+        if not isinstance(dest, Path):
+            assert isinstance(dest, str)
+            dest = Path(dest)
+        if fmt is None:
+            fmt = dest.suffix
+            assert fmt
+            if fmt[0] == ".":
+                fmt = fmt[1:]
+        if fmt.lower() in ["yml", "yaml"]:
+            tmp = dest.parent / f".{dest.name}.tmp"
+            with open(tmp, "w") as f:
+                yaml.safe_dump(self.get_state(), f, allow_unicode=True)
+            os.replace(tmp, dest)  # Do not leave a truncated file behind if interrupted
+        else:
+            raise ValueError(f"Unsupported format: {fmt}")
 
     def save_artifacts(self, dest: Union[str, Path], fmt: Optional[str] = None, full: bool = False):
         if not isinstance(dest, Path):
@@ -1665,11 +2023,11 @@ class Run:
     def initializer(self):
         return RunInitializer(
             idx=self.idx,
-            model_name=self.model.name,
-            framework_name=self.framework.name,
+            model_name=self.model.name if self.model else None,
+            framework_name=self.framework.name if self.framework else None,
             frontend_names=[frontend.name for frontend in self.frontends],
-            backend_name=self.backend.name,
-            target_name=self.target.name,
+            backend_name=self.backend.name if self.backend else None,
+            target_name=self.target.name if self.target else None,
             platform_names=[platform.name for platform in self.platforms],
             feature_names=[feature.name for feature in self.features],
             config={**self.config},
@@ -1679,10 +2037,10 @@ class Run:
 
 
 class ArchivedRun(Run):
+    """Run restored from disk without instantiating its components (for inspecting old sessions)."""
 
     def __init__(self, **kwargs):
         super().__init__(
-            self,
             archived=True,
             **kwargs,
         )
@@ -1692,22 +2050,27 @@ class ArchivedRun(Run):
         path = Path(path)
         assert path.is_file()
         with open(path, "r") as f:
-            yaml_data = yaml.safe_load(f)
-        print("yaml_data", yaml_data)
-        return ArchivedRun(**yaml_data)
+            state = yaml.safe_load(f)
+        initializer = state["initializer"]
+        ret = ArchivedRun(
+            idx=initializer.get("idx"),
+            config=initializer.get("config"),
+            comment=initializer.get("comment") or "",
+        )
+        ret.dir = path.parent
+        ret.failing = state.get("failing", False)
+        ret.failed_stage = state.get("failed_stage")
+        ret.load_state(state)
+        return ret
 
     @staticmethod
-    def from_dir(path: Union[Path, str], allow_missing: bool = True):
+    def from_dir(path: Union[Path, str], allow_missing: bool = True, load: bool = True):
         path = Path(path)
         assert path.is_dir()
         run_yaml = path / "run.yml"
-        if not run_yaml.is_file():
-            assert allow_missing, f"Run YAML does not exist: {path}"
+        if not load or not run_yaml.is_file():
+            assert allow_missing or run_yaml.is_file(), f"Run YAML does not exist: {path}"
             ret = ArchivedRun()
             ret.dir = path
             return ret
-        return ArchivedRun.from_file(run_yaml, allow_missing=allow_missing)
-
-    @staticmethod
-    def restore(self):
-        raise NotImplementedError
+        return ArchivedRun.from_file(run_yaml)
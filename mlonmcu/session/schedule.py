@@ -18,17 +18,22 @@
 #
 """Definition of MLonMCU session schedulers."""
 import random
+import tempfile
+import threading
 from pathlib import Path
 import concurrent.futures
+from collections import defaultdict
 from typing import List, Optional
 
 from mlonmcu.session.run import Run, RunInitializer, RunResult, RunStage
 from mlonmcu.logging import get_logger
 from mlonmcu.setup import utils
 
+from .postprocess import SUPPORTED_POSTPROCESSES
 from .postprocess.postprocess import SessionPostprocess
 from .progress import init_progress, update_progress, close_progress
 from .rpc import connect_tracker, RemoteConfig
+from .worker import PopenWorker, WorkerError
 
 logger = get_logger()  # TODO: rename to get_mlonmcu_logger
 
@@ -113,6 +118,106 @@ class ThreadPoolSessionExecutor(concurrent.futures.ThreadPoolExecutor):
         return self.submit(fn, *args, **kwargs)
 
 
+class PopenPoolSessionExecutor(concurrent.futures.ThreadPoolExecutor):
+    """Dispatches runs to long-lived worker processes (one per thread) which keep their context warm.
+
+    Workers are replaced after processing `max_runs` runs, if their memory usage grew by more than
+    `max_memory_growth` MB or if they crashed. If a batch fails, its runs are resubmitted one by one, so that
+    only the run which crashed the worker fails.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        home: Optional[str] = None,
+        max_runs: Optional[int] = None,
+        max_memory_growth: Optional[int] = None,
+    ):
+        super().__init__(max_workers)
+        self.home = home
+        self.max_runs = max_runs
+        self.max_memory_growth = max_memory_growth
+        self._local = threading.local()
+        self._workers = []
+        self._workers_lock = threading.Lock()
+
+    def _get_worker(self):
+        worker = getattr(self._local, "worker", None)
+        if worker is None or not worker.alive:
+            worker = PopenWorker(home=self.home)
+            self._local.worker = worker
+            with self._workers_lock:
+                self._workers.append(worker)
+        return worker
+
+    def _release_worker(self, worker):
+        recycle = not worker.alive
+        if self.max_runs and worker.num_runs >= self.max_runs:
+            logger.debug("Recycling worker after %d runs", worker.num_runs)
+            recycle = True
+        if self.max_memory_growth and worker.memory_growth > self.max_memory_growth * 1024 * 1024:
+            logger.debug("Recycling worker after memory growth of %d bytes", worker.memory_growth)
+            recycle = True
+        if recycle:
+            worker.close()
+            self._local.worker = None
+            with self._workers_lock:
+                self._workers.remove(worker)
+
+    def _process_batch(self, runs, **kwargs):
+        worker = self._get_worker()
+        try:
+            return worker.process_runs(runs, **kwargs)
+        finally:
+            self._release_worker(worker)
+
+    def _process(self, runs, **kwargs):
+        try:
+            return self._process_batch(runs, **kwargs)
+        except WorkerError as err:
+            if len(runs) == 1:
+                raise
+            logger.warning("Worker failed to process a batch of %d runs, retrying them one by one: %s", len(runs), err)
+        # Isolate the failing run, the other ones continue from their saved state
+        ret = []
+        for run in runs:
+            try:
+                ret.extend(self._process_batch([run], **kwargs))
+            except WorkerError as err:
+                logger.error("Worker failed to process run %s: %s", run.idx, err)
+                ret.append(None)
+        return ret
+
+    def submit_runs(
+        self,
+        runs,
+        until=None,
+        skip=None,
+        export=False,
+        context=None,
+        runs_dir=None,
+        save=True,
+        cleanup=False,
+    ):
+        del context  # The workers use their own context
+        kwargs = {
+            "until": until,
+            "skip": skip,
+            "export": export,
+            "runs_dir": runs_dir,
+            "save": save,
+            "cleanup": cleanup,
+        }
+        return self.submit(self._process, runs, **kwargs)
+
+    def shutdown(self, *args, **kwargs):
+        super().shutdown(*args, **kwargs)
+        with self._workers_lock:
+            for worker in self._workers:
+                worker.close()
+            self._workers = []
+
+
 class CmdlineSessionExecutor(concurrent.futures.ProcessPoolExecutor):
 
     def __init__(self, max_workers: Optional[int] = None, parallel_jobs: int = 1):
@@ -268,6 +373,7 @@ def _process_pickable(run_initializers, until, skip, export, context, runs_dir,
         run = run_initializer.realize(context=context)
         run.init_directory(parent=runs_dir)
         run_initializer.save(run.dir / "initializer.yml")
+        run.restore_state()  # Continue resumed or retried runs
         used_stages = _used_stages([run], until)
         assert skip is None
         skip = [stage for stage in RunStage if stage not in used_stages]
@@ -293,32 +399,51 @@ def _process_pickable(run_initializers, until, skip, export, context, runs_dir,
 def _process_cmdline(run_initializers, until, skip, export, context, runs_dir, save, cleanup, parallel_jobs):
     """Helper function to invoke the run."""
     rets = []
+    runs = []
     # parallel_jobs = 1
-    args = [
-        "-m",
-        "mlonmcu.cli.main",
-        "flow",
-        until.name.lower(),
-        "_",
-        "--parallel",
-        str(parallel_jobs),
-        "-c",
-        "runs_per_stage=0",
-        "-c",
-        "session.use_init_stage=1",
-        "--initializer",
-    ]
-    for run_initializer in run_initializers:
-        run = run_initializer.realize(context=context)
-        run.init_directory(parent=runs_dir)
-        run_initializer.save(run.dir / "initializer.yml")
-        args.append(run.dir / "initializer.yml")
-        res = None  # TODO
-        rets.append(res)
-    # print("args", args)
-    # out = utils.python(*args)
-    _ = utils.python(*args)
-    # print("out", out)
+    with tempfile.TemporaryDirectory() as result_dir:
+        args = [
+            "-m",
+            "mlonmcu.cli.main",
+            "flow",
+            until.name.lower(),
+            "_",
+            "--parallel",
+            str(parallel_jobs),
+            "-c",
+            "runs_per_stage=0",
+            "-c",
+            "session.use_init_stage=1",
+            "-c",
+            f"session.result_dir={result_dir}",
+            "--initializer",
+        ]
+        for run_initializer in run_initializers:
+            run = run_initializer.realize(context=context)
+            run.init_directory(parent=runs_dir)
+            run_initializer.save(run.dir / "initializer.yml")
+            args.append(run.dir / "initializer.yml")
+            runs.append(run)
+        # print("args", args)
+        try:
+            utils.python(*args)
+        except AssertionError as e:
+            # The child exits with a non-zero code if any run failed, results are still available
+            logger.debug("Child process failed: %s", e)
+        for i, run in enumerate(runs):
+            result_file = Path(result_dir) / f"{i}.json"
+            if result_file.is_file():
+                res = RunResult.from_file(result_file)
+                res.idx = run.idx  # The child process uses its own run ids
+                if "Run" in res.report.pre_df.columns:
+                    res.report.pre_df["Run"] = run.idx
+            else:
+                run.failing = True
+                run.reason = RuntimeError("Child process did not produce a result")
+                res = run.result()
+            if save:
+                res.save(run.dir / "result.json")
+            rets.append(res)
     return rets
 
 
@@ -332,8 +457,7 @@ def _process_context(run_initializers, until, skip, export, runs_dir, save, clea
         with context.get_session(resume=False) as session:
             for run_initializer in run_initializers:
                 session.add_run(run_initializer, ignore_idx=True)
-                rets.append(None)
-            success = session.process_runs(
+            session.process_runs(
                 until=until,
                 per_stage=False,
                 print_report=False,
@@ -342,7 +466,8 @@ def _process_context(run_initializers, until, skip, export, runs_dir, save, clea
                 context=context,
                 export=True,
             )
-        assert success
+            # Failing runs are reported via the results (None if the failed stage is unknown)
+            rets = list(session.results)
     return rets
 
 
@@ -392,14 +517,71 @@ def _postprocess_default(runs, report, dest, progress=False):
     return num_failing
 
 
+class RunHandle:
+    """Lightweight stand-in for a run processed by another process.
+
+    Only the session postprocesses of the run are instantiated, which is sufficient to apply them to the
+    aggregated report in the parent process.
+    """
+
+    def __init__(self, run_initializer: RunInitializer):
+        self.idx = run_initializer.idx
+        self.postprocesses = []
+        config = run_initializer.config if run_initializer.config else {}
+        for name in run_initializer.postprocess_names or []:
+            postprocess_cls = SUPPORTED_POSTPROCESSES[name]
+            if issubclass(postprocess_cls, SessionPostprocess):
+                self.postprocesses.append(postprocess_cls(config=dict(config)))
+
+
 def _postprocess_pickable(runs, report, dest, progress=False):
-    logger.error("Session Postprocesses are not supported in pickable mode!")
-    return 0
+    handles = [run if isinstance(run, Run) else RunHandle(run) for run in runs]
+    return _postprocess_default(handles, report, dest, progress=progress)
 
 
 # TODO: alternative _process functions
 
 
+def parse_stage_resources(value):
+    """Parse per stage (and optionally per target) values, e.g. `build=2,run=4,run:ara=1` or a dict.
+
+    Returns a dict with (stage, target_name or None) keys.
+    """
+    if value is None:
+        return {}
+    if isinstance(value, str):
+        value = dict(item.split("=", 1) for item in value.split(",") if len(item.strip()) > 0)
+    assert isinstance(value, dict), f"Invalid stage resources: {value}"
+    ret = {}
+    for key, amount in value.items():
+        stage, target = (str(key).split(":", 1) + [None])[:2] if not isinstance(key, RunStage) else (key, None)
+        stage = stage if isinstance(stage, RunStage) else RunStage[stage.strip().upper()]
+        target = target.strip() if target is not None else None
+        amount = int(amount)
+        assert amount > 0, f"Stage resources need to be positive: {key}"
+        ret[(stage, target)] = amount
+    return ret
+
+
+def get_available_memory():
+    """Return the available system memory in MB (None if unknown)."""
+    try:
+        with open("/proc/meminfo", "r") as handle:
+            for line in handle:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _get_target_name(run):
+    if isinstance(run, RunInitializer):
+        return run.target_name
+    target = getattr(run, "target", None)
+    return target.name if target is not None else None
+
+
 def _used_stages(runs, until):
     """Determines the stages which are used by at least one run."""
     used = []
@@ -429,6 +611,14 @@ class SessionScheduler:
         prefix: Optional[str] = None,
         runs_dir: Optional[Path] = None,
         session=None,  # TODO: typing
+        home: Optional[str] = None,
+        worker_max_runs: Optional[int] = None,
+        worker_max_memory_growth: Optional[int] = None,
+        retries: int = 0,
+        pipeline: bool = False,
+        stage_limits=None,
+        stage_memory=None,
+        memory_budget=None,
     ):
         self.runs = runs
         self.results = [None] * len(runs)
@@ -438,6 +628,9 @@ class SessionScheduler:
         self.executor = executor
         self.num_workers = num_workers
         self.parallel_jobs = parallel_jobs
+        self.home = home
+        self.worker_max_runs = worker_max_runs
+        self.worker_max_memory_growth = worker_max_memory_growth
         self._executor_cls, self._executor_kwargs = self._handle_executor(executor, remote_config)
         self.shuffle = shuffle
         self.batch_size = batch_size
@@ -445,9 +638,16 @@ class SessionScheduler:
         self.runs_dir = session.runs_dir if session is not None else runs_dir
         self.use_init_stage = use_init_stage
         self._futures = []
+        self.retries = retries
+        self.pipeline = pipeline
+        self.stage_limits = parse_stage_resources(stage_limits)
+        self.stage_memory = parse_stage_resources(stage_memory)  # Estimated MB per run
+        if memory_budget == "auto":
+            memory_budget = get_available_memory()
+        self.memory_budget = int(memory_budget) if memory_budget is not None else None
         # TODO: contextmanager?
-        self.num_failures = 0
-        self.stage_failures = {}
+        self.failed_runs = {}  # run index -> name of failed stage (None if unknown)
+        self.num_post_failures = 0
         # worker_run_idx = []
         # self._future_run_idx = {}
         self._future_batch_idx = {}
@@ -468,7 +668,7 @@ class SessionScheduler:
         EXECUTOR_LOOKUP = {
             "thread_pool": ThreadPoolSessionExecutor,
             "process_pool": ProcessPoolSessionExecutor,
-            "popen_pool": None,  # TODO
+            "popen_pool": PopenPoolSessionExecutor,
             "cmdline": CmdlineSessionExecutor,
             "context": ContextSessionExecutor,
             "rpc": RPCSessionExecutor,
@@ -483,6 +683,10 @@ class SessionScheduler:
             kwargs["remote_config"] = remote_config
         else:
             assert self.parallel_jobs == 1
+        if name in ["popen_pool"]:
+            kwargs["home"] = self.home
+            kwargs["max_runs"] = self.worker_max_runs
+            kwargs["max_memory_growth"] = self.worker_max_memory_growth
         return ret, kwargs
 
     @property
@@ -496,7 +700,7 @@ class SessionScheduler:
     def _pick_process(self):
         ret = None
         ret2 = _postprocess_default
-        needs_pickable = self.executor in ["process_pool", "cmdline", "context", "rpc"]
+        needs_pickable = self.executor in ["process_pool", "popen_pool", "cmdline", "context", "rpc"]
         if needs_pickable:
             # ret = _process_pickable
             ret2 = _postprocess_pickable
@@ -511,15 +715,15 @@ class SessionScheduler:
                 has_initializer = True
                 break
         if has_initializer:
-            assert self.executor in ["process_pool", "cmdline", "context", "rpc"] or self.use_init_stage
+            assert self.executor in ["process_pool", "popen_pool", "cmdline", "context", "rpc"] or self.use_init_stage
             # raise RuntimeError("RunInitializer needs init stage or process_pool executor")  # TODO: change default
-        if self.executor in ["process_pool", "cmdline", "context", "rpc"]:
+        if self.executor in ["process_pool", "popen_pool", "cmdline", "context", "rpc"]:
             # assert not self.progress, "progress bar not supported if session.process_pool=1"
             assert not self.per_stage, f"per stage not supported if session.executor={self.executor}"
             assert not self.use_init_stage, f"use_init_stage not supported if session.executor={self.executor}"
 
     def prepare(self):
-        if self.executor in ["process_pool", "cmdline", "context", "rpc"] or self.use_init_stage:
+        if self.executor in ["process_pool", "popen_pool", "cmdline", "context", "rpc"] or self.use_init_stage:
             return None, None  # TODO
         used_stages = _used_stages(self.runs, self.until)
         skipped_stages = [stage for stage in RunStage if stage not in used_stages]
@@ -529,62 +733,72 @@ class SessionScheduler:
     def num_runs(self):
         return len(self.runs)
 
+    @property
+    def num_failures(self):
+        return len(self.failed_runs) + self.num_post_failures
+
+    @property
+    def stage_failures(self):
+        """Failed run indices grouped by the name of the failed stage."""
+        ret = {}
+        for run_index, failed_stage in sorted(self.failed_runs.items()):
+            ret.setdefault(failed_stage, []).append(run_index)
+        return ret
+
     @property
     def num_success(self):
         return self.num_runs - self.num_failures
 
+    def _guess_failed_stage(self, run_index):
+        run = self.runs[run_index]
+        if isinstance(run, Run):
+            run.failing = True
+            return RunStage(run.next_stage).name
+        return None  # Unknown, the run was processed remotely
+
     def reset(self):
         raise NotImplementedError(".reset() not implemented")
 
+    def _handle_future(self, f):
+        """Collect the results of a single completed batch."""
+        failing = False
+        batch_res = None
+        try:
+            batch_res = f.result()
+            assert isinstance(batch_res, list)
+        except Exception as e:
+            failing = True
+            logger.exception(e)
+            logger.error("An exception was thrown by a worker during simulation")
+        batch_index = self._future_batch_idx[f]
+        run_idxs = self._batch_run_idxs[batch_index]
+        if failing:
+            assert batch_res is None
+            for run_index in run_idxs:
+                self.failed_runs[run_index] = self._guess_failed_stage(run_index)
+        else:
+            assert len(batch_res) == len(run_idxs)
+            for res_idx, res in enumerate(batch_res):
+                run_index = run_idxs[res_idx]
+                if res is None:
+                    # Single run of the batch could not be processed
+                    self.failed_runs[run_index] = self._guess_failed_stage(run_index)
+                    continue
+                assert isinstance(res, RunResult), "Expected RunResult type"
+                res.idx = run_index  # res.idx does not work if offloaded
+                self.results[run_index] = res
+                if res.failing:
+                    failed_stage = res.failed_stage
+                    if failed_stage is None:
+                        failed_stage = self._guess_failed_stage(run_index)
+                    self.failed_runs[run_index] = failed_stage
+
     def _join_futures(self, pbar):
         """Helper function to collect all worker threads."""
         for f in concurrent.futures.as_completed(self._futures):
-            res = None
-            failing = False
-            batch_res = None
-            try:
-                batch_res = f.result()
-                assert isinstance(batch_res, list)
-            except Exception as e:
-                failing = True
-                logger.exception(e)
-                logger.error("An exception was thrown by a worker during simulation")
+            self._handle_future(f)
             if self.progress:
                 update_progress(pbar)
-            batch_index = self._future_batch_idx[f]
-            run_idxs = self._batch_run_idxs[batch_index]
-            if failing:
-                assert batch_res is None
-                self.num_failures += len(run_idxs)
-                failed_stage = None
-                if failed_stage in self.stage_failures:
-                    self.stage_failures[failed_stage] += run_idxs
-                else:
-                    self.stage_failures[failed_stage] = [*run_idxs]
-            else:
-                assert len(batch_res) == len(run_idxs)
-                for res_idx, res in enumerate(batch_res):
-                    if res is not None:
-                        assert isinstance(res, RunResult), "Expected RunResult type"
-                        if False:  # Does not work if offloaded
-                            run_index = res.idx
-                            assert run_index == run_idxs[res_idx]
-                        else:
-                            run_index = run_idxs[res_idx]
-                            res.idx = run_index
-                        # run = res
-                        # self.runs[run_index] = res
-                        self.results[run_index] = res
-                    else:
-                        assert False, "Should not be used?"
-                    run = self.runs[run_index]
-                    if res.failing:
-                        self.num_failures += 1
-                        failed_stage = RunStage(run.next_stage).name if isinstance(run, Run) else None  # TODO
-                        if failed_stage in self.stage_failures:
-                            self.stage_failures[failed_stage].append(run_index)
-                        else:
-                            self.stage_failures[failed_stage] = [run_index]
         self._reset_futures()
         if self.progress:
             close_progress(pbar)
@@ -598,6 +812,7 @@ class SessionScheduler:
             run = run_initializer.realize(context=context)
             run.init_directory(parent=self.runs_dir)
             run_initializer.save(run.dir / "initializer.yml")
+            run.restore_state()  # Continue resumed or retried runs
             runs.append(run)
             if self.progress:
                 update_progress(pbar)
@@ -631,42 +846,35 @@ class SessionScheduler:
         batches = list(chunks(run_it, self.batch_size))
         # TODO: per stage batching?
         with self._executor_cls(**self._executor_kwargs) as executor:
-            if self.per_stage:
+            if self.per_stage and self.pipeline:
+                assert self.used_stages is not None
+                if self.progress:
+                    pbar = init_progress(len(batches) * len(self.used_stages), msg="Processing stages (pipelined)")
+                else:
+                    logger.info("%sProcessing all stages (pipelined)", self._prefix)
+                self._dispatch(
+                    executor,
+                    batches,
+                    self.used_stages,
+                    pbar,
+                    export=export,
+                    context=context_,
+                    save=save,
+                    cleanup=cleanup,
+                )
+            elif self.per_stage:
                 assert self.used_stages is not None
                 if self.progress:
                     pbar2 = init_progress(len(self.used_stages), msg="Processing stages")
                 for stage in self.used_stages:
                     run_stage = RunStage(stage).name
-                    is_last = stage == self.used_stages[-1]
                     if self.progress:
                         pbar = init_progress(len(batches), msg=f"Processing stage {run_stage}")
                     else:
                         logger.info("%sProcessing stage %s", self._prefix, run_stage)
-                    for b, runs in enumerate(batches):
-                        runs_ = [run for run in runs if not run.failing]
-                        idxs = [run.idx for run in runs_]
-                        assert len(runs) > 0
-                        if len(runs_) < len(runs):
-                            logger.warning("Skiping stage '%s' for failed run", run_stage)
-                        else:
-                            skip = [stage for stage in self.skipped_stages]
-                            if not is_last:
-                                skip.append(RunStage.POSTPROCESS)
-                            f = executor.submit_runs(
-                                runs_,
-                                until=stage,
-                                skip=skip,
-                                export=export,
-                                context=context_,
-                                runs_dir=self.runs_dir,
-                                save=save,
-                                cleanup=cleanup,
-                            )
-                            self._futures.append(f)
-                            # self._future_run_idx[f] = i
-                            self._future_batch_idx[f] = b
-                            self._batch_run_idxs[b] = idxs
-                    self._join_futures(pbar)
+                    self._dispatch(
+                        executor, batches, [stage], pbar, export=export, context=context_, save=save, cleanup=cleanup
+                    )
                     if self.progress:
                         update_progress(pbar2)
                 if self.progress:
@@ -677,34 +885,183 @@ class SessionScheduler:
                         len(batches), msg="Processing batches" if self.use_batches else "Processing all runs"
                     )
                 else:
-                    logger.info(self.prefix + "Processing all stages")
-                for b, runs in enumerate(batches):
-                    idxs = [run.idx for run in runs]
-                    assert len(runs) > 0
+                    logger.info("%sProcessing all stages", self._prefix)
+                if self.has_resource_limits:
+                    # Batches are submitted once they fit into the stage limits and memory budget
+                    self._dispatch(
+                        executor, batches, [None], pbar, export=export, context=context_, save=save, cleanup=cleanup
+                    )
+                else:
+                    for b, runs in enumerate(batches):
+                        idxs = [run.idx for run in runs]
+                        assert len(runs) > 0
+                        f = executor.submit_runs(
+                            runs,
+                            until=self.until,
+                            skip=self.skipped_stages,
+                            export=export,
+                            context=context_,
+                            runs_dir=self.runs_dir,
+                            save=save,
+                            cleanup=cleanup,
+                        )
+                        self._futures.append(f)
+                        # self._future_run_idx[f] = i
+                        self._future_batch_idx[f] = b
+                        self._batch_run_idxs[b] = idxs
+                    self._join_futures(pbar)
+            for attempt in range(self.retries):
+                if len(self.failed_runs) == 0:
+                    break
+                self._retry_failed(executor, attempt, export=export, context=context_, save=save, cleanup=cleanup)
+        return self.runs, self.results
+        # return num_failures == 0
+
+    @property
+    def has_resource_limits(self):
+        return len(self.stage_limits) > 0 or self.memory_budget is not None
+
+    def _get_batch_resources(self, runs, stage):
+        """Returns the limited resource classes (stage and stage:target) and estimated memory (MB) of a batch.
+
+        If stage is None, the batch is processed through all stages at once. It occupies the stage limits of every
+        stage and the memory of its most expensive stage.
+        """
+        if stage is None:
+            stages = {stage_ for stage_, _ in [*self.stage_limits, *self.stage_memory]}
+            stages = [stage_ for stage_ in stages if stage_ <= self.until or stage_ == RunStage.POSTPROCESS]
+            if self.skipped_stages is not None:
+                stages = [stage_ for stage_ in stages if stage_ not in self.skipped_stages]
+            keys, memory = [], 0
+            for stage_ in sorted(stages):
+                keys_, memory_ = self._get_batch_resources(runs, stage_)
+                keys.extend(keys_)
+                memory = max(memory, memory_)
+            return keys, memory
+        targets = [_get_target_name(run) for run in runs]
+        keys = [(stage, None)] + [(stage, target) for target in sorted(set(targets) - {None})]
+        default = self.stage_memory.get((stage, None), 0)
+        memory = sum(self.stage_memory.get((stage, target), default) for target in targets)
+        return keys, memory
+
+    def _dispatch(self, executor, batches, stages, pbar, export=False, context=None, save=True, cleanup=False):
+        """Process the batches through the given stages. Every batch moves on to its next stage as soon as it is done.
+
+        At most num_workers batches are processed at a time. The stage limits restrict the number of concurrent
+        batches per stage (and target) and batches are only started if their estimated memory usage fits into the
+        memory budget. Later stages are preferred to keep the pipeline short. A stage of None processes the
+        batches until the final stage at once (runs are not processed per stage).
+        """
+        pending = {stage: [] for stage in stages}
+        pending[stages[0]] = list(range(len(batches)))
+        running = defaultdict(int)
+        reserved = 0  # MB
+        future_info = {}
+
+        def can_start(keys, memory):
+            if any(running[key] >= self.stage_limits[key] for key in keys if key in self.stage_limits):
+                return False
+            if self.memory_budget is not None and reserved > 0 and reserved + memory > self.memory_budget:
+                return False  # A single batch may always exceed the budget
+            return True
+
+        while True:
+            for stage in reversed(stages):
+                for b in list(pending[stage]):
+                    if len(future_info) >= self.num_workers:
+                        break
+                    runs = batches[b]
+                    if stage is not None and any(run.failing for run in runs):
+                        logger.warning("Skiping stage '%s' for failed run", RunStage(stage).name)
+                        pending[stage].remove(b)
+                        if self.progress:
+                            update_progress(pbar, count=len(stages) - stages.index(stage))
+                        continue
+                    keys, memory = self._get_batch_resources(runs, stage)
+                    if not can_start(keys, memory):
+                        continue
+                    pending[stage].remove(b)
+                    if stage is None:
+                        until, skip = self.until, self.skipped_stages
+                    else:
+                        until, skip = stage, [stage_ for stage_ in self.skipped_stages]
+                        if stage != self.used_stages[-1]:
+                            skip.append(RunStage.POSTPROCESS)
                     f = executor.submit_runs(
                         runs,
-                        until=self.until,
-                        skip=self.skipped_stages,
+                        until=until,
+                        skip=skip,
                         export=export,
-                        context=context_,
+                        context=context,
                         runs_dir=self.runs_dir,
                         save=save,
                         cleanup=cleanup,
                     )
-                    self._futures.append(f)
-                    # self._future_run_idx[f] = i
+                    for key in keys:
+                        running[key] += 1
+                    reserved += memory
+                    future_info[f] = (stage, keys, memory)
                     self._future_batch_idx[f] = b
-                    self._batch_run_idxs[b] = idxs
-                self._join_futures(pbar)
-        return self.runs, self.results
-        # return num_failures == 0
+                    self._batch_run_idxs[b] = [run.idx for run in runs]
+            if len(future_info) == 0:
+                assert all(len(pending_) == 0 for pending_ in pending.values())
+                break
+            done, _ = concurrent.futures.wait(future_info.keys(), return_when=concurrent.futures.FIRST_COMPLETED)
+            for f in done:
+                stage, keys, memory = future_info.pop(f)
+                for key in keys:
+                    running[key] -= 1
+                reserved -= memory
+                self._handle_future(f)
+                if self.progress:
+                    update_progress(pbar)
+                next_index = stages.index(stage) + 1
+                if next_index < len(stages):
+                    pending[stages[next_index]].append(self._future_batch_idx[f])
+        self._reset_futures()
+        if self.progress:
+            close_progress(pbar)
+
+    def _retry_failed(self, executor, attempt, export=False, context=None, save=True, cleanup=False):
+        """Resubmit all failed runs. Runs which are still in memory continue at the failed stage."""
+        run_idxs = sorted(self.failed_runs.keys())
+        logger.warning(
+            "%sRetrying %d failed run(s) (attempt %d/%d)", self._prefix, len(run_idxs), attempt + 1, self.retries
+        )
+        pbar = None
+        batches = list(chunks(run_idxs, self.batch_size))
+        if self.progress:
+            pbar = init_progress(len(batches), msg=f"Retrying failed runs ({attempt + 1}/{self.retries})")
+        for run_index in run_idxs:
+            del self.failed_runs[run_index]
+            self.results[run_index] = None
+        if self.has_resource_limits:
+            batches_ = [[self.runs[run_index] for run_index in idxs] for idxs in batches]
+            self._dispatch(executor, batches_, [None], pbar, export=export, context=context, save=save, cleanup=cleanup)
+            return
+        for b, idxs in enumerate(batches):
+            runs = [self.runs[run_index] for run_index in idxs]
+            f = executor.submit_runs(
+                runs,
+                until=self.until,
+                skip=self.skipped_stages,
+                export=export,
+                context=context,
+                runs_dir=self.runs_dir,
+                save=save,
+                cleanup=cleanup,
+            )
+            self._futures.append(f)
+            self._future_batch_idx[f] = b
+            self._batch_run_idxs[b] = idxs
+        self._join_futures(pbar)
 
     def postprocess(self, report, dest):
         logger.info("Postprocessing session report")
         # Warning: currently we only support one instance of the same type of postprocess,
         # also it will be applied to all rows!
         num_failing = self._postprocess(self.runs, report, dest, progress=self.progress)
-        self.num_failures += num_failing
+        self.num_post_failures += num_failing
         return report
 
     def print_summary(self):
@@ -63,6 +63,14 @@ class Session:
         "parallel_jobs": 1,
         "rpc_tracker": None,
         "rpc_key": None,
+        "result_dir": None,  # Write a result file per run (used by the cmdline executor)
+        "worker_max_runs": 100,  # Recycle popen_pool workers after N runs (0: never)
+        "worker_max_memory_growth": None,  # Recycle popen_pool workers if memory grew by more than N MB
+        "retries": 0,  # Number of attempts to re-process failed runs
+        "pipeline": False,  # Per stage processing without waiting for all runs to finish a stage
+        "stage_limits": None,  # Max. number of concurrent batches per stage/target, e.g. build=2,run=4,run:ara=1
+        "stage_memory": None,  # Estimated memory usage (MB) of a run per stage/target, e.g. build=8000
+        "memory_budget": None,  # Memory (MB) available for concurrent runs (auto: use available memory)
     }
 
     def __init__(self, label=None, idx=None, archived=False, dest=None, config=None):
@@ -84,6 +92,7 @@ class Session:
         self.dir = Path(dest) if dest is not None else None
         self.tempdir = None
         self.session_lock = None
+        self.resumed = False  # Runs keep their indices and directories
 
     @property
     def runs_dir(self):
@@ -153,10 +162,62 @@ class Session:
         """get rpc_key property."""
         return self.config["rpc_key"]
 
+    @property
+    def worker_max_runs(self):
+        """get worker_max_runs property."""
+        return int(self.config["worker_max_runs"])
+
+    @property
+    def worker_max_memory_growth(self):
+        """get worker_max_memory_growth property."""
+        value = self.config["worker_max_memory_growth"]
+        return int(value) if value is not None else None
+
+    @property
+    def retries(self):
+        """get retries property."""
+        return int(self.config["retries"])
+
+    @property
+    def pipeline(self):
+        """get pipeline property."""
+        value = self.config["pipeline"]
+        return str2bool(value) if not isinstance(value, (bool, int)) else value
+
+    @property
+    def stage_limits(self):
+        """get stage_limits property."""
+        return self.config["stage_limits"]
+
+    @property
+    def stage_memory(self):
+        """get stage_memory property."""
+        return self.config["stage_memory"]
+
+    @property
+    def memory_budget(self):
+        """get memory_budget property."""
+        return self.config["memory_budget"]
+
+    @property
+    def result_dir(self):
+        """get result_dir property."""
+        value = self.config["result_dir"]
+        return Path(value) if value is not None else None
+
+    def save_results(self, dest: Union[str, Path]):
+        """Write one result file per run (`<idx>.json`) to the given directory."""
+        dest = Path(dest)
+        dest.mkdir(parents=True, exist_ok=True)
+        for i, result in enumerate(self.results):
+            if result is None:
+                continue
+            result.save(dest / f"{i}.json")
+
     @property
     def needs_initializer(self):
         """TODO"""
-        return self.executor in ["process_pool", "cmdline", "context", "rpc"] or self.use_init_stage
+        return self.executor in ["process_pool", "popen_pool", "cmdline", "context", "rpc"] or self.use_init_stage
 
     def create_run(self, *args, **kwargs):
         """Factory method to create a run and add it to this session."""
@@ -174,11 +235,10 @@ class Session:
         if ignore_idx:
             idx = len(self.runs)
         else:
-            raise NotImplementedError
-        if isinstance(run, RunInitializer):
+            assert run.idx is not None
+            idx = run.idx
+        if isinstance(run, (RunInitializer, Run)):
             self.runs.append(run)
-        elif isinstance(run, Run):
-            raise NotImplementedError
         else:
             assert False
         logger.debug("Importing run with id %s", idx)
@@ -208,6 +268,9 @@ class Session:
 
     def enumerate_runs(self):
         """Update run indices."""
+        if self.resumed:
+            self.next_run_idx = max(run.idx for run in self.runs) + 1
+            return
         # Find start index
         max_idx = -1
         for run in self.runs:
@@ -282,6 +345,14 @@ class Session:
             batch_size=self.batch_size,
             parallel_jobs=self.parallel_jobs,
             remote_config=remote_config,
+            home=context.environment.home if context is not None else None,
+            worker_max_runs=self.worker_max_runs,
+            worker_max_memory_growth=self.worker_max_memory_growth,
+            retries=self.retries,
+            pipeline=self.pipeline,
+            stage_limits=self.stage_limits,
+            stage_memory=self.stage_memory,
+            memory_budget=self.memory_budget,
         )
         if noop:
             logger.info(self.prefix + "Skipping processing of runs")
@@ -289,6 +360,8 @@ class Session:
             return 0
 
         self.runs, self.results = scheduler.process(export=export, context=context)
+        if self.result_dir is not None:
+            self.save_results(self.result_dir)
         report = self.get_reports(results=self.results)
         scheduler.print_summary()
         report = scheduler.postprocess(report, dest=self.dir)
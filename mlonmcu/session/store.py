@@ -0,0 +1,113 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Content-addressed store used to deduplicate exported files across runs."""
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Union
+
+from mlonmcu.cache import hash_file
+
+LINK_MODES = ["hardlink", "reflink", "symlink", "copy"]
+
+# See linux/fs.h
+FICLONE = 0x40049409
+
+
+def _reflink(src: Path, dest: Path):
+    import fcntl
+
+    with open(src, "rb") as src_handle:
+        with open(dest, "wb") as dest_handle:
+            fcntl.ioctl(dest_handle.fileno(), FICLONE, src_handle.fileno())
+
+
+class ContentStore:
+    """Directory holding files by their content hash.
+
+    Files added to the store are replaced by a link (or clone) to the stored copy. Identical files
+    of different runs hence only occupy the disk space once.
+    """
+
+    def __init__(self, directory: Union[str, Path], mode: str = "hardlink"):
+        assert mode in LINK_MODES, f"Unsupported link mode: {mode}"
+        self.directory = Path(directory)
+        self.mode = mode
+
+    def lookup(self, digest: str):
+        return self.directory / digest[:2] / digest
+
+    def _link(self, src: Path, dest: Path):
+        mode = self.mode
+        if mode == "hardlink":
+            try:
+                os.link(src, dest)
+                return
+            except OSError:
+                mode = "copy"  # e.g. cross-device link
+        elif mode == "reflink":
+            try:
+                _reflink(src, dest)
+                return
+            except (OSError, ImportError):
+                mode = "copy"  # Filesystem without CoW support
+        elif mode == "symlink":
+            os.symlink(src.resolve(), dest)
+            return
+        assert mode == "copy"
+        shutil.copy(src, dest)
+
+    def add(self, path: Union[str, Path]):
+        """Move a file into the store and replace it by a link. Returns the content hash."""
+        path = Path(path)
+        if path.is_symlink():
+            return None  # Already deduplicated (symlink mode)
+        assert path.is_file(), f"Not a regular file: {path}"
+        suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+        digest = hash_file(path)
+        stored = self.lookup(digest)
+        if path.stat().st_nlink > 1 and stored.is_file() and os.path.samefile(path, stored):
+            return digest  # Already deduplicated
+        stored.parent.mkdir(parents=True, exist_ok=True)
+        if not stored.is_file():
+            tmp = stored.parent / f".{digest}.{suffix}"
+            if self.mode == "copy" or self.mode == "symlink":
+                shutil.copy2(path, tmp)
+            else:
+                self._link(path, tmp)
+            os.replace(tmp, stored)  # Atomic, concurrent writers store the same content
+            if self.mode == "hardlink" and os.path.samefile(path, stored):
+                return digest
+        tmp = path.parent / f".{path.name}.{suffix}"
+        self._link(stored, tmp)
+        os.replace(tmp, path)
+        return digest
+
+    def add_tree(self, path: Union[str, Path]):
+        """Add all regular files in a directory to the store."""
+        path = Path(path)
+        ret = {}
+        for root, _, files in os.walk(path):
+            for name in files:
+                file = Path(root) / name
+                if file.is_symlink() or not file.is_file():
+                    continue
+                ret[str(file.relative_to(path))] = self.add(file)
+        return ret
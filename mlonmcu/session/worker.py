@@ -0,0 +1,173 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Long-lived worker processes used by the popen_pool session executor.
+
+The parent process talks to each worker over a pair of pipes (requests are pickled). The worker keeps its
+MLonMCU context and all imported components alive between requests.
+"""
+import os
+import sys
+import argparse
+import resource
+import traceback
+import subprocess
+from contextlib import ExitStack
+from multiprocessing.connection import Connection
+from typing import Optional
+
+from mlonmcu.logging import get_logger
+
+logger = get_logger()
+
+
+def get_rss():
+    """Return the current resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm", "r") as handle:
+            return int(handle.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak usage (KiB on Linux)
+
+
+class WorkerError(RuntimeError):
+    """Raised in the parent if a worker process died or could not process a request."""
+
+
+class PopenWorker:
+    """Handle for a single worker process (parent side)."""
+
+    def __init__(self, home: Optional[str] = None):
+        self.home = home
+        self.num_runs = 0
+        self.base_rss = None
+        self.rss = None
+        req_read, req_write = os.pipe()
+        res_read, res_write = os.pipe()
+        args = [
+            sys.executable,
+            "-m",
+            "mlonmcu.session.worker",
+            "--fd-in",
+            str(req_read),
+            "--fd-out",
+            str(res_write),
+        ]
+        if home is not None:
+            args += ["--home", str(home)]
+        self.process = subprocess.Popen(args, pass_fds=(req_read, res_write))
+        os.close(req_read)
+        os.close(res_write)
+        self.conn_out = Connection(req_write, readable=False)
+        self.conn_in = Connection(res_read, writable=False)
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def request(self, op: str, **kwargs):
+        """Send a request to the worker and wait for the response."""
+        try:
+            self.conn_out.send({"op": op, **kwargs})
+            response = self.conn_in.recv()
+        except (EOFError, OSError) as err:
+            self.kill()
+            raise WorkerError(f"Worker process died (exit code: {self.process.returncode})") from err
+        self.rss = response["rss"]
+        if self.base_rss is None:
+            self.base_rss = self.rss
+        if not response["success"]:
+            raise WorkerError(f"Worker failed to process request:\n{response['error']}")
+        return response["result"]
+
+    def process_runs(self, run_initializers, **kwargs):
+        ret = self.request("process", run_initializers=run_initializers, **kwargs)
+        self.num_runs += len(run_initializers)
+        return ret
+
+    @property
+    def memory_growth(self):
+        if self.base_rss is None:
+            return 0
+        return self.rss - self.base_rss
+
+    def kill(self):
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+        self.conn_out.close()
+        self.conn_in.close()
+
+    def close(self, timeout: float = 10):
+        if self.alive:
+            try:
+                self.conn_out.send({"op": "exit"})
+                self.process.wait(timeout=timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        self.kill()
+
+
+def _handle_request(request, state):
+    op = request["op"]
+    if op == "ping":
+        return None
+    if op == "process":
+        from mlonmcu.session.schedule import _process_pickable
+
+        if state.get("context") is None and state["home"] is not None:
+            from mlonmcu.context.context import MlonMcuContext
+
+            state["context"] = state["stack"].enter_context(MlonMcuContext(path=state["home"], deps_lock="read"))
+        context = state.get("context")
+        context_ = context.get_read_only_context() if context is not None else None
+        kwargs = {key: value for key, value in request.items() if key != "op"}
+        return _process_pickable(context=context_, **kwargs)
+    raise ValueError(f"Unsupported request: {op}")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="MLonMCU session worker")
+    parser.add_argument("--fd-in", type=int, required=True)
+    parser.add_argument("--fd-out", type=int, required=True)
+    parser.add_argument("--home", type=str, default=None)
+    args = parser.parse_args(args)
+    conn_in = Connection(args.fd_in, writable=False)
+    conn_out = Connection(args.fd_out, readable=False)
+    with ExitStack() as stack:
+        state = {"home": args.home, "context": None, "stack": stack}
+        while True:
+            try:
+                request = conn_in.recv()
+            except EOFError:
+                break  # Parent has gone away
+            if request["op"] == "exit":
+                break
+            try:
+                result = _handle_request(request, state)
+                response = {"success": True, "result": result}
+            except Exception as e:
+                logger.exception(e)
+                response = {"success": False, "error": traceback.format_exc()}
+            response["rss"] = get_rss()
+            conn_out.send(response)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())  # pragma: no cover
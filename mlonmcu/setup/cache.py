@@ -41,6 +41,7 @@ class TaskCache:
 
     def __init__(self):
         self._vars = {}
+        self.version = 0  # Incremented on every modification (used for memoization)
 
     def __repr__(self):
         return str(self._vars)
@@ -49,10 +50,12 @@ class TaskCache:
         name = convert_key(name)
         self._vars[name[0]] = value  # Holds latest value
         self._vars[name] = value
+        self.version += 1
 
     def __delitem__(self, name):
         name = convert_key(name)
         del self._vars[name]
+        self.version += 1
 
     def __getitem__(self, name):
         name = convert_key(name)
@@ -112,6 +115,7 @@ class TaskCache:
     def read_from_file(self, filename, reset=True):
         if reset:
             self._vars = {}
+            self.version += 1
         if not os.path.isfile(filename):
             raise RuntimeError(f"File not found: {filename}")
         cfg = configparser.ConfigParser()
@@ -567,6 +567,14 @@ def symlink(src, dest):
     os.symlink(src, dest)
 
 
+def unshare(path):
+    """Remove a file which is linked to other files, so that it can be overwritten safely."""
+    if not isinstance(path, Path):
+        path = Path(path)
+    if path.is_symlink() or (path.is_file() and path.stat().st_nlink > 1):
+        path.unlink()
+
+
 def is_populated(path):
     if not isinstance(path, Path):
         path = Path(path)
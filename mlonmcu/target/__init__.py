@@ -18,11 +18,22 @@
 #
 """MLonMCU target submodule"""
 
+from mlonmcu.utils import lazy_exports
 from .target import Target
 from ._target import register_target, get_targets
-from .riscv import EtissPulpinoTarget, SpikeTarget, OVPSimTarget, RiscvQemuTarget, TGCTarget
-from .arm import Corstone300Target
-from .host_x86 import HostX86Target
+
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        "EtissPulpinoTarget": "mlonmcu.target.riscv.etiss_pulpino:EtissPulpinoTarget",
+        "SpikeTarget": "mlonmcu.target.riscv.spike:SpikeTarget",
+        "OVPSimTarget": "mlonmcu.target.riscv.ovpsim:OVPSimTarget",
+        "RiscvQemuTarget": "mlonmcu.target.riscv.riscv_qemu:RiscvQemuTarget",
+        "Corstone300Target": "mlonmcu.target.arm.corstone300:Corstone300Target",
+        "HostX86Target": "mlonmcu.target.host_x86:HostX86Target",
+        "TGCTarget": "mlonmcu.target.riscv.tgc:TGCTarget",
+    },
+)
 
 __all__ = [
     "register_target",
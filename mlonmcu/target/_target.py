@@ -13,35 +13,38 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
-from .riscv import (
-    EtissPulpinoTarget,
-    SpikeTarget,
-    SpikeRV32Target,
-    SpikeRV32MinTarget,
-    SpikeRV64Target,
-    SpikeBMTarget,
-    SpikePKTarget,
-    OVPSimTarget,
-    COREVOVPSimTarget,
-    RiscvQemuTarget,
-    GvsocPulpTarget,
-    EtissTarget,
-    EtissPerfTarget,
-    EtissRV32Target,
-    EtissRV64Target,
-    AraTarget,
-    AraRtlTarget,
-    CV32E40PTarget,
-    VicunaTarget,
-    Vicuna2Target,
-    CanMvK230SSHTarget,
-    TGCTarget,
+from mlonmcu.utils import LazyRegistry
+
+# Targets are only imported when used, as some of them pull in heavy dependencies (paramiko,...)
+TARGET_REGISTRY = LazyRegistry(
+    {
+        "etiss_pulpino": "mlonmcu.target.riscv.etiss_pulpino:EtissPulpinoTarget",
+        "etiss": "mlonmcu.target.riscv.etiss:EtissTarget",
+        "etiss_perf": "mlonmcu.target.riscv.etiss_perf:EtissPerfTarget",
+        "etiss_rv32": "mlonmcu.target.riscv.etiss:EtissRV32Target",
+        "etiss_rv64": "mlonmcu.target.riscv.etiss:EtissRV64Target",
+        "host_x86": "mlonmcu.target.host_x86:HostX86Target",
+        "host_x86_ssh": "mlonmcu.target.host_x86_ssh:HostX86SSHTarget",
+        "corstone300": "mlonmcu.target.arm.corstone300:Corstone300Target",
+        "spike": "mlonmcu.target.riscv.spike:SpikeTarget",
+        "spike_rv32": "mlonmcu.target.riscv.spike:SpikeRV32Target",
+        "spike_rv32_min": "mlonmcu.target.riscv.spike:SpikeRV32MinTarget",
+        "spike_rv64": "mlonmcu.target.riscv.spike:SpikeRV64Target",
+        "spike_bm": "mlonmcu.target.riscv.spike:SpikeBMTarget",
+        "spike_pk": "mlonmcu.target.riscv.spike:SpikePKTarget",
+        "ovpsim": "mlonmcu.target.riscv.ovpsim:OVPSimTarget",
+        "corev_ovpsim": "mlonmcu.target.riscv.corev_ovpsim:COREVOVPSimTarget",
+        "riscv_qemu": "mlonmcu.target.riscv.riscv_qemu:RiscvQemuTarget",
+        "gvsoc_pulp": "mlonmcu.target.riscv.gvsoc_pulp:GvsocPulpTarget",
+        "ara": "mlonmcu.target.riscv.ara:AraTarget",
+        "ara_rtl": "mlonmcu.target.riscv.ara_rtl:AraRtlTarget",
+        "cv32e40p": "mlonmcu.target.riscv.cv32e40p:CV32E40PTarget",
+        "vicuna": "mlonmcu.target.riscv.vicuna:VicunaTarget",
+        "vicuna2": "mlonmcu.target.riscv.vicuna2:Vicuna2Target",
+        "canmv_k230_ssh": "mlonmcu.target.riscv.canmv_k230_ssh:CanMvK230SSHTarget",
+        "tgc": "mlonmcu.target.riscv.tgc:TGCTarget",
+    }
 )
-from .arm import Corstone300Target
-from .host_x86 import HostX86Target
-from .host_x86_ssh import HostX86SSHTarget
-
-TARGET_REGISTRY = {}
 
 
 def register_target(target_name, t, override=False):
@@ -54,30 +57,3 @@ def register_target(target_name, t, override=False):
 
 def get_targets():
     return TARGET_REGISTRY
-
-
-register_target("etiss_pulpino", EtissPulpinoTarget)
-register_target("etiss", EtissTarget)
-register_target("etiss_perf", EtissPerfTarget)
-register_target("etiss_rv32", EtissRV32Target)
-register_target("etiss_rv64", EtissRV64Target)
-register_target("host_x86", HostX86Target)
-register_target("host_x86_ssh", HostX86SSHTarget)
-register_target("corstone300", Corstone300Target)
-register_target("spike", SpikeTarget)
-register_target("spike_rv32", SpikeRV32Target)
-register_target("spike_rv32_min", SpikeRV32MinTarget)
-register_target("spike_rv64", SpikeRV64Target)
-register_target("spike_bm", SpikeBMTarget)
-register_target("spike_pk", SpikePKTarget)
-register_target("ovpsim", OVPSimTarget)
-register_target("corev_ovpsim", COREVOVPSimTarget)
-register_target("riscv_qemu", RiscvQemuTarget)
-register_target("gvsoc_pulp", GvsocPulpTarget)
-register_target("ara", AraTarget)
-register_target("ara_rtl", AraRtlTarget)
-register_target("cv32e40p", CV32E40PTarget)
-register_target("vicuna", VicunaTarget)
-register_target("vicuna2", Vicuna2Target)
-register_target("canmv_k230_ssh", CanMvK230SSHTarget)
-register_target("tgc", TGCTarget)
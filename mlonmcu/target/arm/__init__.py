@@ -1,3 +1,5 @@
-from .corstone300 import Corstone300Target
+from mlonmcu.utils import lazy_exports
+
+__getattr__ = lazy_exports(__name__, {"Corstone300Target": "mlonmcu.target.arm.corstone300:Corstone300Target"})
 
 __all__ = ["Corstone300Target"]
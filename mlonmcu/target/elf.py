@@ -22,9 +22,12 @@
 # import os
 # import sys
 import csv
+import mmap
+import struct
 import argparse
-from elftools.elf import elffile
+from functools import lru_cache
 
+from mlonmcu.cache import ResultCache, hash_file
 from mlonmcu.logging import get_logger
 
 logger = get_logger()
@@ -36,21 +39,303 @@ Script to gather metrics on static ROM and RAM usage.
 Heavility inspired by get_metrics.py found in the ETISS repository
 """
 
+# Section headers and symbols by ELF content hash
+ELF_CACHE = ResultCache("elf", version=2, max_entries=64)
+
+ELF_MAGIC = b"\x7fELF"
+AR_MAGIC = b"!<arch>\n"
+
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+SHF_COMPRESSED = 0x800
+SHN_XINDEX = 0xFFFF
+
+SYMBOL_TYPES = {
+    0: "STT_NOTYPE",
+    1: "STT_OBJECT",
+    2: "STT_FUNC",
+    3: "STT_SECTION",
+    4: "STT_FILE",
+    5: "STT_COMMON",
+    6: "STT_TLS",
+}
+SYMBOL_BINDS = {0: "STB_LOCAL", 1: "STB_GLOBAL", 2: "STB_WEAK"}
+
+# (ELF header, section header, symbol, compression header) layouts for ELF32 and ELF64
+_ELF_LAYOUTS = {
+    1: ("HHIIIIIHHHHHH", "IIIIIIIIII", "IIIBBH", "III"),
+    2: ("HHIQQQIHHHHHH", "IIQQQQIIQQ", "IBBHQQ", "IIQQ"),
+}
+
+
+def _read_str(data, offset):
+    end = data.find(b"\0", offset)
+    return bytes(data[offset:end]).decode(errors="replace")
+
+
+def read_elf_tables(data, symbols=True):
+    """Read the section headers (and the symbol table) from the raw contents of an ELF file.
+
+    In contrast to pyelftools, only the headers and the symbol table are accessed. Returns a dict with a
+    list of sections (name, type, flags, size), a list of symbols (name, type, bind, size, section) and
+    the values (addresses) of all global symbols.
+    """
+    assert data[:4] == ELF_MAGIC, "Not an ELF file"
+    elf_class, elf_data = data[4], data[5]
+    assert elf_class in _ELF_LAYOUTS, f"Unsupported ELF class: {elf_class}"
+    endian = "<" if elf_data == 1 else ">"
+    ehdr_fmt, shdr_fmt, sym_fmt, chdr_fmt = (endian + fmt for fmt in _ELF_LAYOUTS[elf_class])
+    ehdr = struct.unpack_from(ehdr_fmt, data, 16)
+    e_shoff, e_shentsize, e_shnum, e_shstrndx = ehdr[5], ehdr[10], ehdr[11], ehdr[12]
+    ret = {"sections": [], "symbols": [], "values": {}}
+    if e_shoff == 0:
+        return ret
+
+    def _shdr(idx):
+        # sh_name, sh_type, sh_flags, sh_addr, sh_offset, sh_size, sh_link, sh_info, sh_addralign, sh_entsize
+        return struct.unpack_from(shdr_fmt, data, e_shoff + idx * e_shentsize)
+
+    first = _shdr(0)
+    if e_shnum == 0:  # Extended section numbering
+        e_shnum = first[5]
+    if e_shstrndx == SHN_XINDEX:
+        e_shstrndx = first[6]
+    headers = [_shdr(idx) for idx in range(e_shnum)]
+    shstrtab_offset = headers[e_shstrndx][4]
+    names = [_read_str(data, shstrtab_offset + hdr[0]) for hdr in headers]
+    for name, hdr in zip(names, headers):
+        size = hdr[5]
+        if hdr[2] & SHF_COMPRESSED and hdr[1] != SHT_NOBITS:
+            size = struct.unpack_from(chdr_fmt, data, hdr[4])[-2]  # ch_size
+        ret["sections"].append((name, hdr[1], hdr[2], size))
+    if not symbols:
+        return ret
+    symtab = next((hdr for hdr in headers if hdr[1] == SHT_SYMTAB), None)
+    if symtab is None:
+        return ret
+    strtab_offset = headers[symtab[6]][4]
+    sym_size = struct.calcsize(sym_fmt)
+    table = memoryview(data)[symtab[4] : symtab[4] + symtab[5]]
+    for entry in struct.iter_unpack(sym_fmt, table[: len(table) - len(table) % sym_size]):
+        if elf_class == 1:
+            st_name, st_value, st_size, st_info, _, st_shndx = entry
+        else:
+            st_name, st_info, _, st_shndx, st_value, st_size = entry
+        section = names[st_shndx] if 0 < st_shndx < len(names) else None
+        name = _read_str(data, strtab_offset + st_name)
+        bind = SYMBOL_BINDS.get(st_info >> 4, str(st_info >> 4))
+        ret["symbols"].append(
+            (
+                name,
+                SYMBOL_TYPES.get(st_info & 0xF, str(st_info & 0xF)),
+                bind,
+                st_size,
+                section,
+            )
+        )
+        if bind != "STB_LOCAL" and name:
+            ret["values"][name] = st_value
+    return ret
+
+
+def _map_file(handle):
+    try:
+        return mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:  # Empty file
+        return b""
+
+
+def _read_elf_file(path):
+    with open(path, "rb") as handle:
+        data = _map_file(handle)
+        try:
+            return read_elf_tables(data)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+
+def get_elf_tables(path):
+    """Section headers and symbols of an ELF file (cached by content hash)."""
+    return ELF_CACHE.lookup(hash_file(path), lambda: _read_elf_file(path))
+
+
+def iter_archive_members(data):
+    """Yield the (name, data) of all members in an ar archive."""
+    assert data[:8] == AR_MAGIC, "Not an ar archive"
+    offset = 8
+    long_names = b""
+    while offset + 60 <= len(data):
+        header = bytes(data[offset : offset + 60])
+        name = header[:16].decode().strip()
+        size = int(header[48:58].decode().strip())
+        offset += 60
+        content = data[offset : offset + size]
+        offset += size + (size % 2)
+        if name.startswith("#1/"):  # BSD: name follows the header
+            name_len = int(name[3:])
+            name, content = bytes(content[:name_len]).decode().rstrip("\0"), content[name_len:]
+        elif name == "//":  # GNU: long names table
+            long_names = bytes(content)
+            continue
+        elif name in ["/", "/SYM64/", "__.SYMDEF", "__.SYMDEF SORTED"]:  # Symbol index
+            continue
+        elif name.startswith("/") and name[1:].isdigit():
+            start = int(name[1:])
+            name = long_names[start : long_names.index(b"/\n", start)].decode()
+        yield name.rstrip("/"), content
+
+
+def _get_code_size(data):
+    tables = read_elf_tables(data, symbols=False)
+    return sum(size for name, _, _, size in tables["sections"] if name.startswith(".text"))
+
+
+def _get_code_size_from_file(lib_path):
+    with open(lib_path, "rb") as handle:
+        data = _map_file(handle)
+        try:
+            if data[:8] == AR_MAGIC:
+                # Only the section headers of every object file in the archive are read
+                return sum(
+                    _get_code_size(content) for _, content in iter_archive_members(data) if content[:4] == ELF_MAGIC
+                )
+            return _get_code_size(data)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
 
 def get_code_size_from_static_lib(lib_path):
-    total_size = 0
-    with open(lib_path, "rb") as f:
-        elf = elffile.ELFFile(f)
-        for section in elf.iter_sections():
-            # Look for executable sections whose names start with .text
-            if section.name.startswith(".text"):
-                total_size += section["sh_size"]
-    return total_size
+    """Total size of the .text* sections of an object file or static library."""
+    return ELF_CACHE.lookup(f"code_size_{hash_file(lib_path)}", lambda: _get_code_size_from_file(lib_path))
+
+
+# TODO: handle
+# WARNING - ignored: .tbss / size: 64
+# WARNING - ignored: .preinit_array / size: 8
+# WARNING - ignored: .tdata / size: 24
+# WARNING - ignored: .tbss / size: 64
+
+IGNORE_SECTIONS = {
+    "",
+    ".got.plt",
+    ".stack",
+    ".comment",
+    ".riscv.attributes",
+    ".strtab",
+    ".stabstr",
+    ".shstrtab",
+    ".symtab",
+    ".eh_frame",
+    ".stab",
+    ".heap",  # ?
+    # The following are x86 only:
+    ".interp",
+    ".dynsym",
+    ".dynstr",
+    ".dynamic",
+    ".got",
+    ".data.rel.ro",
+    # Espressif
+    ".flash.appdesc",
+    ".iram0.text_end",  # ?
+    ".rtc_noinit",
+    # QEMU
+    ".htif",
+    # Zephyr
+    ".mcuboot_header",
+    ".metadata",
+    "ctors",
+    "initlevel",
+    "devices",
+    "device_handles",
+    "sw_isr_table",
+    "device_states",
+    ".xt.prop",
+    ".xt.lit",
+    "k_heap_area",
+    "datas",
+    # Pulp
+    ".data_tiny_fc",
+    ".data_tiny_l1",
+    ".l1cluster_g",
+    ".heap_l2_shared",
+    ".Pulp_Chip.Info",
+    # ARM (corstone300)
+    ".ddr",
+    # cv32e40p
+    ".debugger_stack",
+    # ara
+    ".l2",
+    # vicuna (ram)
+    ".user_align",
+}
+IGNORE_PREFIXES = (
+    ".gcc_except",
+    ".sdata2",
+    ".debug_",
+    # ARM only:
+    ".ARM",
+    # The following are x86 only:
+    ".note",
+    ".gnu",
+    ".rela",
+    ".plt",
+)
+IGNORE_SUFFIXES = (
+    ".table",
+    "dummy",
+    "heap_start",
+    "rom_start",
+    ".info",
+)
+ROM_MISC_SECTIONS = {
+    ".vectors",
+    "iram0.vectors",
+    ".iram0.vectors",
+    ".fini_array",
+    ".fini",
+    ".init",
+    ".eh_frame",
+    ".eh_frame_hdr",
+}
+RAM_ZDATA_SECTIONS = {".bss", "bss", ".sbss", ".shbss", ".bss.noinit", "noinit"}
+
+
+@lru_cache(maxsize=4096)
+def classify_section(name):
+    """Map a section name to a memory category (rom_code, rom_rodata, rom_misc, ram_data, ram_zdata).
+
+    Returns None for ignored and "unknown" for unhandled sections. The rules are applied in order.
+    """
+    # TODO: check if this is generic anough for multiple platforms (riscv, arm, x86)
+    if name.startswith(".text") or name.endswith(".text") or name == "text":
+        return "rom_code"
+    if name.startswith(".srodata"):
+        return "rom_rodata"
+    if name.startswith(".sdata"):
+        return "ram_data"
+    if name.endswith(".rodata") or name == "rodata":
+        return "rom_rodata"
+    if name.startswith(".init_array") or name in ROM_MISC_SECTIONS:
+        return "rom_misc"
+    if name.endswith(".data"):
+        return "ram_data"
+    if (
+        name in RAM_ZDATA_SECTIONS
+        or name.endswith(".bss")
+        or name.startswith(".bss")
+        or name.startswith(".sbss")
+    ):
+        return "ram_zdata"
+    if name in IGNORE_SECTIONS or name.startswith(IGNORE_PREFIXES) or name.endswith(IGNORE_SUFFIXES):
+        return None
+    return "unknown"
 
 
 def parseElf(inFile):
     """Extract static memory usage details from ELF file by mapping each segment."""
-    # TODO: check if this is generic anough for multiple platforms (riscv, arm, x86)
     # TODO: comare results with `riscv32-unknown-elf-size`
     m = {}
     m["rom_rodata"] = 0
@@ -59,145 +344,33 @@ def parseElf(inFile):
     m["ram_data"] = 0
     m["ram_zdata"] = 0
 
-    # TODO: handle
-    # WARNING - ignored: .tbss / size: 64
-    # WARNING - ignored: .preinit_array / size: 8
-    # WARNING - ignored: .tdata / size: 24
-    # WARNING - ignored: .tbss / size: 64
-
-    ignoreSections = [
-        "",
-        ".got.plt",
-        ".stack",
-        ".comment",
-        ".riscv.attributes",
-        ".strtab",
-        ".stabstr",
-        ".shstrtab",
-        ".symtab",
-        ".eh_frame",
-        ".stab",
-        ".heap",  # ?
-        # The following are x86 only:
-        ".interp",
-        ".dynsym",
-        ".dynstr",
-        ".dynamic",
-        ".got",
-        ".data.rel.ro",
-        # Espressif
-        ".flash.appdesc",
-        ".iram0.text_end",  # ?
-        ".rtc_noinit",
-        # QEMU
-        ".htif",
-        # Zephyr
-        ".mcuboot_header",
-        ".metadata",
-        "ctors",
-        "initlevel",
-        "devices",
-        "device_handles",
-        "sw_isr_table",
-        "device_states",
-        ".mcuboot_header",
-        ".metadata",
-        "ctors",
-        "initlevel",
-        "devices",
-        "device_handles",
-        "sw_isr_table",
-        "device_states",
-        ".xt.prop",
-        ".xt.lit",
-        "k_heap_area",
-        "datas",
-        # Pulp
-        ".data_tiny_fc",
-        ".data_tiny_l1",
-        ".l1cluster_g",
-        ".heap_l2_shared",
-        ".Pulp_Chip.Info",
-        # ARM (corstone300)
-        ".ddr",
-        # cv32e40p
-        ".debugger_stack",
-        # ara
-        ".l2",
-        # vicuna (ram)
-        ".user_align",
-    ]
-    ignorePrefixes = [
-        ".gcc_except",
-        ".sdata2",
-        ".debug_",
-        # ARM only:
-        ".ARM",
-        # The following are x86 only:
-        ".note",
-        ".gnu",
-        ".rela",
-        ".plt",
-    ]
-    ignoreSuffixes = [
-        ".table",
-        "dummy",
-        "heap_start",
-        "rom_start",
-        ".info",
-    ]
-
-    with open(inFile, "rb") as f:
-        e = elffile.ELFFile(f)
-
-        for s in e.iter_sections():
-            if s.name.startswith(".text") or s.name.endswith(".text") or s.name == "text":
-                m["rom_code"] += s.data_size
-            elif s.name.startswith(".srodata"):
-                m["rom_rodata"] += s.data_size
-            elif s.name.startswith(".sdata"):
-                m["ram_data"] += s.data_size
-            elif s.name.endswith(".rodata") or s.name == "rodata":
-                m["rom_rodata"] += s.data_size
-            elif s.name.startswith(".init_array") or s.name in [
-                ".vectors",
-                "iram0.vectors",
-                ".iram0.vectors",
-                ".fini_array",
-                ".fini",
-                ".init",
-                ".eh_frame",
-                ".eh_frame_hdr",
-            ]:
-                m["rom_misc"] += s.data_size
-            elif s.name.endswith(".data"):
-                m["ram_data"] += s.data_size
-            elif (
-                s.name == ".bss"
-                or s.name == "bss"
-                or s.name == ".sbss"
-                or s.name == ".shbss"
-                or s.name == ".bss.noinit"
-                or s.name.endswith(".bss")
-                or s.name.startswith(".bss")
-                or s.name.startswith(".sbss")
-                or s.name == "noinit"
-            ):
-                m["ram_zdata"] += s.data_size
-            elif s.name in ignoreSections:
-                pass
-            elif any(s.name.startswith(prefix) for prefix in ignorePrefixes):
-                pass
-            elif any(s.name.endswith(suffix) for suffix in ignoreSuffixes):
-                pass
-            elif s.data_size == 0:
-                pass  # No warning for empty sections
-            else:
-                logger.warning("ignored: %s / size: %d", s.name, s.data_size)
+    for name, _, _, size in get_elf_tables(inFile)["sections"]:
+        category = classify_section(name)
+        if category is None:
+            pass
+        elif category == "unknown":
+            if size > 0:  # No warning for empty sections
+                logger.warning("ignored: %s / size: %d", name, size)
+        else:
+            m[category] += size
 
     return m
 
 
+def get_symbol_sizes(inFile, types=("STT_FUNC", "STT_OBJECT")):
+    """Per-symbol size breakdown of an ELF file.
+
+    Returns a list of dicts with the symbol name, type, section, memory category and size in bytes.
+    """
+    ret = []
+    for name, ty, _, size, section in get_elf_tables(inFile)["symbols"]:
+        if types is not None and ty not in types:
+            continue
+        category = classify_section(section) if section is not None else None
+        ret.append({"symbol": name, "type": ty, "section": section, "category": category, "bytes": size})
+    return ret
+
+
 def printSz(sz, unknown_msg=""):
     """Helper function for printing file sizes."""
     if sz is None:
@@ -219,12 +392,20 @@ def parse_cmdline():
         default="",
         help="""Output CSV file (default: -)""",
     )
+    parser.add_argument(
+        "--symbols",
+        metavar="FILE",
+        type=str,
+        default="",
+        help="""Write per-symbol sizes to CSV file""",
+    )
     args = parser.parse_args()
 
     elfFile = args.elf[0]
     csvFile = args.out
+    symbolsFile = args.symbols
 
-    return elfFile, csvFile
+    return elfFile, csvFile, symbolsFile
 
 
 def get_results(elfFile):
@@ -270,7 +451,7 @@ def write_csv(filename, results):
 
 def main():
     """Main entry point for command line usage."""
-    elfFile, csvFile = parse_cmdline()
+    elfFile, csvFile, symbolsFile = parse_cmdline()
 
     results = get_results(elfFile)
 
@@ -279,6 +460,13 @@ def main():
     if csvFile:
         write_csv(csvFile, results)
 
+    if symbolsFile:
+        symbols = get_symbol_sizes(elfFile)
+        with open(symbolsFile, "w", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=["symbol", "type", "section", "category", "bytes"])
+            writer.writeheader()
+            writer.writerows(symbols)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,115 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Analysis of memory access traces (e.g. dBusAccess.csv written by ETISS).
+
+Each line of the trace has the format: <time/pc>;<r|w>;<address (hex)>;<size>
+"""
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+import numpy as np
+
+from mlonmcu.target.elf import get_elf_tables, parseElf
+
+DEFAULT_STACK_SIZE = 0x4000
+
+STACK_SIZE_SYMBOLS = ["__stack_size", "_stack_size", "__STACK_SIZE", "_STACK_SIZE"]
+HEAP_START_SYMBOLS = ["_heap_start", "__heap_start", "_end", "end"]
+
+
+class MemRange:
+    """Address range [start, end) of which the lowest and highest accessed addresses are tracked."""
+
+    def __init__(self, name: str, start: int, end: int):
+        assert start <= end
+        self.name = name
+        self.start = start
+        self.end = end
+        self.low = None
+        self.high = None
+        self.num_reads = 0
+        self.num_writes = 0
+
+    def update(self, addrs, sizes, writes):
+        mask = (addrs >= self.start) & (addrs < self.end)
+        if not mask.any():
+            return
+        low = int(addrs[mask].min())
+        high = int((addrs[mask] + sizes[mask]).max())
+        self.low = low if self.low is None else min(self.low, low)
+        self.high = high if self.high is None else max(self.high, high)
+        num_writes = int(np.count_nonzero(writes[mask]))
+        self.num_writes += num_writes
+        self.num_reads += int(np.count_nonzero(mask)) - num_writes
+
+    @property
+    def usage(self):
+        if self.low is None:
+            return 0
+        return self.high - self.low
+
+
+def _parse_lines(lines):
+    fields = [line.split(b";") for line in lines if line.strip()]
+    fields = [f for f in fields if len(f) >= 4]
+    writes = np.fromiter((f[1].strip() == b"w" for f in fields), dtype=bool, count=len(fields))
+    addrs = np.fromiter(map(int, (f[2] for f in fields), repeat(16)), dtype=np.uint64, count=len(fields))
+    sizes = np.fromiter((int(f[3]) for f in fields), dtype=np.uint64, count=len(fields))
+    return addrs, sizes, writes
+
+
+def analyze_mem_trace(trace_file: Union[str, Path], ranges, chunk_size: int = 1 << 20):
+    """Stream over a memory access trace and update the given MemRanges (chunk_size lines at a time)."""
+    with open(trace_file, "rb") as handle:
+        while True:
+            lines = handle.readlines(chunk_size * 32)  # hint in bytes
+            if not lines:
+                break
+            addrs, sizes, writes = _parse_lines(lines)
+            for mem_range in ranges:
+                mem_range.update(addrs, sizes, writes)
+    return ranges
+
+
+def get_stack_heap_ranges(elf_file: Union[str, Path], ram_start: int, ram_size: int) -> Tuple[MemRange, MemRange]:
+    """Derive the stack and heap regions from the linker symbols of the ELF (with fallbacks).
+
+    The stack is assumed to grow down from the end of the RAM, the heap grows up from its start symbol.
+    """
+    values = get_elf_tables(elf_file)["values"]
+    ram_end = ram_start + ram_size
+    stack_size = next((values[sym] for sym in STACK_SIZE_SYMBOLS if sym in values), DEFAULT_STACK_SIZE)
+    stack_start = max(ram_end - stack_size, ram_start)
+    heap_start = next(
+        (values[sym] for sym in HEAP_START_SYMBOLS if sym in values and ram_start <= values[sym] <= stack_start),
+        ram_start,
+    )
+    return MemRange("stack", stack_start, ram_end), MemRange("heap", heap_start, stack_start)
+
+
+def get_ram_metrics(elf_file: Union[str, Path], ram_start: int, ram_size: int, trace_file=None) -> Dict[str, int]:
+    """Static RAM usage of the ELF and (if a trace is given) the dynamic stack and heap usage."""
+    static = parseElf(elf_file)
+    ret = {"ram_data": static["ram_data"], "ram_zdata": static["ram_zdata"]}
+    if trace_file is not None:
+        stack, heap = analyze_mem_trace(trace_file, get_stack_heap_ranges(elf_file, ram_start, ram_size))
+        ret["ram_stack"] = stack.usage
+        ret["ram_heap"] = heap.usage
+    return ret
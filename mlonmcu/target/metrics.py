@@ -19,13 +19,35 @@
 import io
 import csv
 import ast
+import json
+import zlib
+
+from mlonmcu.artifact import Artifact, ArtifactFormat
+
+
+def _to_builtin(value):
+    """Convert numpy scalars and tuples to types supported by JSON."""
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(x) for x in value]
+    if isinstance(value, dict):
+        return {key: _to_builtin(x) for key, x in value.items()}
+    if hasattr(value, "item") and hasattr(value, "dtype"):
+        return value.item()
+    return value
 
 
 class Metrics:
+    """Collection of typed metrics of a run stage.
+
+    CSV is only used as an export format. Values parsed from a CSV file are evaluated lazily, metrics
+    passed between stages or processes should use the typed JSON/binary serialization instead.
+    """
+
     def __init__(self):
         self.data = {}
         self.optional_keys = []
         self.order = []
+        self.untyped_keys = set()  # Values read from CSV which were not evaluated yet
 
     @staticmethod
     def from_csv(text):
@@ -51,12 +73,50 @@ class Metrics:
                     data_[key] = value
             ret.data = data_
             ret.order = list(data_.keys())
+            ret.untyped_keys = set(data_.keys())
+        return ret
+
+    def to_dict(self):
+        return {
+            "data": {key: _to_builtin(self.get(key)) for key in self.order},
+            "optional": list(self.optional_keys),
+            "order": list(self.order),
+        }
+
+    @staticmethod
+    def from_dict(data):
+        ret = Metrics()
+        ret.data = dict(data["data"])
+        ret.optional_keys = list(data.get("optional", []))
+        ret.order = list(data.get("order", ret.data.keys()))
         return ret
 
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    @staticmethod
+    def from_json(text):
+        return Metrics.from_dict(json.loads(text))
+
+    def to_bytes(self):
+        """Compact binary representation (compressed JSON) preserving the data types."""
+        return zlib.compress(self.to_json().encode("utf-8"))
+
+    @staticmethod
+    def from_bytes(data):
+        return Metrics.from_json(zlib.decompress(data).decode("utf-8"))
+
+    def to_artifact(self, name, flags=None, include_optional=True):
+        """Create a metrics artifact which carries the typed metrics next to the CSV used for exporting."""
+        content = self.to_csv(include_optional=include_optional)
+        flags = flags if flags is not None else ["metrics"]
+        return Artifact(name, content=content, data=self, fmt=ArtifactFormat.TEXT, flags=flags)
+
     def add(self, name, value, optional=False, overwrite=False, prepend=False):
         if not overwrite:
             assert name not in self.data, "Column with the same name already exists in metrics"
         self.data[name] = value
+        self.untyped_keys.discard(name)
         if optional:
             self.optional_keys.append(name)
         if prepend:
@@ -66,7 +126,25 @@ class Metrics:
 
     def get(self, name):
         value = self.data[name]
-        return (ast.literal_eval(value) if len(value) > 0 else None) if isinstance(value, str) else value
+        if name in self.untyped_keys:
+            if isinstance(value, str):
+                value = ast.literal_eval(value) if len(value) > 0 else None
+            self.data[name] = value
+            self.untyped_keys.discard(name)
+        return value
+
+    def __setstate__(self, state):
+        if "untyped_keys" not in state:  # Pickled by an older version
+            state["untyped_keys"] = set(key for key, value in state["data"].items() if isinstance(value, str))
+        self.__dict__.update(state)
+
+    def copy(self):
+        ret = Metrics()
+        ret.data = self.data.copy()
+        ret.optional_keys = list(self.optional_keys)
+        ret.order = list(self.order)
+        ret.untyped_keys = set(self.untyped_keys)
+        return ret
 
     def has(self, name):
         return name in self.data
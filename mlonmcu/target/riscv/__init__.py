@@ -1,18 +1,33 @@
-from .etiss_pulpino import EtissPulpinoTarget
-from .etiss import EtissTarget, EtissRV32Target, EtissRV64Target
-from .etiss_perf import EtissPerfTarget
-from .spike import SpikeTarget, SpikeBMTarget, SpikePKTarget, SpikeRV32Target, SpikeRV32MinTarget, SpikeRV64Target
-from .ovpsim import OVPSimTarget
-from .corev_ovpsim import COREVOVPSimTarget
-from .riscv_qemu import RiscvQemuTarget
-from .gvsoc_pulp import GvsocPulpTarget
-from .ara import AraTarget
-from .ara_rtl import AraRtlTarget
-from .cv32e40p import CV32E40PTarget
-from .vicuna import VicunaTarget
-from .vicuna2 import Vicuna2Target
-from .canmv_k230_ssh import CanMvK230SSHTarget
-from .tgc import TGCTarget
+from mlonmcu.utils import lazy_exports
+
+# Targets are only imported on access (see mlonmcu.target._target)
+__getattr__ = lazy_exports(
+    __name__,
+    {
+        "EtissPulpinoTarget": "mlonmcu.target.riscv.etiss_pulpino:EtissPulpinoTarget",
+        "EtissTarget": "mlonmcu.target.riscv.etiss:EtissTarget",
+        "EtissPerfTarget": "mlonmcu.target.riscv.etiss_perf:EtissPerfTarget",
+        "EtissRV32Target": "mlonmcu.target.riscv.etiss:EtissRV32Target",
+        "EtissRV64Target": "mlonmcu.target.riscv.etiss:EtissRV64Target",
+        "SpikeTarget": "mlonmcu.target.riscv.spike:SpikeTarget",
+        "SpikeRV32Target": "mlonmcu.target.riscv.spike:SpikeRV32Target",
+        "SpikeRV32MinTarget": "mlonmcu.target.riscv.spike:SpikeRV32MinTarget",
+        "SpikeRV64Target": "mlonmcu.target.riscv.spike:SpikeRV64Target",
+        "SpikeBMTarget": "mlonmcu.target.riscv.spike:SpikeBMTarget",
+        "SpikePKTarget": "mlonmcu.target.riscv.spike:SpikePKTarget",
+        "OVPSimTarget": "mlonmcu.target.riscv.ovpsim:OVPSimTarget",
+        "COREVOVPSimTarget": "mlonmcu.target.riscv.corev_ovpsim:COREVOVPSimTarget",
+        "RiscvQemuTarget": "mlonmcu.target.riscv.riscv_qemu:RiscvQemuTarget",
+        "GvsocPulpTarget": "mlonmcu.target.riscv.gvsoc_pulp:GvsocPulpTarget",
+        "AraTarget": "mlonmcu.target.riscv.ara:AraTarget",
+        "AraRtlTarget": "mlonmcu.target.riscv.ara_rtl:AraRtlTarget",
+        "CV32E40PTarget": "mlonmcu.target.riscv.cv32e40p:CV32E40PTarget",
+        "VicunaTarget": "mlonmcu.target.riscv.vicuna:VicunaTarget",
+        "Vicuna2Target": "mlonmcu.target.riscv.vicuna2:Vicuna2Target",
+        "CanMvK230SSHTarget": "mlonmcu.target.riscv.canmv_k230_ssh:CanMvK230SSHTarget",
+        "TGCTarget": "mlonmcu.target.riscv.tgc:TGCTarget",
+    },
+)
 
 __all__ = [
     "EtissPulpinoTarget",
@@ -67,6 +67,8 @@ class AraTarget(RVVTarget):
         "ara.verilator_tb",
     }
 
+    PATH_CONFIGS = {"ara.verilator_tb"}
+
     def __init__(self, name="ara", features=None, config=None):
         super().__init__(name, features=features, config=config)
         assert self.config["xlen"] == 64, 'ARA target must has xlen equal 64, try "-c ara.xlen=64"'
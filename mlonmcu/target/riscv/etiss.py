@@ -22,8 +22,12 @@ import os
 import re
 import csv
 import json
+import time
+import tempfile
+import threading
 from pathlib import Path
 
+from mlonmcu.cache import get_cache_dir, hash_content, hash_file
 from mlonmcu.logging import get_logger
 from mlonmcu.timeout import exec_timeout
 from mlonmcu.config import str2bool, str2list, str2dict
@@ -33,11 +37,75 @@ from mlonmcu.setup.utils import execute
 from mlonmcu.target.common import cli
 from mlonmcu.target.metrics import Metrics
 from mlonmcu.target.bench import add_bench_metrics
+from mlonmcu.target.memtrace import get_ram_metrics
 
 from .riscv_vext_target import RVVTarget
 
 logger = get_logger()
 
+JIT_TYPES = ["TCC", "GCC", "LLVM"]
+
+
+class JitTimings:
+    """Simulation times of ETISS JIT backends per workload (ELF hash and ETISS version).
+
+    Timings are persisted in the result cache directory (if configured) to be shared across runs and sessions.
+    """
+
+    def __init__(self):
+        self.entries = {}  # in-memory fallback
+        self.lock = threading.Lock()  # Read-modify-write of concurrent runs in this process
+
+    def _file(self, key):
+        cache_dir = get_cache_dir()
+        if cache_dir is None:
+            return None
+        return Path(cache_dir) / "etiss_jit" / f"{key}.json"
+
+    def _load(self, key):
+        file = self._file(key)
+        if file is not None and file.is_file():
+            try:
+                with open(file, "r") as handle:
+                    return json.load(handle)
+            except (OSError, ValueError):
+                return {}
+        return dict(self.entries.get(key, {}))
+
+    def get(self, key):
+        with self.lock:
+            return self._load(key)
+
+    def record(self, key, jit, duration):
+        with self.lock:
+            data = self._load(key)
+            data.setdefault(jit, []).append(duration)
+            data[jit] = data[jit][-5:]  # Only the most recent ones
+            file = self._file(key)
+            if file is None:
+                self.entries[key] = data
+                return
+            file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(dir=file.parent, prefix=f".{file.name}.")
+            try:
+                with os.fdopen(fd, "w") as handle:
+                    json.dump(data, handle)
+                os.replace(tmp_file, file)  # Atomic, readers never see a partial file
+            except BaseException:
+                os.unlink(tmp_file)
+                raise
+
+    def select(self, key, candidates):
+        """Pick the next untested candidate or the one with the lowest median time."""
+        data = self.get(key)
+        for jit in candidates:
+            if jit not in data:
+                return jit
+        return min(candidates, key=lambda jit: sorted(data[jit])[len(data[jit]) // 2])
+
+
+JIT_TIMINGS = JitTimings()
+
 
 class EtissTarget(RVVTarget):
     """Target using a simple RISC-V VP running in the ETISS simulator"""
@@ -74,7 +142,8 @@ class EtissTarget(RVVTarget):
         "pext_spec": 0.96,
         "vlen": 0,  # vectorization=off
         "elen": 32,
-        "jit": None,
+        "jit": None,  # Allowed: TCC, GCC, LLVM, auto (pick fastest based on previous runs of the same ELF)
+        "jit_candidates": JIT_TYPES,  # Only relevant if jit=auto
         "allow_error": False,
         "max_block_size": None,
         "enable_xcorevmac": False,
@@ -99,7 +168,8 @@ class EtissTarget(RVVTarget):
         "jit_debug": False,
         "load_integrated_libraries": True,
         "fclk": 100e6,
-        "use_stats_file": False,
+        "use_stats_file": True,
+        "native_metrics": True,  # Analyze memory traces in-process instead of using get_metrics.py
     }
     REQUIRED = RVVTarget.REQUIRED | {"etiss.src_dir", "etiss.install_dir"}
     OPTIONAL = RVVTarget.OPTIONAL | {"boost.install_dir", "etiss.exe", "etiss.script", "etissvp.exe", "etissvp.script"}
@@ -108,6 +178,8 @@ class EtissTarget(RVVTarget):
         super().__init__(name, features=features, config=config)
         # TODO: make optional or move to mlonmcu pkg
         self.metrics_script = Path(self.etiss_src_dir) / "src" / "bare_etiss_processor" / "get_metrics.py"
+        self.ini_cache = {}  # Rendered ini files by override
+        self.selected_jit = None
 
     @property
     def etiss_src_dir(self):
@@ -146,6 +218,11 @@ class EtissTarget(RVVTarget):
         value = self.config["use_stats_file"]
         return str2bool(value)
 
+    @property
+    def native_metrics(self):
+        value = self.config["native_metrics"]
+        return str2bool(value)
+
     @property
     def gdbserver_enable(self):
         value = self.config["gdbserver_enable"]
@@ -292,6 +369,40 @@ class EtissTarget(RVVTarget):
     def jit(self):
         return self.config["jit"]
 
+    @property
+    def jit_candidates(self):
+        value = self.config["jit_candidates"]
+        value = str2list(value)
+        assert len(value) > 0
+        return value
+
+    def get_available_jits(self):
+        """Return the candidate JITs for which a plugin library is installed."""
+        lib_dir = Path(self.etiss_dir) / "lib" / "plugins"
+        if not lib_dir.is_dir():
+            return self.jit_candidates  # unknown layout
+        available = [jit for jit in self.jit_candidates if any(lib_dir.glob(f"*{jit}JIT*"))]
+        return available if len(available) > 0 else self.jit_candidates
+
+    def get_etiss_version_key(self):
+        """Identify the ETISS installation (used to invalidate recorded JIT timings)."""
+        exe = Path(self.etiss_dir) / "bin" / "bare_etiss_processor"
+        if not exe.is_file():
+            exe = Path(self.etiss_script if self.use_run_helper else self.etiss_exe)
+        if not exe.is_file():
+            return str(exe)
+        stat = exe.stat()
+        return f"{exe.resolve()}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def get_jit_key(self, program):
+        return hash_content(f"{hash_file(program)};{self.get_etiss_version_key()}")
+
+    def resolve_jit(self, program):
+        """Return the JIT to be used for the given program (None: ETISS default)."""
+        if self.jit != "auto":
+            return self.jit
+        return JIT_TIMINGS.select(self.get_jit_key(program), self.get_available_jits())
+
     @property
     def extra_bool_config(self):
         value = self.config["extra_bool_config"]
@@ -433,6 +544,7 @@ class EtissTarget(RVVTarget):
         return value
 
     def get_ini_bool_config(self, override=None):
+        jit_type = override.get("jit.type")
         override = {k: v for k, v in override.items() if isinstance(v, bool)}
 
         ret = {
@@ -448,7 +560,7 @@ class EtissTarget(RVVTarget):
             ret["etiss.exit_on_loop"] = self.exit_on_loop
             ret["etiss.log_pc"] = self.log_pc
             ret["etiss.enable_dmi"] = self.enable_dmi
-        if self.jit == "GCC":
+        if self.jit == "GCC" or jit_type == "GCCJIT":
             ret["jit.gcc.cleanup"] = self.jit_gcc_cleanup
 
         ret.update(self.extra_bool_config)
@@ -464,7 +576,7 @@ class EtissTarget(RVVTarget):
             # "simple_mem_system.memseg_mode_01": "RWX",
             "etiss.output_path_prefix": self.output_path_prefix,
         }
-        if self.jit is not None:
+        if self.jit is not None and self.jit != "auto":
             ret["jit.type"] = f"{self.jit}JIT"
         ret.update(self.extra_string_config)
         ret.update(override)
@@ -518,57 +630,75 @@ class EtissTarget(RVVTarget):
         ret.update(self.extra_plugin_config)  # TODO: merge nested dict instead of overriding
         return ret
 
+    def render_ini(self, override=None):
+        """Return the contents of the ETISS ini file.
+
+        The rendered file is reused for all runs with the same configuration.
+        """
+        key = (repr(override), repr(sorted(self.config.items(), key=lambda x: x[0])))
+        if key in self.ini_cache:
+            return self.ini_cache[key]
+        lines = []
+        ini_bool = self.get_ini_bool_config(override=override)
+        if len(ini_bool) > 0:
+            lines.append("[BoolConfigurations]")
+            for key_, value in ini_bool.items():
+                assert isinstance(value, bool)
+                val = "true" if value else "false"
+                lines.append(f"{key_}={val}")
+        ini_string = self.get_ini_string_config(override=override)
+        if len(ini_string) > 0:
+            lines.append("[StringConfigurations]")
+            for key_, value in ini_string.items():
+                if isinstance(value, Path):
+                    value = str(value)
+                assert isinstance(value, str)
+                lines.append(f"{key_}={value}")
+        ini_int = self.get_ini_int_config(override=override)
+        if len(ini_int) > 0:
+            lines.append("[IntConfigurations]")
+            for key_, value in ini_int.items():
+                assert isinstance(value, int)
+                lines.append(f"{key_}={value}")
+        ini_plugin = self.get_ini_plugin_config()
+        for plugin_name in self.get_plugin_names():
+            lines.append(f"[Plugin {plugin_name}]")
+            LOOKUP = {
+                "TracePrinterPlugin": "tracePrinter",
+                "PerformanceEstimatorPlugin": "perfEst",
+            }
+            plugin_name_ = LOOKUP.get(plugin_name, plugin_name)
+            cfg = ini_plugin.pop(plugin_name_, {})
+            for key_, value in cfg.items():
+                if isinstance(value, bool):
+                    val = "true" if value else "false"
+                else:
+                    val = value
+                lines.append(f"plugin.{plugin_name_}.{key_}={val}")
+        # Check for remaining configs
+        for plugin_name, cfg in ini_plugin.items():
+            if len(cfg) == 0:
+                continue
+            # logger.warning("Skipping config %s for disabled plugin %s", cfg, plugin_name)
+            # FIXME: For etiss_perf there is a missmtach between plugin name and config prefix
+            for key_, value in cfg.items():
+                if isinstance(value, bool):
+                    val = "true" if value else "false"
+                else:
+                    val = value
+                lines.append(f"plugin.{plugin_name}.{key_}={val}")
+        content = "".join(f"{line}\n" for line in lines)
+        self.ini_cache[key] = content
+        return content
+
     def write_ini(self, path, override=None):
         # TODO: Either create artifact for ini or prefer to use cmdline args.
-        with open(path, "w") as f:
-            ini_bool = self.get_ini_bool_config(override=override)
-            if len(ini_bool) > 0:
-                f.write("[BoolConfigurations]\n")
-                for key, value in ini_bool.items():
-                    assert isinstance(value, bool)
-                    val = "true" if value else "false"
-                    f.write(f"{key}={val}\n")
-            ini_string = self.get_ini_string_config(override=override)
-            if len(ini_string) > 0:
-                f.write("[StringConfigurations]\n")
-                for key, value in ini_string.items():
-                    if isinstance(value, Path):
-                        value = str(value)
-                    assert isinstance(value, str)
-                    f.write(f"{key}={value}\n")
-            ini_int = self.get_ini_int_config(override=override)
-            if len(ini_int) > 0:
-                f.write("[IntConfigurations]\n")
-                for key, value in ini_int.items():
-                    assert isinstance(value, int)
-                    f.write(f"{key}={value}\n")
-            ini_plugin = self.get_ini_plugin_config()
-            for plugin_name in self.get_plugin_names():
-                f.write(f"[Plugin {plugin_name}]\n")
-                LOOKUP = {
-                    "TracePrinterPlugin": "tracePrinter",
-                    "PerformanceEstimatorPlugin": "perfEst",
-                }
-                plugin_name_ = LOOKUP.get(plugin_name, plugin_name)
-                cfg = ini_plugin.pop(plugin_name_, {})
-                for key, value in cfg.items():
-                    if isinstance(value, bool):
-                        val = "true" if value else "false"
-                    else:
-                        val = value
-                    f.write(f"plugin.{plugin_name_}.{key}={val}\n")
-            # Check for remaining configs
-            for plugin_name, cfg in ini_plugin.items():
-                if len(cfg) == 0:
-                    continue
-                # logger.warning("Skipping config %s for disabled plugin %s", cfg, plugin_name)
-                # FIXME: For etiss_perf there is a missmtach between plugin name and config prefix
-                for key, value in cfg.items():
-                    if isinstance(value, bool):
-                        val = "true" if value else "false"
-                    else:
-                        val = value
-                    f.write(f"plugin.{plugin_name}.{key}={val}\n")
+        content = self.render_ini(override=override)
+        path = Path(path)
+        # Do not touch unchanged files (e.g. repeated runs in the same directory)
+        if not path.is_file() or path.read_text() != content:
+            path.write_text(content)
+        return content
 
     def exec(self, program, *args, cwd=os.getcwd(), **kwargs):
         """Use target to execute a executable with given arguments"""
@@ -624,8 +754,11 @@ class EtissTarget(RVVTarget):
             etiss_script_args.insert(0, program)
         else:
             ini_override["vp.elf_file"] = program
+        self.selected_jit = self.resolve_jit(program)
+        if self.jit == "auto":
+            ini_override["jit.type"] = f"{self.selected_jit}JIT"
         etiss_ini = os.path.join(cwd, "custom.ini")
-        self.write_ini(etiss_ini, override=ini_override)
+        ini_content = self.write_ini(etiss_ini, override=ini_override)
         etiss_script_args.append("-i" + etiss_ini)
 
         # if self.timeout_sec > 0:
@@ -662,7 +795,8 @@ class EtissTarget(RVVTarget):
                 cwd=cwd,
                 **kwargs,
             )
-        return ret, []
+        ini_artifact = Artifact("custom.ini", content=ini_content, fmt=ArtifactFormat.TEXT)
+        return ret, [ini_artifact]
 
     def parse_exit(self, out):
         exit_code = super().parse_exit(out)
@@ -686,11 +820,8 @@ class EtissTarget(RVVTarget):
         runtime = None
         sim_time = None
         mips = None
-        if self.use_stats_file:
-            assert cwd is not None
-            stats_file = Path(cwd) / "stats.json"
-            assert stats_file.is_file()
-
+        stats_file = Path(cwd) / "stats.json" if self.use_stats_file and cwd is not None else None
+        if stats_file is not None and stats_file.is_file():
             with open(stats_file) as f:
                 stats_data = json.load(f)
             mips = stats_data.get("mips", None)
@@ -698,6 +829,8 @@ class EtissTarget(RVVTarget):
             runtime = stats_data.get("CPU_Time", None)
             sim_time = stats_data.get("Simulation_Time", None)
         else:
+            if stats_file is not None:
+                logger.debug("ETISS stats file not found, falling back to stdout (older ETISS version?)")
             sim_insns_match = re.search(r"CPU Cycles \(estimated\): (.*)", out)
             if sim_insns_match:
                 sim_insns_str = sim_insns_match.group(1)
@@ -731,6 +864,10 @@ class EtissTarget(RVVTarget):
         metrics_file = os.path.join(directory, "metrics.csv")
         if os.path.exists(metrics_file):
             os.remove(metrics_file)
+        if self.use_stats_file:
+            stats_file = os.path.join(directory, "stats.json")
+            if os.path.exists(stats_file):
+                os.remove(stats_file)
 
         def _handle_exit(code, out=None):
             assert out is not None
@@ -744,6 +881,7 @@ class EtissTarget(RVVTarget):
 
         artifacts = []
 
+        start_time = time.time()
         if self.print_outputs:
             out_, artifacts_ = self.exec(elf, *args, cwd=directory, live=True, handle_exit=_handle_exit)
             out += out_
@@ -754,10 +892,15 @@ class EtissTarget(RVVTarget):
             )
             out += out_
             artifacts += artifacts_
+        if self.jit == "auto":
+            # Includes the translation warmup, which is what differs between the JITs
+            JIT_TIMINGS.record(self.get_jit_key(elf), self.selected_jit, time.time() - start_time)
         # TODO: get exit code
         exit_code = 0
         metrics = Metrics()
         self.parse_stdout(out, metrics, exit_code=exit_code, cwd=directory)
+        if self.jit == "auto":
+            metrics.add("ETISS JIT", self.selected_jit, optional=True)
         if not metrics.has("Runtime [s]") and self.fclk:
             if metrics.has("Total Cycles"):
                 cycles = metrics.get("Total Cycles")
@@ -766,7 +909,15 @@ class EtissTarget(RVVTarget):
 
         etiss_ini = os.path.join(directory, "custom.ini")
         needs_get_metrics = self.trace_memory
-        if needs_get_metrics:
+        if needs_get_metrics and self.native_metrics:
+            assert trace_file is not None and os.path.exists(trace_file), f"Memory trace not found: {trace_file}"
+            data = get_ram_metrics(elf, self.ram_start, self.ram_size, trace_file=trace_file)
+            metrics.add("Total RAM", data["ram_data"] + data["ram_zdata"] + data["ram_stack"] + data["ram_heap"])
+            metrics.add("RAM data", data["ram_data"])
+            metrics.add("RAM zero-init data", data["ram_zdata"])
+            metrics.add("RAM stack", data["ram_stack"])
+            metrics.add("RAM heap", data["ram_heap"])
+        elif needs_get_metrics:
             get_metrics_args = [elf]
             if os.path.exists(etiss_ini):
                 get_metrics_args.extend(["--ini", etiss_ini])
@@ -832,10 +983,6 @@ class EtissTarget(RVVTarget):
                     metrics.add("RAM stack", ram_stack)
                     metrics.add("RAM heap", ram_heap)
 
-        ini_content = open(etiss_ini, "r").read()
-        ini_artifact = Artifact("custom.ini", content=ini_content, fmt=ArtifactFormat.TEXT)
-        artifacts.append(ini_artifact)
-
         return metrics, out, artifacts
 
     def get_target_system(self):
@@ -18,12 +18,20 @@
 """MLonMCU RISC-V QEMU Target definitions"""
 
 import os
-
 import re
+import shutil
+import socket
+import subprocess
+import tempfile
+from pathlib import Path
+
+from filelock import FileLock
 
 from mlonmcu.logging import get_logger
+from mlonmcu.cache import get_cache_dir, hash_content, hash_file
 from mlonmcu.config import str2bool
 from mlonmcu.setup.utils import execute
+from mlonmcu.target.elf import get_elf_tables
 from mlonmcu.target.common import cli
 from mlonmcu.target.metrics import Metrics
 from .riscv import RISCVTarget
@@ -31,13 +39,21 @@ from .util import update_extensions
 
 logger = get_logger()
 
+SNAPSHOT_TAG = "mlonmcu_boot"
+
 # TODO: create (Riscv)QemuTarget with variable machine
 
 
+def _get_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
 class RiscvQemuTarget(RISCVTarget):
     """Target using a spike machine in the QEMU simulator"""
 
-    FEATURES = RISCVTarget.FEATURES | {"vext"}
+    FEATURES = RISCVTarget.FEATURES | {"vext", "snapshot"}
 
     DEFAULTS = {
         **RISCVTarget.DEFAULTS,
@@ -46,6 +62,9 @@ class RiscvQemuTarget(RISCVTarget):
         "enable_vext": False,
         "vext_spec": 1.0,
         "embedded_vext": False,
+        "snapshot_enable": False,
+        "snapshot_marker": "main",  # symbol reached after boot/runtime initialization
+        "snapshot_dir": None,  # defaults to the cache directory (if set) or the working directory of the run
     }
     REQUIRED = RISCVTarget.REQUIRED | {"riscv32_qemu.exe"}  # TODO: 64 bit?
 
@@ -90,6 +109,31 @@ class RiscvQemuTarget(RISCVTarget):
         value = self.config["embedded_vext"]
         return str2bool(value)
 
+    @property
+    def snapshot_enable(self):
+        value = self.config["snapshot_enable"]
+        return str2bool(value)
+
+    @property
+    def snapshot_marker(self):
+        return self.config["snapshot_marker"]
+
+    @property
+    def snapshot_dir(self):
+        value = self.config["snapshot_dir"]
+        return value if value is None else Path(value)
+
+    @property
+    def qemu_img_exe(self):
+        ret = Path(self.riscv32_qemu_exe).parent / "qemu-img"
+        if ret.is_file():
+            return ret
+        return shutil.which("qemu-img")
+
+    @property
+    def gdb_exe(self):
+        return Path(self.riscv_gcc_prefix) / "bin" / f"{self.riscv_gcc_basename}-gdb"
+
     def get_cpu_str(self):
         cfg = {}
         if self.enable_vext:
@@ -109,10 +153,92 @@ class RiscvQemuTarget(RISCVTarget):
         args.extend(["-kernel", program])
         return args
 
+    def get_snapshot_file(self, program, cwd):
+        """Location of the snapshot image for the given program (keyed by program and simulator arguments)."""
+        key = hash_content(
+            f"{hash_file(program)};{self.get_qemu_args('')};{self.snapshot_marker};{self.riscv32_qemu_exe}"
+        )
+        base = self.snapshot_dir
+        if base is None:
+            cache_dir = get_cache_dir()
+            base = Path(cwd) if cache_dir is None else cache_dir / "qemu_snapshots"
+        return Path(base) / f"{key}.qcow2"
+
+    def create_snapshot(self, program, dest):
+        """Run the program until the marker symbol is reached and save the VM state in a qcow2 image.
+
+        The simulator is halted using its gdbstub, the snapshot is taken via the QEMU monitor (savevm).
+        """
+        assert self.qemu_img_exe is not None, "Snapshots require qemu-img"
+        assert self.gdb_exe.is_file(), f"Snapshots require gdb: {self.gdb_exe}"
+        with tempfile.TemporaryDirectory() as temp_dir:
+            image = Path(temp_dir) / "snapshot.qcow2"
+            execute(self.qemu_img_exe, "create", "-f", "qcow2", image, "1M", live=False)
+            port = _get_free_port()
+            qemu_args = self.get_qemu_args(program)
+            qemu_args.extend(["-drive", f"if=none,format=qcow2,file={image}"])
+            qemu_args.extend(["-S", "-gdb", f"tcp:localhost:{port}"])
+            process = subprocess.Popen(
+                [self.riscv32_qemu_exe, *qemu_args],
+                cwd=temp_dir,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                gdb_cmds = [
+                    f"target remote localhost:{port}",
+                    f"break {self.snapshot_marker}",
+                    "continue",
+                    "delete",
+                    f"monitor savevm {SNAPSHOT_TAG}",
+                ]
+                gdb_args = ["-batch", "-nx", program]
+                for cmd in gdb_cmds:
+                    gdb_args.extend(["-ex", cmd])
+                execute(self.gdb_exe, *gdb_args, cwd=temp_dir, live=False)
+            finally:
+                process.kill()
+                process.wait()
+            # Atomic move as the snapshot might be shared by parallel runs
+            fd, temp = tempfile.mkstemp(dir=dest.parent, prefix=f".{dest.name}.")
+            os.close(fd)
+            try:
+                shutil.move(image, temp)
+                os.replace(temp, dest)
+            except BaseException:
+                os.unlink(temp)
+                raise
+
+    def prepare_snapshot(self, program, cwd):
+        """Return a copy of the snapshot image for this run (created if missing) or None if not applicable."""
+        if self.timeout_sec > 0:
+            logger.warning("Snapshots are not supported in combination with a timeout. Skipping snapshot.")
+            return None
+        if self.snapshot_marker not in get_elf_tables(program)["values"]:
+            logger.warning("Snapshot marker '%s' not found in program. Skipping snapshot.", self.snapshot_marker)
+            return None
+        snapshot_file = self.get_snapshot_file(program, cwd)
+        snapshot_file.parent.mkdir(parents=True, exist_ok=True)
+        # Parallel runs of the same program wait for the first one to create the snapshot and reuse it
+        with FileLock(snapshot_file.parent / f".{snapshot_file.name}.lock"):
+            if not snapshot_file.is_file():
+                logger.debug("Creating simulator snapshot: %s", snapshot_file)
+                self.create_snapshot(program, snapshot_file)
+        # QEMU locks the image while running, hence every run uses its own copy
+        image = Path(cwd) / "snapshot.qcow2"
+        shutil.copyfile(snapshot_file, image)
+        return image
+
     def exec(self, program, *args, cwd=os.getcwd(), **kwargs):
         """Use target to execute a executable with given arguments"""
         assert len(args) == 0, "Qemu does not support passing arguments."
         qemu_args = self.get_qemu_args(program)
+        if self.snapshot_enable:
+            image = self.prepare_snapshot(program, cwd)
+            if image is not None:
+                qemu_args.extend(["-drive", f"if=none,format=qcow2,file={image}"])
+                qemu_args.extend(["-loadvm", SNAPSHOT_TAG])
 
         if self.timeout_sec > 0:
             raise NotImplementedError
@@ -248,6 +248,8 @@ class SpikePKTarget(SpikeBaseTarget):
         "spike_pk.pk_rv64",
     }
 
+    PATH_CONFIGS = {"spike.pk_rv32", "spike.pk_rv64", "spike_pk.pk_rv32", "spike_pk.pk_rv64"}
+
     @property
     def build_pk(self):
         value = self.config["build_pk"]
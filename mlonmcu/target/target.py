@@ -225,8 +225,7 @@ class Target:
         for name, metrics_ in metrics.items():
             if name == "default":
                 metrics_.add("Run Stage Time [s]", diff, True)
-            content = metrics_.to_csv(include_optional=True)  # TODO: store df instead?
-            artifact = Artifact("run_metrics.csv", content=content, fmt=ArtifactFormat.TEXT, flags=["metrics"])
+            artifact = metrics_.to_artifact("run_metrics.csv")
             # Alternative: artifact = Artifact("metrics.csv", data=df/dict, fmt=ArtifactFormat.DATA)
             if name not in artifacts:
                 artifacts[name] = []
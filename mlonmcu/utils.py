@@ -17,6 +17,8 @@
 # limitations under the License.
 #
 import sys
+import importlib
+from collections.abc import MutableMapping
 
 
 def is_power_of_two(n):
@@ -54,3 +56,56 @@ def filter_none(data):
     assert isinstance(data, dict), "Dict only"
     out = {key: value for key, value in data.items() if value is not None}
     return out
+
+
+def import_attr(path):
+    """Import an object given as '<module>:<attribute>'."""
+    module_name, attr = path.split(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class LazyRegistry(MutableMapping):
+    """Registry of components which are only imported when they are accessed for the first time.
+
+    Values can either be the component classes or '<module>:<attribute>' strings referring to them.
+    Listing the names (e.g. for CLI choices) does not import anything.
+    """
+
+    def __init__(self, entries=None):
+        self._entries = dict(entries) if entries is not None else {}
+
+    def __getitem__(self, key):
+        value = self._entries[key]
+        if isinstance(value, str):
+            value = import_attr(value)
+            self._entries[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self._entries[key] = value
+
+    def __delitem__(self, key):
+        del self._entries[key]
+
+    def __contains__(self, key):
+        return key in self._entries  # Does not import the component
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"LazyRegistry({list(self._entries)})"
+
+
+def lazy_exports(module_name, exports):
+    """Return a module level __getattr__ which imports the given '<name>: <module>:<attribute>' exports on access."""
+
+    def __getattr__(name):
+        if name in exports:
+            return import_attr(exports[name])
+        raise AttributeError(f"module {module_name!r} has no attribute {name!r}")
+
+    return __getattr__
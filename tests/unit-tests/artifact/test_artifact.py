@@ -18,7 +18,7 @@
 #
 """Unit tests for the artifact submodule."""
 
-from mlonmcu.artifact import Artifact, ArtifactFormat, lookup_artifacts
+from mlonmcu.artifact import Artifact, ArtifactFormat, ArtifactList, lookup_artifacts
 
 
 def test_lookup_artifacts():
@@ -36,3 +36,86 @@ def test_lookup_artifacts():
     assert lookup_artifacts(artifacts, fmt=ArtifactFormat.RAW) == [third]
     assert lookup_artifacts(artifacts, flags={"test"}) == [third, fourth]
     assert lookup_artifacts(artifacts, flags={"test", "sw"}) == [third]
+
+
+def test_lazy_artifact(tmp_path):
+    src = tmp_path / "foo.txt"
+    src.write_text("Hello World!")
+    artifact = Artifact.from_path("foo.txt", src, fmt=ArtifactFormat.TEXT)
+    assert artifact.lazy
+    assert not artifact.loaded
+    assert artifact.size == 12
+    assert artifact.content == "Hello World!"
+    assert artifact.loaded
+    dest = tmp_path / "out"
+    dest.mkdir()
+    artifact.export(dest)
+    assert artifact.path == dest / "foo.txt"
+    assert (dest / "foo.txt").read_text() == "Hello World!"
+
+
+def test_lazy_artifact_pickle(tmp_path):
+    import pickle
+
+    src = tmp_path / "foo.bin"
+    src.write_bytes(b"\x00" * 4096)
+    artifact = Artifact.from_path("foo.bin", src, fmt=ArtifactFormat.RAW)
+    assert len(artifact.raw) == 4096
+    data = pickle.dumps(artifact)
+    assert len(data) < 4096
+    restored = pickle.loads(data)
+    assert not restored.loaded
+    assert restored.raw == artifact.raw
+
+
+def test_artifact_spill(tmp_path):
+    artifact = Artifact("foo.txt", content="x" * 100, fmt=ArtifactFormat.TEXT)
+    assert not artifact.spill(tmp_path, threshold=1000)
+    assert not artifact.lazy
+    assert artifact.spill(tmp_path, threshold=10)
+    assert artifact.lazy
+    assert not artifact.loaded
+    assert artifact.path == tmp_path / "foo.txt"
+    assert artifact.content == "x" * 100
+    artifact.cache()
+    assert not artifact.lazy
+    assert artifact.content == "x" * 100
+    # Already exported artifacts are backed by the spilled file afterwards
+    dest = tmp_path / "spilled"
+    dest.mkdir()
+    assert artifact.spill(dest, threshold=10)
+    assert artifact.path == dest / "foo.txt"
+    (tmp_path / "foo.txt").unlink()
+    assert artifact.content == "x" * 100
+
+
+def test_artifact_list():
+    first = Artifact("foo.json", content="{}", fmt=ArtifactFormat.SOURCE, flags={"metadata"})
+    second = Artifact("bar.txt", content="bar", fmt=ArtifactFormat.TEXT)
+    third = Artifact("hello.elf", raw=b"", fmt=ArtifactFormat.RAW, flags={"sw", "elf", "test"})
+    fourth = Artifact("world.txt", content="", fmt=ArtifactFormat.TEXT, flags={"test"})
+    artifacts = ArtifactList([first, second, third])
+    assert artifacts == [first, second, third]
+    assert lookup_artifacts(artifacts, fmt=ArtifactFormat.TEXT) == [second]
+    artifacts.append(fourth)
+    assert lookup_artifacts(artifacts) == [first, second, third, fourth]
+    assert lookup_artifacts(artifacts, first_only=True) == [first]
+    assert lookup_artifacts(artifacts, name="foo.txt") == []
+    assert lookup_artifacts(artifacts, name="bar.txt") == [second]
+    assert lookup_artifacts(artifacts, fmt=ArtifactFormat.TEXT) == [second, fourth]
+    assert lookup_artifacts(artifacts, fmt=ArtifactFormat.TEXT, first_only=True) == [second]
+    assert lookup_artifacts(artifacts, flags={"test"}) == [third, fourth]
+    assert lookup_artifacts(artifacts, flags={"test", "sw"}) == [third]
+    assert lookup_artifacts(artifacts, fmt=ArtifactFormat.TEXT, flags=["test"]) == [fourth]
+    artifacts.remove(second)
+    assert lookup_artifacts(artifacts, name="bar.txt") == []
+    combined = artifacts + [second]
+    assert isinstance(combined, ArtifactList)
+    assert lookup_artifacts(combined, name="bar.txt") == [second]
+    # Empty flags match every artifact
+    assert combined.lookup(flags=()) == [first, third, fourth, second]
+    assert combined.lookup(flags=[], first_only=True) == [first]
+    # Modified artifacts are found after invalidating the index
+    second.name = "baz.txt"
+    combined.invalidate_index()
+    assert combined.lookup(name="baz.txt") == [second]
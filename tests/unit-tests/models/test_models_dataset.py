@@ -0,0 +1,95 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+import mock
+import pytest
+
+from mlonmcu.models import dataset
+from mlonmcu.models.dataset import DATASET_CACHE, Dataset, select_indices, load_dataset_inputs
+
+
+def test_select_indices():
+    assert select_indices(10) == list(range(10))
+    assert select_indices(10, number=3) == [0, 1, 2]
+    assert select_indices(10, num_shards=3, shard_index=1) == [1, 4, 7]
+    shuffled = select_indices(10, seed=42)
+    assert sorted(shuffled) == list(range(10))
+    assert shuffled == select_indices(10, seed=42)
+    shards = [select_indices(10, seed=42, num_shards=3, shard_index=i) for i in range(3)]
+    assert sorted(sum(shards, [])) == list(range(10))
+    with pytest.raises(AssertionError):
+        select_indices(10, num_shards=2, shard_index=2)
+
+
+def test_dataset_npy_mmap(tmp_path):
+    data = np.arange(5 * 4, dtype="float32").reshape(5, 1, 4)
+    np.save(tmp_path / "data.npy", data)
+    ds = Dataset(tmp_path / "data.npy", ["x"])
+    assert len(ds) == 5
+    assert isinstance(ds.arrays[0], np.memmap)
+    assert ds.load(3, 0).tolist() == data[3].tolist()
+
+
+def test_load_dataset_inputs_quant(tmp_path):
+    DATASET_CACHE.clear()
+    np.savez(tmp_path / "data.npz", b=np.ones((4, 2), dtype="float32"), a=np.linspace(-1, 1, 8).reshape(4, 2))
+    names = ["a", "b"]
+    types = {"a": "int8", "b": "float32"}
+    shapes = {"a": [1, 2], "b": [1, 2]}
+    quant = {"a": [0.5, 0, "float32", [-0.5, 0.5]]}
+    inputs = load_dataset_inputs(tmp_path / "data.npz", names, types, shapes, {}, quant, number=2, seed=1)
+    assert len(inputs) == 2
+    for sample in inputs:
+        assert list(sample.keys()) == names
+        assert sample["a"].dtype == np.int8 and sample["a"].shape == (1, 2)
+        assert np.abs(sample["a"]).max() <= 1  # clipped to quant range before quantization
+        assert sample["b"].tolist() == [[1.0, 1.0]]
+    # second lookup is served from the cache
+    with mock.patch.object(dataset, "prepare_input") as prepare_mock:
+        inputs2 = load_dataset_inputs(tmp_path / "data.npz", names, types, shapes, {}, quant, number=2, seed=1)
+        prepare_mock.assert_not_called()
+    assert all(np.array_equal(x["a"], y["a"]) for x, y in zip(inputs, inputs2))
+
+
+def test_load_dataset_inputs_extracted_quant(tmp_path):
+    DATASET_CACHE.clear()
+    np.savez(tmp_path / "data.npz", a=np.linspace(-1, 1, 8).reshape(4, 2), b=np.ones((4, 2), dtype="float32"))
+    names = ["a", "b"]
+    types = {"a": "int8", "b": "float32"}
+    shapes = {"a": [1, 2], "b": [1, 2]}
+    # Quantization details of tflite models without metadata (no range, scale 0 if not quantized)
+    quant = {"a": [0.5, 1, "float32"], "b": [0.0, 0, "float32"]}
+    inputs = load_dataset_inputs(tmp_path / "data.npz", names, types, shapes, {}, quant, number=4)
+    assert inputs[0]["a"].dtype == np.int8 and inputs[0]["a"].tolist() == [[-1, 0]]
+    assert all(sample["b"].tolist() == [[1.0, 1.0]] for sample in inputs)
+
+
+def test_load_dataset_inputs_images(tmp_path):
+    image = pytest.importorskip("PIL.Image")
+    for i in range(3):
+        img = np.full((16, 12, 3), i * 100, dtype="uint8")
+        image.fromarray(img).save(tmp_path / f"{i}.png")
+    (tmp_path / "README.md").write_text("ignored")
+    inputs = load_dataset_inputs(
+        tmp_path, ["img"], {"img": "float32"}, {"img": [1, 8, 8, 3]}, {"img": [0.0, 1.0]}, {}, use_cache=False
+    )
+    assert len(inputs) == 3
+    assert inputs[0]["img"].shape == (1, 8, 8, 3)
+    assert inputs[0]["img"].max() == 0.0
+    assert np.isclose(inputs[2]["img"].max(), 200 / 255)
@@ -0,0 +1,73 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+import mock
+
+from mlonmcu.cache import set_cache_dir
+from mlonmcu.models.frontend import ONNXFrontend, REF_OUTPUTS_CACHE, dequantize_outputs, hash_inputs
+
+
+def _fake_inference_batch(model, inputs_data, quant=False, dequant=False):
+    return [{"output": (input_data["input"] * 2).astype("int8")} for input_data in inputs_data]
+
+
+def test_hash_inputs():
+    first = [{"input": np.zeros((1, 4), dtype="int8")}]
+    assert hash_inputs(first) == hash_inputs([{"input": np.zeros((1, 4), dtype="int8")}])
+    assert hash_inputs(first) != hash_inputs([{"input": np.zeros((1, 4), dtype="float32")}])
+    assert hash_inputs(first) != hash_inputs([{"input": np.zeros((4, 1), dtype="int8")}])
+
+
+def test_frontend_batched_ref_data(tmp_path):
+    set_cache_dir(None)
+    REF_OUTPUTS_CACHE.clear()
+    model_file = tmp_path / "model.onnx"
+    model_file.write_bytes(b"model")
+    model = mock.Mock(paths=[model_file])
+    config = {
+        "onnx.gen_ref_data": True,
+        "onnx.gen_ref_data_mode": "model",
+        "onnx.gen_ref_labels": True,
+        "onnx.gen_ref_labels_mode": "model",
+    }
+    frontend = ONNXFrontend(config=config)
+    inputs_data = [{"input": np.array([[i, 3 - i, 1]], dtype="int8")} for i in range(4)]
+    quant = {"output": [0.5, 1, "float32", None]}
+    with mock.patch.object(ONNXFrontend, "inference_batch", side_effect=_fake_inference_batch) as inference_mock:
+        outputs = frontend.generate_output_ref_data(inputs_data, model, [], ["output"], {}, {}, quant)
+        labels = frontend.generate_ref_labels(inputs_data, model, [], ["output"], {}, {}, quant)
+        # Single batched inference for reference outputs and labels
+        assert inference_mock.call_count == 1
+        assert len(inference_mock.call_args[0][1]) == 4
+        model_file.write_bytes(b"changed")
+        frontend.generate_output_ref_data(inputs_data, model, [], ["output"], {}, {}, quant)
+        assert inference_mock.call_count == 2
+    assert len(outputs) == 4
+    assert outputs[0]["output"].dtype == np.float32
+    assert outputs[1]["output"].tolist() == [[0.5, 1.5, 0.5]]
+    assert [int(label) for label in labels] == [1, 1, 0, 0]
+
+
+def test_dequantize_outputs():
+    outputs = [{"out": np.array([[3, 7]], dtype="int32"), "q": np.array([[2, 4]], dtype="int8")}]
+    quant = {"out": [0.0, 0, "float32"], "q": [0.5, 2, "float32"]}  # As extracted from tflite models
+    ret = dequantize_outputs(outputs, quant)
+    assert ret[0]["out"].dtype == np.int32 and ret[0]["out"].tolist() == [[3, 7]]  # Not quantized
+    assert ret[0]["q"].tolist() == [[0.0, 1.0]]
+    assert dequantize_outputs(outputs, {"out": [None, None, "float32"]})[0]["out"].tolist() == [[3, 7]]
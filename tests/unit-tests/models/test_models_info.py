@@ -0,0 +1,61 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import mock
+
+from mlonmcu.cache import set_cache_dir
+from mlonmcu.models import model_info
+from mlonmcu.models.model_info import MODEL_INFO_CACHE, cached_model_info, get_relay_model_info
+
+RELAY_TEXT = """#[version = "0.0.5"]
+def @main(%input_1: Tensor[(1, 49, 10, 1), int8], output_tensor_names=["Identity"]) -> Tensor[(1, 12), int8] {
+  %input_1
+}
+"""
+
+
+def test_models_info_relay_cached(tmp_path):
+    set_cache_dir(tmp_path)
+    try:
+        info = get_relay_model_info(RELAY_TEXT)
+        assert [(t.name, t.shape, t.dtype) for t in info.in_tensors] == [("input_1", (1, 49, 10, 1), "int8")]
+        assert [(t.name, t.shape, t.dtype) for t in info.out_tensors] == [("Identity", (1, 12), "int8")]
+        assert len(list(tmp_path.glob("model_info/relay_*.pkl"))) == 1
+        # Modifications by callers do not affect the cache
+        info.in_tensors[0].name = "foo"
+        with mock.patch.object(model_info.RelayModelInfo, "__init__", side_effect=AssertionError("parsed")):
+            assert get_relay_model_info(RELAY_TEXT).in_tensors[0].name == "input_1"
+            MODEL_INFO_CACHE.clear()  # Only on disk
+            assert get_relay_model_info(RELAY_TEXT).in_tensors[0].name == "input_1"
+    finally:
+        set_cache_dir(None)
+        MODEL_INFO_CACHE.clear()
+
+
+def test_models_info_cache_corrupt(tmp_path):
+    set_cache_dir(tmp_path)
+    try:
+        (tmp_path / "model_info").mkdir()
+        (tmp_path / "model_info" / f"foo_abc_v{MODEL_INFO_CACHE.version}.pkl").write_text("invalid")
+        func = mock.Mock(return_value=[1, 2, 3])
+        assert cached_model_info("foo", "abc", func) == [1, 2, 3]
+        assert cached_model_info("foo", "abc", func) == [1, 2, 3]
+        func.assert_called_once()
+    finally:
+        set_cache_dir(None)
+        MODEL_INFO_CACHE.clear()
@@ -0,0 +1,65 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import io
+
+import pytest
+
+from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.session.postprocess.dump import count_dump_instructions
+
+DUMP = """
+generic_mlonmcu:\tfile format elf32-littleriscv
+
+Disassembly of section .text:
+
+00000000 <main>:
+       0: 13 01 01 ff  \taddi\tsp, sp, -0x10
+       4: 23 26 11 00  \tsw\tra, 0xc(sp)
+       8: 8b 23 25 00  \tcv.lh\tt2, (a0), 2
+       c: 8b 23 25 00  \tcv.lh\tt2, 2(a0)
+      10: 67 80 00 00  \tret
+
+00000014 <foo>:
+      14: 13 01 01 ff  \taddi\tsp, sp, -0x10
+      18: 0b 05 05 00  \tseal5.cv.lh\tt2, a1(a0)
+      1c: 13 01 01 01  \taddi\tsp, sp, 0x10
+"""
+
+
+@pytest.mark.parametrize("chunk_size", [None, 3])
+def test_count_dump_instructions(chunk_size):
+    counts, func_counts = count_dump_instructions(io.StringIO(DUMP), per_func=True, chunk_size=chunk_size)
+    # Instructions without operands are skipped
+    assert counts == {"addi": 3, "sw": 1, "cv.lh_ri_inc": 1, "cv.lh_rr": 2}
+    assert list(counts.keys())[0] == "addi"
+    assert func_counts == {
+        "main": {"addi": 1, "sw": 1, "cv.lh_ri_inc": 1, "cv.lh_rr": 1},
+        "foo": {"addi": 2, "cv.lh_rr": 1},
+    }
+
+
+def test_count_dump_instructions_artifact(tmp_path):
+    path = tmp_path / "generic_mlonmcu.dump"
+    path.write_text(DUMP)
+    artifact = Artifact.from_path("generic_mlonmcu.dump", path, fmt=ArtifactFormat.TEXT)
+    with artifact.open() as handle:
+        counts, func_counts = count_dump_instructions(handle)
+    assert not artifact.loaded
+    assert func_counts is None
+    assert sum(counts.values()) == 7
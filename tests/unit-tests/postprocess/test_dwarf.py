@@ -0,0 +1,64 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import subprocess
+
+import mock
+import pytest
+
+from mlonmcu.cache import set_cache_dir
+from mlonmcu.session.postprocess import dwarf
+from mlonmcu.session.postprocess.dwarf import DWARF_CACHE, analyze_dwarf
+
+SOURCE = """
+int foo(int x) { return x + 1; }
+
+int main(void) { return foo(41); }
+"""
+
+
+@pytest.fixture
+def elf_file(tmp_path):
+    if shutil.which("gcc") is None:
+        pytest.skip("gcc not available")
+    src = tmp_path / "main.c"
+    src.write_text(SOURCE)
+    elf = tmp_path / "main.elf"
+    subprocess.run(["gcc", "-g", "-O0", str(src), "-o", str(elf)], check=True)
+    return elf
+
+
+def test_analyze_dwarf(elf_file, tmp_path):
+    set_cache_dir(tmp_path / "cache")
+    DWARF_CACHE.clear()
+    try:
+        func2pc_df, file2funcs_df, pc2locs_df = analyze_dwarf(elf_file)
+        assert {"foo", "main"} <= set(func2pc_df["func"])
+        funcs = set().union(*file2funcs_df["func_names"])
+        assert {"foo", "main"} <= funcs
+        locs = set().union(*pc2locs_df["locs"])
+        assert any(loc.endswith("main.c:2") for loc in locs)
+        func2pc_df["func"] = None  # Modifications do not affect the cache
+        with mock.patch.object(dwarf, "parse_dwarf", side_effect=AssertionError("parsed")):
+            assert "foo" in set(analyze_dwarf(elf_file)[0]["func"])
+            DWARF_CACHE.clear()  # Only on disk
+            assert "foo" in set(analyze_dwarf(elf_file)[0]["func"])
+    finally:
+        set_cache_dir(None)
+        DWARF_CACHE.clear()
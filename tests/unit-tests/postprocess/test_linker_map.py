@@ -0,0 +1,77 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import subprocess
+
+import pytest
+
+from mlonmcu.session.postprocess.calc_lib_mem_footprints import (
+    LINKER_MAP_CACHE,
+    diff_linker_map_sections,
+    parse_linker_map,
+)
+
+MAIN = "int bar(int x);\nint main(void) { return bar(1); }\n"
+BAR = "int bar(int x) { return x + 1; }\n"
+BAR_NEW = "int baz(int x) { return x * x; }\nint bar(int x) { return baz(x) + 1; }\n"
+
+
+def _link(directory, bar_src):
+    directory.mkdir()
+    (directory / "main.c").write_text(MAIN)
+    (directory / "bar.c").write_text(bar_src)
+    subprocess.run(["gcc", "-c", "main.c", "bar.c"], cwd=directory, check=True)
+    subprocess.run(["ar", "rcs", "libbar.a", "bar.o"], cwd=directory, check=True)
+    subprocess.run(["gcc", "main.o", "libbar.a", "-Wl,-Map=out.map", "-o", "out.elf"], cwd=directory, check=True)
+    return directory / "out.map"
+
+
+@pytest.fixture
+def linker_maps(tmp_path):
+    pytest.importorskip("mapfile_parser")
+    if shutil.which("gcc") is None or shutil.which("ar") is None:
+        pytest.skip("gcc not available")
+    return _link(tmp_path / "baseline", BAR), _link(tmp_path / "new", BAR_NEW)
+
+
+def test_parse_linker_map(linker_maps):
+    baseline_map, _ = linker_maps
+    linker_map = parse_linker_map(baseline_map)
+    bar = [row for row in linker_map["symbols"] if row["symbol"] == "bar"]
+    assert len(bar) == 1
+    assert bar[0]["library"] == "libbar.a"
+    assert bar[0]["object"] == "bar.o"
+    sections = [row for row in linker_map["sections"] if row["object"] == "bar.o" and row["section"] == ".text"]
+    assert len(sections) == 1 and sections[0]["bytes"] > 0
+    linker_map["symbols"].clear()  # Modifications do not affect the cache
+    assert parse_linker_map(baseline_map)["symbols"]
+    LINKER_MAP_CACHE.clear()
+
+
+def test_diff_linker_map(linker_maps):
+    baseline_map, new_map = linker_maps
+    baseline = parse_linker_map(baseline_map)["sections"]
+    new = parse_linker_map(new_map)["sections"]
+    assert len(diff_linker_map_sections(baseline, baseline)) == 0
+    diff_df = diff_linker_map_sections(new, baseline)
+    changed = diff_df[(diff_df["object"] == "bar.o") & (diff_df["section"] == ".text")]
+    assert len(changed) == 1
+    assert changed["delta"].iloc[0] > 0
+    assert changed["delta"].iloc[0] == changed["bytes"].iloc[0] - changed["bytes_baseline"].iloc[0]
+    LINKER_MAP_CACHE.clear()
@@ -0,0 +1,146 @@
+#
+# Copyright (c) 2024 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+
+from mlonmcu.artifact import Artifact, ArtifactFormat
+from mlonmcu.report import Report
+from mlonmcu.session.postprocess.postprocesses import ValidateOutputsPostprocess, ValidateLabelsPostprocess
+from mlonmcu.session.postprocess.validate_metrics import (
+    parse_validate_metrics,
+    parse_classify_metrics,
+    quantize_ref,
+    dequantize,
+)
+
+
+def _gen_outputs(num, shape, dtype="float32", seed=0):
+    rng = np.random.default_rng(seed)
+    ref = rng.random((num, *shape)).astype(dtype)
+    out = ref.copy()
+    out[::2] += rng.random((len(out[::2]), *shape)).astype(dtype) * 0.1  # small errors
+    out[::3] = np.flip(out[::3], axis=-1)  # changed ranking
+    out[1] = ref[1]
+    return out, ref
+
+
+@pytest.mark.parametrize("shape", [(1, 10), (1, 3), (1, 100)])
+def test_validate_metrics_batch(shape):
+    out, ref = _gen_outputs(12, shape)
+    metrics_str = "allclose(atol=0.0,rtol=0.0);allclose(atol=0.05,rtol=0.05);topk(n=1);topk(n=2);mse(thr=0.001);acc"
+    expected = parse_validate_metrics(metrics_str)
+    for o, r in zip(out, ref):
+        for vm in expected:
+            vm.process(o, r)
+    metrics = parse_validate_metrics(metrics_str)
+    for vm in metrics:
+        vm.process_batch(out, ref)
+    assert [vm.get_summary() for vm in metrics] == [vm.get_summary() for vm in expected]
+
+
+def test_validate_metrics_batch_int8():
+    ref = np.random.default_rng(1).integers(-128, 127, size=(8, 1, 10), dtype="int8")
+    out = ref.copy()
+    out[0, 0, 0] = out[0, 0, 0] + 1 if out[0, 0, 0] < 127 else 126
+    out[1, 0, 0] = 0 if abs(int(out[1, 0, 0])) > 5 else 100
+    metrics = parse_validate_metrics("+-1;topk(n=1)")
+    expected = parse_validate_metrics("+-1;topk(n=1)")
+    for vm in metrics:
+        vm.process_batch(out, ref, quant=True)
+    for o, r in zip(out, ref):
+        for vm in expected:
+            vm.process(o, r, quant=True)
+    assert [vm.get_summary() for vm in metrics] == [vm.get_summary() for vm in expected]
+
+
+def test_classify_metrics_batch():
+    out, _ = _gen_outputs(10, (1, 5))
+    labels = np.arange(10) % 5
+    metrics_str = "topk_label(n=1);topk_label(n=2);confusion_matrix"
+    expected = parse_classify_metrics(metrics_str)
+    for o, label in zip(out, labels.tolist()):
+        for cm in expected:
+            cm.process(o, label)
+    metrics = parse_classify_metrics(metrics_str)
+    for cm in metrics:
+        cm.process_batch(out, labels)
+    assert [cm.get_summary() for cm in metrics] == [cm.get_summary() for cm in expected]
+
+
+def test_quantize_ref():
+    quant = [0.5, -1, "int8", None]
+    data = np.array([[0.0, 1.0, -2.0]], dtype="float32")
+    quantized = quantize_ref(quant, data)
+    assert quantized.dtype == np.int8
+    assert quantized.tolist() == [[-1, 1, -5]]
+    assert dequantize([0.5, -1, "float32", [-2.0, 1.0]], quantized).tolist() == data.tolist()
+    with pytest.raises(AssertionError, match="Range"):
+        dequantize([0.5, -1, "float32", [0.0, 1.0]], quantized)
+
+
+def _artifacts(tmp_path, model_info, outputs, outputs_ref):
+    ret = [Artifact("model_info.yml", content=yaml.dump(model_info), fmt=ArtifactFormat.TEXT)]
+    for name, data in [("outputs.npy", outputs), ("outputs_ref.npy", outputs_ref)]:
+        path = tmp_path / name
+        np.save(path, np.array(data, dtype=object), allow_pickle=True)
+        ret.append(Artifact.from_path(name, path, fmt=ArtifactFormat.RAW))
+    return ret
+
+
+def _report():
+    report = Report()
+    report.post_df = pd.DataFrame([{"Postprocesses": []}])
+    return report
+
+
+def test_validate_outputs_multi_output(tmp_path):
+    out0, ref0 = _gen_outputs(4, (1, 10))
+    ref1 = np.arange(24, dtype="int32").reshape(4, 2, 3)
+    out1 = ref1.copy()
+    out1[0, 1, 2] = 42
+    outputs_ref = [{"out0": ref0[i], "out1": ref1[i]} for i in range(4)]
+    outputs = [[out0[i], out1[i]] for i in range(3)]  # index based, one sample missing
+    model_info = {"output_names": ["out0", "out1"]}
+    artifacts = _artifacts(tmp_path, model_info, outputs, outputs_ref)
+    postprocess = ValidateOutputsPostprocess(
+        features=[], config={"validate_outputs.validate_metrics": "allclose(atol=0.0,rtol=0.0)"}
+    )
+    report = _report()
+    postprocess.post_run(report, artifacts)
+    expected = sum(np.array_equal(out0[i], ref0[i]) for i in range(3)) + sum(
+        np.array_equal(out1[i], ref1[i]) for i in range(3)
+    )
+    assert report.post_df["allclose(atol=0.0,rtol=0.0)"][0] == f"{expected}/6 ({int(expected / 6 * 100)}%)"
+
+
+def test_validate_labels(tmp_path):
+    out, _ = _gen_outputs(6, (1, 4))
+    labels = np.argmax(out[:, 0, :], axis=-1)
+    labels[0] = (labels[0] + 1) % 4
+    model_info = {"output_names": ["out"]}
+    artifacts = _artifacts(tmp_path, model_info, [{"out": o} for o in out], [])
+    path = tmp_path / "labels_ref.npy"
+    np.save(path, labels)
+    artifacts.append(Artifact.from_path("labels_ref.npy", path, fmt=ArtifactFormat.RAW))
+    postprocess = ValidateLabelsPostprocess(features=[], config={"validate_labels.classify_metrics": "acc_label"})
+    report = _report()
+    postprocess.post_run(report, artifacts)
+    assert report.post_df["acc_label"][0] == "5/6 (83%)"
@@ -0,0 +1,104 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import subprocess
+
+import pytest
+from elftools.elf.elffile import ELFFile
+
+from mlonmcu.target.elf import (
+    classify_section,
+    get_code_size_from_static_lib,
+    get_elf_tables,
+    get_symbol_sizes,
+    parseElf,
+)
+
+SOURCE = """
+int zeros[100];
+const int table[3] = {1, 2, 3};
+int value = 5;
+
+int foo(int x) { return x + table[x % 3] + zeros[x] + value; }
+
+int main(void) { return foo(1); }
+"""
+
+
+@pytest.fixture
+def build_dir(tmp_path):
+    if shutil.which("gcc") is None or shutil.which("ar") is None:
+        pytest.skip("gcc not available")
+    (tmp_path / "foo.c").write_text(SOURCE)
+    (tmp_path / "a_very_long_object_file_name.c").write_text("int bar(void) { return 2; }\n")
+    subprocess.run(["gcc", "-c", "foo.c", "a_very_long_object_file_name.c"], cwd=tmp_path, check=True)
+    subprocess.run(["gcc", "foo.o", "-o", "foo.elf"], cwd=tmp_path, check=True)
+    subprocess.run(["ar", "rcs", "libfoo.a", "foo.o", "a_very_long_object_file_name.o"], cwd=tmp_path, check=True)
+    return tmp_path
+
+
+@pytest.mark.parametrize("name", ["foo.o", "foo.elf"])
+def test_elf_tables(build_dir, name):
+    path = build_dir / name
+    tables = get_elf_tables(path)
+    with open(path, "rb") as handle:
+        elf = ELFFile(handle)
+        sections = [(section.name, section.data_size) for section in elf.iter_sections()]
+        symbols = [
+            (symbol.name, symbol["st_info"]["type"], symbol["st_size"])
+            for symbol in elf.get_section_by_name(".symtab").iter_symbols()
+        ]
+        values = {
+            symbol.name: symbol["st_value"]
+            for symbol in elf.get_section_by_name(".symtab").iter_symbols()
+            if symbol.name and symbol["st_info"]["bind"] != "STB_LOCAL"
+        }
+    assert [(name, size) for name, _, _, size in tables["sections"]] == sections
+    assert [(name, ty, size) for name, ty, _, size, _ in tables["symbols"]] == symbols
+    assert tables["values"] == values
+
+
+def test_elf_static_sizes(build_dir):
+    sizes = parseElf(build_dir / "foo.elf")
+    assert sizes["rom_code"] > 0
+    assert sizes["rom_rodata"] >= 12
+    assert sizes["ram_zdata"] >= 400
+    symbols = {sym["symbol"]: sym for sym in get_symbol_sizes(build_dir / "foo.elf")}
+    assert symbols["zeros"]["bytes"] == 400
+    assert symbols["zeros"]["category"] == "ram_zdata"
+    assert symbols["table"]["category"] == "rom_rodata"
+    assert symbols["foo"]["type"] == "STT_FUNC"
+    assert symbols["foo"]["category"] == "rom_code"
+
+
+def test_elf_code_size_static_lib(build_dir):
+    foo_size = get_code_size_from_static_lib(build_dir / "foo.o")
+    bar_size = get_code_size_from_static_lib(build_dir / "a_very_long_object_file_name.o")
+    assert foo_size > 0 and bar_size > 0
+    assert get_code_size_from_static_lib(build_dir / "libfoo.a") == foo_size + bar_size
+
+
+def test_elf_classify_section():
+    assert classify_section(".text.foo") == "rom_code"
+    assert classify_section(".srodata.cst4") == "rom_rodata"
+    assert classify_section(".sdata") == "ram_data"
+    assert classify_section(".eh_frame") == "rom_misc"
+    assert classify_section(".sbss") == "ram_zdata"
+    assert classify_section(".debug_info") is None
+    assert classify_section(".foo") == "unknown"
@@ -0,0 +1,97 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import os
+import concurrent.futures
+
+from mlonmcu.target.riscv.etiss import EtissTarget
+
+CONFIG = {
+    "etiss.src_dir": "/etiss",
+    "etiss.install_dir": "/etiss/install",
+    "etiss.script": "/etiss/install/bin/run_helper.sh",
+    "riscv_gcc_rv32.install_dir": "/riscv",
+    "riscv_gcc_rv32.name": "riscv32-unknown-elf",
+    "riscv_gcc_rv32.variant": "default",
+}
+
+
+def test_etiss_write_ini(tmp_path):
+    target = EtissTarget(config=CONFIG)
+    ini_file = tmp_path / "custom.ini"
+    content = target.write_ini(ini_file, override={})
+    assert ini_file.read_text() == content
+    assert "[IntConfigurations]" in content
+    assert "arch.cpu=RV32IMACFD\n" in content
+    assert target.render_ini(override={}) is content  # reused
+    mtime = ini_file.stat().st_mtime_ns
+    os.utime(ini_file, ns=(mtime - 10**9, mtime - 10**9))
+    target.write_ini(ini_file, override={})
+    assert ini_file.stat().st_mtime_ns == mtime - 10**9  # unchanged file is not rewritten
+    content = target.write_ini(ini_file, override={"vp.elf_file": "foo.elf"})
+    assert "vp.elf_file=foo.elf\n" in ini_file.read_text()
+    target.config["jit"] = "TCC"
+    assert "jit.type=TCCJIT\n" in target.render_ini(override={})
+
+
+def test_jit_timings(tmp_path):
+    from mlonmcu.cache import set_cache_dir
+    from mlonmcu.target.riscv.etiss import JitTimings
+
+    for cache_dir in [None, tmp_path]:
+        set_cache_dir(cache_dir)
+        timings = JitTimings()
+        # Untested candidates are tried first
+        assert timings.select("foo", ["TCC", "GCC"]) == "TCC"
+        timings.record("foo", "TCC", 2.0)
+        assert timings.select("foo", ["TCC", "GCC"]) == "GCC"
+        timings.record("foo", "GCC", 1.0)
+        timings.record("foo", "GCC", 3.0)
+        timings.record("foo", "GCC", 3.5)
+        assert timings.select("foo", ["TCC", "GCC"]) == "TCC"
+        assert timings.select("bar", ["TCC", "GCC"]) == "TCC"
+    assert (tmp_path / "etiss_jit" / "foo.json").is_file()
+    set_cache_dir(None)
+
+
+def test_jit_timings_concurrent(tmp_path):
+    from mlonmcu.cache import set_cache_dir
+    from mlonmcu.target.riscv.etiss import JitTimings
+
+    set_cache_dir(tmp_path)
+    timings = JitTimings()
+    jits = ["TCC", "GCC", "LLVM", "FOO"]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda jit: [timings.record("foo", jit, 1.0) for _ in range(20)], jits))
+    data = timings.get("foo")
+    assert all(len(data[jit]) == 5 for jit in jits)  # No lost updates
+    assert [path.name for path in (tmp_path / "etiss_jit").iterdir()] == ["foo.json"]  # No leftover temp files
+    set_cache_dir(None)
+
+
+def test_etiss_auto_jit(tmp_path):
+    elf = tmp_path / "foo.elf"
+    elf.write_bytes(b"\x7fELF")
+    target = EtissTarget(config={**CONFIG, "etiss.jit": "auto", "etiss.jit_candidates": "GCC,TCC"})
+    assert target.get_available_jits() == ["GCC", "TCC"]
+    jit = target.resolve_jit(elf)
+    assert jit == "GCC"
+    content = target.render_ini(override={"jit.type": f"{jit}JIT"})
+    assert "jit.type=GCCJIT\n" in content
+    assert "jit.gcc.cleanup=true\n" in content
+    assert "jit.type" not in target.render_ini(override={})
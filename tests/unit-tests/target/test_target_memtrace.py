@@ -0,0 +1,61 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import shutil
+import subprocess
+
+import pytest
+
+from mlonmcu.target.memtrace import MemRange, analyze_mem_trace, get_ram_metrics
+
+TRACE = """100;r;1000;4
+200;w;7ff0;4
+300;w;7ffc;4
+400;r;4010;1
+500;w;4100;8
+600;r;ffff0000;4
+"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 1 << 20])
+def test_analyze_mem_trace(tmp_path, chunk_size):
+    trace_file = tmp_path / "dBusAccess.csv"
+    trace_file.write_text(TRACE)
+    stack = MemRange("stack", 0x4000 + 0x4000 - 0x1000, 0x8000)
+    heap = MemRange("heap", 0x4000, 0x7000)
+    analyze_mem_trace(trace_file, [stack, heap], chunk_size=chunk_size)
+    assert stack.usage == 0x8000 - 0x7FF0
+    assert stack.num_writes == 2 and stack.num_reads == 0
+    assert heap.usage == 0x4108 - 0x4010
+    assert heap.num_writes == 1 and heap.num_reads == 1
+    assert MemRange("unused", 0, 0x100).usage == 0
+
+
+def test_get_ram_metrics(tmp_path):
+    if shutil.which("gcc") is None:
+        pytest.skip("gcc not available")
+    (tmp_path / "foo.c").write_text("int zeros[100];\nint value = 5;\nint main(void) { return zeros[value]; }\n")
+    ldflags = ["-Wl,--defsym=__stack_size=0x1000", "-Wl,--defsym=_heap_start=0x4000"]
+    subprocess.run(["gcc", "foo.c", "-o", "foo.elf", *ldflags], cwd=tmp_path, check=True)
+    trace_file = tmp_path / "dBusAccess.csv"
+    trace_file.write_text(TRACE)
+    data = get_ram_metrics(tmp_path / "foo.elf", 0x4000, 0x4000, trace_file=trace_file)
+    assert data["ram_zdata"] >= 400
+    assert data["ram_stack"] == 0x10
+    assert data["ram_heap"] == 0xF8
+    assert "ram_stack" not in get_ram_metrics(tmp_path / "foo.elf", 0x4000, 0x4000)
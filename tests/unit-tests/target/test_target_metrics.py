@@ -0,0 +1,62 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import pickle
+
+import numpy as np
+
+from mlonmcu.target.metrics import Metrics
+
+
+def _get_metrics():
+    metrics = Metrics()
+    metrics.add("Cycles", 1234)
+    metrics.add("Runtime [s]", 0.5, True)
+    metrics.add("Validation", True)
+    metrics.add("Comment", "hello")
+    metrics.add("Count", np.int64(42))
+    metrics.add("Missing", None, prepend=True)
+    return metrics
+
+
+def test_metrics_json():
+    metrics = _get_metrics()
+    restored = Metrics.from_json(metrics.to_json())
+    assert restored.get_data() == {"Missing": None, "Cycles": 1234, "Validation": True, "Comment": "hello", "Count": 42}
+    assert restored.get_data(include_optional=True)["Runtime [s]"] == 0.5
+    assert isinstance(restored.get("Cycles"), int)
+    assert isinstance(restored.get("Runtime [s]"), float)
+
+
+def test_metrics_bytes():
+    metrics = _get_metrics()
+    restored = Metrics.from_bytes(metrics.to_bytes())
+    assert restored.get_data(include_optional=True) == metrics.get_data(include_optional=True)
+    restored = pickle.loads(pickle.dumps(metrics))
+    assert restored.get_data(include_optional=True) == metrics.get_data(include_optional=True)
+
+
+def test_metrics_csv():
+    metrics = Metrics()
+    metrics.add("Cycles", 1234)
+    metrics.add("Runtime [s]", 0.5, True)
+    restored = Metrics.from_csv(metrics.to_csv(include_optional=True))
+    assert restored.get_data(include_optional=True) == {"Cycles": 1234, "Runtime [s]": 0.5}
+    artifact = metrics.to_artifact("run_metrics.csv")
+    assert artifact.data is metrics
+    assert Metrics.from_csv(artifact.content).get_data() == {"Cycles": 1234}
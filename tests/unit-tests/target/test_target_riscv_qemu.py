@@ -0,0 +1,97 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import time
+import concurrent.futures
+
+import mock
+
+from mlonmcu.feature.features import REGISTERED_FEATURES
+from mlonmcu.target.riscv.riscv_qemu import RiscvQemuTarget, SNAPSHOT_TAG
+
+CONFIG = {
+    "riscv32_qemu.exe": "/qemu/bin/qemu-system-riscv32",
+    "riscv_gcc_rv32.install_dir": "/riscv",
+    "riscv_gcc_rv32.name": "riscv32-unknown-elf",
+    "riscv_gcc_rv32.variant": "default",
+}
+
+
+def test_snapshot_feature():
+    feature = REGISTERED_FEATURES["snapshot"](config={"snapshot.enabled": True, "snapshot.marker": "mlif_run"})
+    config = {}
+    feature.add_target_config("riscv_qemu", config)
+    assert config == {"riscv_qemu.snapshot_enable": True, "riscv_qemu.snapshot_marker": "mlif_run"}
+
+
+@mock.patch("mlonmcu.target.riscv.riscv_qemu.get_elf_tables")
+@mock.patch("mlonmcu.target.riscv.riscv_qemu.execute")
+def test_riscv_qemu_snapshot_restore(execute_mock, elf_tables_mock, tmp_path):
+    elf = tmp_path / "foo.elf"
+    elf.write_bytes(b"\x7fELF")
+    run_dir = tmp_path / "run"
+    run_dir.mkdir()
+    snapshot_dir = tmp_path / "snapshots"
+    target = RiscvQemuTarget(
+        config={**CONFIG, "riscv_qemu.snapshot_enable": True, "riscv_qemu.snapshot_dir": snapshot_dir}
+    )
+    snapshot_file = target.get_snapshot_file(elf, run_dir)
+    assert snapshot_file.parent == snapshot_dir
+    snapshot_dir.mkdir()
+    snapshot_file.write_bytes(b"QFI")  # existing snapshot is reused
+
+    elf_tables_mock.return_value = {"values": {"main": 0x100}}
+    target.exec(elf, cwd=run_dir)
+    qemu_args = execute_mock.call_args[0]
+    assert qemu_args[-2:] == ("-loadvm", SNAPSHOT_TAG)
+    assert (run_dir / "snapshot.qcow2").read_bytes() == b"QFI"
+
+    # Marker not found: plain execution
+    elf_tables_mock.return_value = {"values": {}}
+    target.exec(elf, cwd=run_dir)
+    assert "-loadvm" not in execute_mock.call_args[0]
+
+
+@mock.patch("mlonmcu.target.riscv.riscv_qemu.get_elf_tables")
+def test_riscv_qemu_snapshot_shared(elf_tables_mock, tmp_path):
+    elf = tmp_path / "foo.elf"
+    elf.write_bytes(b"\x7fELF")
+    elf_tables_mock.return_value = {"values": {"main": 0x100}}
+    snapshot_dir = tmp_path / "snapshots"
+    target = RiscvQemuTarget(
+        config={**CONFIG, "riscv_qemu.snapshot_enable": True, "riscv_qemu.snapshot_dir": snapshot_dir}
+    )
+
+    def create_snapshot(program, dest):
+        time.sleep(0.1)
+        dest.write_bytes(b"QFI")
+
+    run_dirs = [tmp_path / f"run{i}" for i in range(4)]
+    for run_dir in run_dirs:
+        run_dir.mkdir()
+    with mock.patch.object(target, "create_snapshot", side_effect=create_snapshot) as create_mock:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            images = list(executor.map(lambda run_dir: target.prepare_snapshot(elf, run_dir), run_dirs))
+    assert create_mock.call_count == 1  # Other runs wait and reuse the snapshot
+    assert all(image.read_bytes() == b"QFI" for image in images)
+
+    # Snapshots are skipped with a warning if a timeout is used
+    target.config["timeout_sec"] = 10
+    with mock.patch("mlonmcu.target.riscv.riscv_qemu.logger") as logger_mock:
+        assert target.prepare_snapshot(elf, run_dirs[0]) is None
+    logger_mock.warning.assert_called_once()
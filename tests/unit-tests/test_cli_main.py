@@ -0,0 +1,106 @@
+#
+# Copyright (c) 2022 TUM Department of Electrical and Computer Engineering.
+#
+# This file is part of MLonMCU.
+# See https://github.com/tum-ei-eda/mlonmcu.git for further info.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import sys
+import types
+import argparse
+import subprocess
+
+import mock
+import pytest
+
+from mlonmcu.cli.main import find_subcommand
+
+HEAVY_MODULES = ["pandas", "numpy", "distutils", "mlonmcu.session.run", "mlonmcu.platform", "mlonmcu.models"]
+
+
+def get_imported_modules(code):
+    code = f"import sys\n{code}\nprint(' '.join(sys.modules.keys()))"
+    out = subprocess.check_output([sys.executable, "-c", code], text=True)
+    return set(out.strip().splitlines()[-1].split(" "))
+
+
+def test_find_subcommand():
+    assert find_subcommand([]) is None
+    assert find_subcommand(["--help"]) is None
+    assert find_subcommand(["-v", "flow", "run", "resnet"]) == "flow"
+    assert find_subcommand(["env"]) == "env"
+    assert find_subcommand(["unknown", "env"]) is None
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "import mlonmcu.cli.main",
+        "from mlonmcu.cli.main import main\nmain(['env'])",
+    ],
+)
+def test_cli_import_is_lightweight(code):
+    modules = get_imported_modules(code)
+    for name in HEAVY_MODULES:
+        assert name not in modules, f"{name} imported by: {code}"
+
+
+def test_component_registries_are_lazy():
+    code = (
+        "from mlonmcu.target import get_targets\n"
+        "from mlonmcu.platform import get_platforms\n"
+        "from mlonmcu.flow import SUPPORTED_BACKENDS\n"
+        "from mlonmcu.models import SUPPORTED_FRONTENDS\n"
+        "assert 'spike' in get_targets() and 'mlif' in get_platforms()\n"
+        "assert 'tvmaot' in SUPPORTED_BACKENDS and 'tflite' in SUPPORTED_FRONTENDS\n"
+        "get_targets()['spike']"
+    )
+    modules = get_imported_modules(code)
+    assert "mlonmcu.target.riscv.spike" in modules
+    for name in [
+        "mlonmcu.target.riscv.etiss",
+        "mlonmcu.target.ssh_target",
+        "mlonmcu.platform.mlif.mlif",
+        "mlonmcu.flow.tvm.backend.tvmaot",
+        "mlonmcu.models.frontend",
+    ]:
+        assert name not in modules, f"{name} imported by registry lookup"
+
+
+def test_cli_compile_resume(tmp_path, fake_context):
+    from mlonmcu.cli import compile as compile_cmd
+    from mlonmcu.context.context import MlonMcuContext
+    from mlonmcu.session.run import RunInitializer
+
+    runs_dir = tmp_path / "sessions" / "3" / "runs"
+    for idx in [0, 2]:
+        (runs_dir / str(idx)).mkdir(parents=True)
+        initializer = RunInitializer(model_name="foo", backend_name="tvmaot", target_name="etiss")
+        initializer.save(runs_dir / str(idx) / "initializer.yml")
+    fake_context.environment.paths = {"temp": mock.Mock(path=tmp_path)}
+    fake_context.environment.vars = {"session.executor": "popen_pool"}
+    fake_context.sessions = []
+    fake_context.get_session = types.MethodType(MlonMcuContext.get_session, fake_context)
+    fake_context.resume_session = types.MethodType(MlonMcuContext.resume_session, fake_context)
+
+    parser = argparse.ArgumentParser()
+    compile_cmd.get_parser(parser.add_subparsers())
+    args = parser.parse_args(["compile", "_", "--resume", "3", "-b", "tvmrt"])
+    compile_cmd.handle(args, ctx=fake_context)
+
+    session = fake_context.sessions[-1]
+    assert session.resumed
+    assert [run.idx for run in session.runs] == [0, 2]
+    assert all(run.frozen for run in session.runs)
+    assert all(run.backend_name == "tvmaot" and run.target_name == "etiss" for run in session.runs)
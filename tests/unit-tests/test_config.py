@@ -16,3 +16,49 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+"""Unit tests for the config utilities."""
+
+from mlonmcu.config import is_path_config, get_path_configs, ConfigView, resolve_required_config
+from mlonmcu.setup.cache import TaskCache
+
+
+def test_config_path_configs():
+    assert is_path_config("mlif.src_dir")
+    assert is_path_config("etiss.exe")
+    assert is_path_config("input_data_path")
+    assert not is_path_config("mlif.toolchain")
+    assert not is_path_config("etiss.jit")
+
+    class Component:
+        DEFAULTS = {"build_dir": None, "optimize": "s"}
+        REQUIRED = {"foo.install_dir"}
+        OPTIONAL = {"foo.version"}
+        PATH_CONFIGS = {"bar.template"}
+
+    assert get_path_configs(Component) == {"build_dir", "foo.install_dir", "bar.template"}
+
+
+def test_config_view():
+    base = {"foo.a": 1, "foo.b": 2}
+    view = ConfigView(base)
+    assert dict(view) == base
+    view["foo.c"] = 3
+    view["foo.a"] = 0
+    del view["foo.b"]
+    assert "foo.b" not in view
+    assert dict(view) == {"foo.a": 0, "foo.c": 3}
+    assert len(view) == 2
+    assert base == {"foo.a": 1, "foo.b": 2}
+
+
+def test_config_resolve_memoized():
+    cache = TaskCache()
+    cache["foo.install_dir", frozenset()] = "/a"
+    ret = resolve_required_config({"foo.install_dir"}, optional={"bar.exe"}, config={}, cache=cache)
+    assert ret == {"foo.install_dir": "/a"}
+    ret["foo.install_dir"] = "/modified"  # Must not affect memoized result
+    assert resolve_required_config({"foo.install_dir"}, config={}, cache=cache) == {"foo.install_dir": "/a"}
+    cache["foo.install_dir", frozenset()] = "/b"
+    assert resolve_required_config({"foo.install_dir"}, config={}, cache=cache) == {"foo.install_dir": "/b"}
+    ret = resolve_required_config({"foo.install_dir"}, config={"foo.install_dir": "/c"}, cache=cache)
+    assert ret == {"foo.install_dir": "/c"}
@@ -16,3 +16,509 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+"""Unit tests for the session submodule."""
+import io
+import pickle
+import time
+import tarfile
+import threading
+import concurrent.futures
+
+import mock
+import yaml
+import pytest
+
+from mlonmcu.artifact import Artifact, ArtifactFormat, ArtifactList
+from mlonmcu.models.model import Model, Program
+from mlonmcu.session.run import ArchivedRun, Run, RunInitializer, RunResult, RunStage
+from mlonmcu.report import Report
+from mlonmcu.session.schedule import (
+    PopenPoolSessionExecutor,
+    RunHandle,
+    SessionScheduler,
+    _postprocess_pickable,
+    parse_stage_resources,
+)
+from mlonmcu.target.metrics import Metrics
+from mlonmcu.session.store import ContentStore
+from mlonmcu.session.worker import PopenWorker, WorkerError
+
+
+def _create_archive(files):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode="w") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+def test_content_store(tmp_path):
+    store = ContentStore(tmp_path / "store")
+    first = tmp_path / "a.txt"
+    second = tmp_path / "b.txt"
+    first.write_text("foo")
+    second.write_text("foo")
+    digest = store.add(first)
+    assert store.add(second) == digest
+    assert store.lookup(digest).is_file()
+    assert first.stat().st_ino == second.stat().st_ino
+    assert second.read_text() == "foo"
+
+
+def _archive_run(tmp_path, policy):
+    run = Run(idx=policy, config={"run.export_archives": policy})
+    run.init_directory(parent=tmp_path)
+    raw = _create_archive({"codegen/foo.c": b"int x;", "codegen/bar.c": b"int y;"})
+    artifact = Artifact("mlf.tar", raw=raw, fmt=ArtifactFormat.ARCHIVE)
+    run.artifacts_per_stage[RunStage.BUILD] = {"default": ArtifactList([artifact])}
+    run.export_stage(RunStage.BUILD)
+    return run
+
+
+def test_run_export_archives(tmp_path):
+    run = _archive_run(tmp_path, "both")
+    assert (run.dir / "mlf.tar").is_file()
+    assert (run.dir / "codegen" / "foo.c").is_file()
+    (run.dir / "codegen" / "foo.c").unlink()
+    run.export_stage(RunStage.BUILD)
+    assert not (run.dir / "codegen" / "foo.c").is_file()  # Not extracted twice
+    run = _archive_run(tmp_path, "tar")
+    assert (run.dir / "mlf.tar").is_file()
+    assert not (run.dir / "codegen").is_dir()
+    run = _archive_run(tmp_path, "extracted")
+    assert not (run.dir / "mlf.tar").is_file()
+    assert (run.dir / "codegen" / "bar.c").is_file()
+    run = _archive_run(tmp_path, "none")
+    assert not (run.dir / "mlf.tar").is_file()
+    assert not (run.dir / "codegen").is_dir()
+
+
+def test_run_export_dedup(tmp_path):
+    store_dir = tmp_path / "store"
+    store_dir.mkdir()
+    runs = []
+    for idx in range(2):
+        run = Run(idx=idx, config={"run.dedup_exports": True, "run.export_store_dir": store_dir})
+        run.init_directory(parent=tmp_path)
+        artifact = Artifact("out.log", content="Hello World!", fmt=ArtifactFormat.TEXT)
+        run.artifacts_per_stage[RunStage.RUN] = {"default": ArtifactList([artifact])}
+        run.export_stage(RunStage.RUN)
+        runs.append(run)
+    first, second = [run.dir / "out.log" for run in runs]
+    assert first.stat().st_ino == second.stat().st_ino
+    # Re-exporting a changed artifact must not affect other runs
+    artifact = Artifact("out.log", content="Changed", fmt=ArtifactFormat.TEXT)
+    artifact.export(runs[0].dir, skip_exported=False)
+    assert first.read_text() == "Changed"
+    assert second.read_text() == "Hello World!"
+
+
+def test_run_export_spills_large_artifacts(tmp_path):
+    run = Run(idx=0)
+    run.init_directory(parent=tmp_path)
+    small = Artifact("small.log", content="Hello", fmt=ArtifactFormat.TEXT)
+    large = Artifact("large.bin", raw=b"\x00" * 1000, fmt=ArtifactFormat.RAW)
+    archive = Artifact("mlf.tar", raw=_create_archive({"codegen/foo.c": b"int x;"}), fmt=ArtifactFormat.MLF)
+    run.artifacts_per_stage[RunStage.BUILD] = {"default": ArtifactList([small, large, archive])}
+    with mock.patch("mlonmcu.artifact.SPILL_THRESHOLD", 500):
+        run.export_stage(RunStage.BUILD)
+    assert not small.lazy
+    assert large.lazy and not large.loaded and large.path == run.dir / "large.bin"
+    assert archive.lazy and archive.path == run.dir / "mlf.tar"
+    assert (run.dir / "codegen" / "foo.c").is_file()
+    assert len(pickle.dumps(large)) < 1000
+    assert large.raw == b"\x00" * 1000
+
+
+def test_run_export_store_dir(tmp_path):
+    run = Run(idx=0)
+    run.init_directory(parent=tmp_path)
+    assert run.export_store_dir == run.dir / ".store"  # not part of a session
+    runs_dir = tmp_path / "session" / "runs"
+    runs_dir.mkdir(parents=True)
+    run = Run(idx=0)
+    run.init_directory(parent=runs_dir)
+    assert run.export_store_dir == tmp_path / "session" / "store"
+
+
+def test_run_export_stage_skip_exported(tmp_path):
+    run = Run(idx=0)
+    run.init_directory(parent=tmp_path)
+    artifact = Artifact("out.log", content="Hello World!", fmt=ArtifactFormat.TEXT)
+    run.artifacts_per_stage[RunStage.RUN] = {"default": ArtifactList([artifact])}
+    with mock.patch.object(run, "export_sub") as export_mock:
+        run.export_stage(RunStage.RUN, skip_exported=True)
+        run.export_stage(RunStage.RUN, skip_exported=True)
+        assert export_mock.call_count == 1
+        run.export_stage(RunStage.RUN)
+        assert export_mock.call_count == 2
+
+
+def test_run_configs_omit_paths(tmp_path):
+    from mlonmcu.target.riscv.spike import SpikeTarget
+
+    config = {
+        "spike.exe": "/env/spike/spike",
+        "spike.pk": "/env/pk/pk",
+        "spike.pk_rv32": "/env/pk32/pk",
+        "spike.pk_rv64": "/env/pk64/pk",
+        "riscv_gcc_rv32.install_dir": "/env/gcc",
+        "riscv_gcc_rv32.name": "riscv32-unknown-elf",
+        "riscv_gcc_rv32.variant": "default",
+    }
+    run = Run(idx=0, model=Model("foo", tmp_path / "foo.tflite"), target=SpikeTarget(config=config), config=config)
+    configs = run.get_all_configs(omit_paths=True)
+    assert configs["riscv_gcc_rv32.name"] == "riscv32-unknown-elf"
+    assert configs["spike.xlen"] == 32
+    assert not any(isinstance(value, str) and value.startswith("/env") for value in configs.values())
+    assert run.get_all_configs()["spike.pk_rv32"] == "/env/pk32/pk"
+
+
+def test_run_combined_metrics_incremental():
+    run = Run(idx=0)
+    build_metrics = Metrics()
+    build_metrics.add("Build Time", 1.0)
+    build_artifact = build_metrics.to_artifact("build_metrics.csv")
+    run.artifacts_per_stage[RunStage.BUILD] = {"default": ArtifactList([build_artifact])}
+    run.sub_parents[(RunStage.BUILD, "default")] = (None, None)
+    build_ret = run.get_combined_metrics(RunStage.BUILD)
+    assert run.get_combined_metrics(RunStage.BUILD) is build_ret
+    run_metrics = Metrics()
+    run_metrics.add("Cycles", 100)
+    run.artifacts_per_stage[RunStage.RUN] = {"default": ArtifactList([run_metrics.to_artifact("run_metrics.csv")])}
+    run.sub_parents[(RunStage.RUN, "default")] = (RunStage.BUILD, "default")
+    subs, metrics_by_sub = run.get_combined_metrics(RunStage.RUN)
+    assert run.get_combined_metrics(RunStage.BUILD) is build_ret  # earlier stages are not recomputed
+    assert list(subs) == ["default"]
+    assert metrics_by_sub["default"].get_data() == {"Cycles": 100, "Build Time": 1.0}
+    # Changed metrics of an earlier stage are picked up
+    build_metrics.add("Build Time", 2.0, overwrite=True)
+    run.artifacts_per_stage[RunStage.BUILD]["default"] = ArtifactList([build_metrics.to_artifact("build_metrics.csv")])
+    _, metrics_by_sub = run.get_combined_metrics(RunStage.RUN)
+    assert metrics_by_sub["default"].get("Build Time") == 2.0
+
+
+def test_run_result_file(tmp_path):
+    run = Run(idx=3, model=Model("foo", tmp_path / "foo.tflite"))
+    run.init_directory(parent=tmp_path)
+    metrics = Metrics()
+    metrics.add("Total Cycles", 1000)
+    metrics.add("Runtime [s]", 0.5)
+    run.artifacts_per_stage[RunStage.RUN] = {"default": ArtifactList([metrics.to_artifact("run_metrics.csv")])}
+    run.sub_parents[(RunStage.RUN, "default")] = (None, None)
+    run.failing = True
+    run.failed_stage = "POSTPROCESS"
+    run.reason = RuntimeError("Oops")
+    result = run.result()
+    result.save(tmp_path / "result.json")
+    restored = RunResult.from_file(tmp_path / "result.json")
+    assert restored.idx == 3
+    assert restored.dir == run.dir
+    assert restored.failing
+    assert restored.failed_stage == "POSTPROCESS"
+    assert restored.reason == "Oops"
+    assert restored.metrics["RUN"]["default"]["data"] == {"Total Cycles": 1000, "Runtime [s]": 0.5}
+    assert [artifact["name"] for artifact in restored.artifacts] == ["run_metrics.csv"]
+    df = restored.report.df
+    assert df["Run"].tolist() == [3]
+    assert df["Total Cycles"].tolist() == [1000]
+    assert df["Failing"].tolist() == [True]
+
+
+def test_popen_worker():
+    worker = PopenWorker()
+    try:
+        assert worker.request("ping") is None
+        assert worker.rss > 0
+        with pytest.raises(WorkerError):
+            worker.request("unknown")
+        assert worker.alive  # Errors are reported without killing the worker
+        worker.process.kill()
+        with pytest.raises(WorkerError):
+            worker.request("ping")
+        assert not worker.alive
+    finally:
+        worker.close()
+
+
+def test_popen_pool_isolates_crashing_run():
+    def fake_process_batch(runs, **kwargs):
+        if any(run.idx == 1 for run in runs):
+            raise WorkerError("Worker process died")
+        return [f"res{run.idx}" for run in runs]
+
+    runs = [RunInitializer(idx=idx) for idx in range(3)]
+    executor = PopenPoolSessionExecutor(max_workers=1)
+    try:
+        with mock.patch.object(executor, "_process_batch", side_effect=fake_process_batch) as batch_mock:
+            assert executor._process(runs) == ["res0", None, "res2"]
+            assert batch_mock.call_count == 4  # batch + one call per run
+            with pytest.raises(WorkerError):
+                executor._process(runs[1:2])
+    finally:
+        executor.shutdown()
+
+
+def test_scheduler_executor_parallel_jobs():
+    scheduler = SessionScheduler([RunInitializer(idx=0)], RunStage.RUN, executor="rpc", parallel_jobs=4)
+    _, kwargs = scheduler._handle_executor("rpc")
+    assert kwargs["parallel_jobs"] == 4
+    with pytest.raises(AssertionError):
+        SessionScheduler([RunInitializer(idx=0)], RunStage.RUN, executor="popen_pool", parallel_jobs=4)
+
+
+class FlakyExecutor(concurrent.futures.ThreadPoolExecutor):
+    """Fails run 1 with an exception and run 2 at the RUN stage on the first attempt."""
+
+    attempts = {}
+
+    def _process(self, runs):
+        rets = []
+        for run in runs:
+            attempt = self.attempts.get(run.idx, 0)
+            self.attempts[run.idx] = attempt + 1
+            if run.idx == 1 and attempt == 0:
+                raise RuntimeError("Worker crashed")
+            res = RunResult.from_dict(
+                {
+                    "idx": None,
+                    "dir": None,
+                    "failing": run.idx == 2 and attempt == 0,
+                    "failed_stage": "RUN" if run.idx == 2 and attempt == 0 else None,
+                    "reason": None,
+                    "report": {"pre": [{"Run": run.idx}], "main": [], "post": []},
+                }
+            )
+            rets.append(res)
+        return rets
+
+    def submit_runs(self, runs, **kwargs):
+        return self.submit(self._process, runs)
+
+
+@pytest.mark.parametrize("stage_limits", [None, "run=1"])
+@pytest.mark.parametrize("retries", [0, 1])
+def test_scheduler_retries(retries, stage_limits):
+    runs = [RunInitializer(idx=idx) for idx in range(3)]
+    scheduler = SessionScheduler(
+        runs, RunStage.RUN, executor="process_pool", retries=retries, stage_limits=stage_limits
+    )
+    scheduler._executor_cls = FlakyExecutor
+    FlakyExecutor.attempts = {}
+    context = mock.Mock()
+    _, results = scheduler.process(context=context)
+    if retries == 0:
+        assert scheduler.num_failures == 2
+        assert scheduler.stage_failures == {None: [1], "RUN": [2]}
+        assert results[1] is None
+        assert results[2].failing
+    else:
+        assert scheduler.num_failures == 0
+        assert FlakyExecutor.attempts == {0: 1, 1: 2, 2: 2}
+        assert all(not res.failing for res in results)
+
+
+def test_run_save_state(tmp_path):
+    run = Run(idx=0, model=Model("foo", tmp_path / "foo.tflite"))
+    run.init_directory(parent=tmp_path)
+    build = Artifact("foo.c", content="int x;", fmt=ArtifactFormat.SOURCE)
+    compile_ = Artifact("foo.elf", raw=b"\x7fELF", fmt=ArtifactFormat.RAW)
+    run.artifacts_per_stage[RunStage.BUILD] = {"default": ArtifactList([build])}
+    run.artifacts_per_stage[RunStage.COMPILE] = {"default": ArtifactList([compile_])}
+    run.sub_parents[(RunStage.BUILD, "default")] = (None, None)
+    run.sub_parents[(RunStage.COMPILE, "default")] = (RunStage.BUILD, "default")
+    run.completed[RunStage.BUILD] = True
+    run.completed[RunStage.COMPILE] = True
+    run.export_stage(RunStage.BUILD)
+    run.export_stage(RunStage.COMPILE)
+    run.save(run.dir / "run.yml")
+
+    restored = ArchivedRun.from_dir(run.dir)
+    assert restored.idx == 0
+    assert restored.completed[RunStage.COMPILE]
+    assert not restored.completed[RunStage.RUN]
+    assert restored.sub_parents[(RunStage.COMPILE, "default")] == (RunStage.BUILD, "default")
+    artifact = restored.artifacts_per_stage[RunStage.COMPILE]["default"][0]
+    assert artifact.lazy and artifact.raw == b"\x7fELF"
+
+    # Stages with missing artifacts are processed again
+    (run.dir / "foo.elf").unlink()
+    restored = Run(idx=0)
+    restored.init_directory(parent=tmp_path)
+    assert restored.restore_state()
+    assert restored.completed[RunStage.BUILD]
+    assert not restored.completed[RunStage.COMPILE]
+    assert RunStage.COMPILE not in restored.artifacts_per_stage
+
+
+def test_run_save_state_plain_config(tmp_path):
+    config = {
+        "foo.values": (1, 2),
+        "foo.dir": tmp_path,
+        "foo.opts": {"bar": [tmp_path, (3,)]},
+        "foo.stage": RunStage.RUN,
+    }
+    run = Run(idx=0, config=config)
+    run.init_directory(parent=tmp_path)
+    run.save(run.dir / "run.yml")
+    with open(run.dir / "run.yml", "r") as f:
+        state = yaml.safe_load(f)
+    assert state["initializer"]["config"] == {
+        "foo.values": [1, 2],
+        "foo.dir": str(tmp_path),
+        "foo.opts": {"bar": [str(tmp_path), [3]]},
+        "foo.stage": int(RunStage.RUN),
+    }
+    assert ArchivedRun.from_file(run.dir / "run.yml").idx == 0
+
+
+def test_run_process_save_state_error(tmp_path):
+    run = Run(idx=0)
+    run.init_directory(parent=tmp_path)
+    with mock.patch.object(Run, "load"), mock.patch.object(Run, "get_report"), mock.patch.object(Run, "export"):
+        with mock.patch.object(Run, "has_stage", return_value=True):
+            with mock.patch.object(Run, "save", side_effect=OSError("disk full")):
+                run.process(start=RunStage.LOAD, until=RunStage.LOAD, export=True)
+    assert run.failing
+    assert run.failed_stage == "LOAD"
+
+
+def test_run_compile_program_detaches_lazy_artifacts(tmp_path):
+    build_dir = tmp_path / "mlif"
+    build_dir.mkdir()
+    (build_dir / "generic_mlonmcu").write_bytes(b"\x7fELF")
+    elf = Artifact("generic_mlonmcu", path=build_dir / "generic_mlonmcu", fmt=ArtifactFormat.BIN, lazy=True)
+    platform = mock.Mock()
+    platform.generate_artifacts.return_value = {"default": [elf]}
+    run = Run(idx=0, model=Program("foo"))
+    run.init_directory(parent=tmp_path)
+    run.completed[RunStage.LOAD] = True
+    with mock.patch.object(Run, "compile_platform", new_callable=mock.PropertyMock, return_value=platform):
+        run.compile()
+    (build_dir / "generic_mlonmcu").unlink()  # e.g. temporary build directory
+    artifact = run.artifacts_per_stage[RunStage.COMPILE]["default"][0]
+    assert artifact.raw == b"\x7fELF"
+
+
+class FakeRun:
+    def __init__(self, idx, target=None):
+        self.idx = idx
+        self.failing = False
+        self.target = mock.Mock() if target else None
+        if target:
+            self.target.name = target
+
+    def has_stage(self, stage):
+        return stage in [RunStage.BUILD, RunStage.COMPILE, RunStage.RUN]
+
+
+class RecordingExecutor(concurrent.futures.ThreadPoolExecutor):
+    def __init__(self, max_workers=None):
+        super().__init__(max_workers)
+        self.lock = threading.Lock()
+        self.started = []
+        self.active = {}
+        self.max_active = {}
+
+    def _process(self, runs, until):
+        with self.lock:
+            self.started.append(until)
+            keys = [until] + [(until, run.target.name) for run in runs if run.target]
+            for key in keys:
+                self.active[key] = self.active.get(key, 0) + 1
+                self.max_active[key] = max(self.max_active.get(key, 0), self.active[key])
+        time.sleep(0.01 if until == RunStage.RUN else 0.002)
+        with self.lock:
+            for key in keys:
+                self.active[key] -= 1
+        report = {"pre": [{"Run": run.idx} for run in runs], "main": [], "post": []}
+        data = {"idx": None, "dir": None, "failing": False, "failed_stage": None, "reason": None, "report": report}
+        return [RunResult.from_dict(data) for _ in runs]
+
+    def submit_runs(self, runs, until=None, **kwargs):
+        return self.submit(self._process, runs, until)
+
+
+def test_scheduler_pipeline():
+    runs = [FakeRun(idx) for idx in range(6)]
+    scheduler = SessionScheduler(
+        runs, RunStage.RUN, per_stage=True, pipeline=True, num_workers=3, stage_limits="run=1"
+    )
+    executor = RecordingExecutor(3)
+    scheduler._executor_cls = lambda **kwargs: executor
+    _, results = scheduler.process(context=mock.Mock())
+    assert scheduler.num_failures == 0
+    assert len([res for res in results if res is not None]) == 6
+    assert executor.started.count(RunStage.RUN) == 6
+    assert executor.max_active[RunStage.RUN] == 1
+    # No barrier: the first run is simulated before all runs are built
+    last_build = len(executor.started) - 1 - executor.started[::-1].index(RunStage.BUILD)
+    assert executor.started.index(RunStage.RUN) < last_build
+
+
+def test_parse_stage_resources():
+    assert parse_stage_resources(None) == {}
+    assert parse_stage_resources("build=2, run:ara=1") == {(RunStage.BUILD, None): 2, (RunStage.RUN, "ara"): 1}
+    assert parse_stage_resources({"compile": "4"}) == {(RunStage.COMPILE, None): 4}
+    with pytest.raises(KeyError):
+        parse_stage_resources("foo=1")
+
+
+@pytest.mark.parametrize("per_stage_pipeline", [False, True])
+def test_scheduler_resource_limits(per_stage_pipeline):
+    runs = [FakeRun(idx, target="ara" if idx % 2 else "spike") for idx in range(8)]
+    scheduler = SessionScheduler(
+        runs,
+        RunStage.RUN,
+        per_stage=True,
+        pipeline=per_stage_pipeline,
+        num_workers=4,
+        stage_limits="run:ara=1",
+        stage_memory="build=1000,run=100,run:spike=400",
+        memory_budget=1000,
+    )
+    executor = RecordingExecutor(4)
+    scheduler._executor_cls = lambda **kwargs: executor
+    _, results = scheduler.process(context=mock.Mock())
+    assert scheduler.num_failures == 0
+    assert len([res for res in results if res is not None]) == 8
+    assert executor.max_active[(RunStage.RUN, "ara")] == 1
+    assert executor.max_active[(RunStage.RUN, "spike")] <= 2  # Memory budget
+    assert executor.max_active[RunStage.BUILD] == 1  # Memory budget
+
+
+def test_scheduler_resource_limits_run_level():
+    runs = [FakeRun(idx, target="ara" if idx % 2 else "spike") for idx in range(8)]
+    scheduler = SessionScheduler(
+        runs,
+        RunStage.RUN,
+        num_workers=4,
+        stage_limits="run:ara=1",
+        stage_memory="build=300,run:spike=600",
+        memory_budget=1000,
+    )
+    executor = RecordingExecutor(4)
+    scheduler._executor_cls = lambda **kwargs: executor
+    _, results = scheduler.process(context=mock.Mock())
+    assert scheduler.num_failures == 0
+    assert len([res for res in results if res is not None]) == 8
+    assert executor.started == [RunStage.RUN] * 8  # Runs are not processed per stage
+    assert executor.max_active[(RunStage.RUN, "ara")] == 1
+    assert executor.max_active[(RunStage.RUN, "spike")] == 1  # Memory budget
+    assert executor.max_active[RunStage.RUN] > 1
+
+
+def test_postprocess_pickable(tmp_path):
+    config = {"compare_rows.to_compare": "Total Cycles", "compare_rows.group_by": "Model"}
+    runs = [
+        RunInitializer(idx=idx, model_name="foo", config=config, postprocess_names=["compare_rows", "analyse_dump"])
+        for idx in range(2)
+    ]
+    handles = [RunHandle(run) for run in runs]
+    assert [postprocess.name for postprocess in handles[0].postprocesses] == ["compare_rows"]
+    report = Report()
+    report.set(pre=[{"Model": "foo"}, {"Model": "foo"}], main=[{"Total Cycles": 100}, {"Total Cycles": 50}])
+    assert _postprocess_pickable(runs, report, tmp_path) == 0
+    assert list(report.main_df["Total Cycles (rel.)"]) == [1.0, 0.5]
@@ -19,7 +19,7 @@
 import pytest
 from io import StringIO
 
-from mlonmcu.utils import is_power_of_two, ask_user, get_base_prefix_compat, in_virtualenv
+from mlonmcu.utils import is_power_of_two, ask_user, get_base_prefix_compat, in_virtualenv, LazyRegistry
 
 
 def test_utils_is_power_of_two():
@@ -66,3 +66,17 @@ def test_utils_get_base_prefix_compat():
 
 def test_utils_in_virtualenv():
     assert isinstance(in_virtualenv(), bool)
+
+
+def test_utils_lazy_registry():
+    registry = LazyRegistry({"path": "pathlib:Path", "int": int})
+    assert list(registry.keys()) == ["path", "int"]
+    assert "path" in registry
+    from pathlib import Path
+
+    assert registry["path"] is Path
+    assert registry["int"] is int
+    registry["bool"] = bool
+    assert dict(registry) == {"path": Path, "int": int, "bool": bool}
+    with pytest.raises(KeyError):
+        registry["foo"]